@@ -2,10 +2,21 @@ import PropTypes from 'prop-types';
 import '../styles/Dashboard.css';
 
 /**
- * ProductFilters component - handles category filtering
+ * ProductFilters component - handles category, price and sort filtering
  * Follows Single Responsibility Principle - only handles filtering UI
  */
-const ProductFilters = ({ categories, selectedCategory, onCategoryChange, productCount }) => {
+const ProductFilters = ({
+  categories,
+  selectedCategory,
+  onCategoryChange,
+  productCount,
+  sort,
+  onSortChange,
+  minPrice,
+  maxPrice,
+  onMinPriceChange,
+  onMaxPriceChange,
+}) => {
   return (
     <div className="product-filters">
       <div className="filter-header">
@@ -33,6 +44,38 @@ const ProductFilters = ({ categories, selectedCategory, onCategoryChange, produc
           ))}
         </div>
       </div>
+
+      <div className="filter-section">
+        <h4>Sort By</h4>
+        <select className="filter-select" value={sort} onChange={(e) => onSortChange(e.target.value)}>
+          <option value="price_asc">Price: Low to High</option>
+          <option value="price_desc">Price: High to Low</option>
+          <option value="id">Default Order</option>
+        </select>
+      </div>
+
+      <div className="filter-section">
+        <h4>Price</h4>
+        <div className="price-range">
+          <input
+            type="number"
+            min="0"
+            className="price-input"
+            placeholder="Min"
+            value={minPrice}
+            onChange={(e) => onMinPriceChange(e.target.value)}
+          />
+          <span>-</span>
+          <input
+            type="number"
+            min="0"
+            className="price-input"
+            placeholder="Max"
+            value={maxPrice}
+            onChange={(e) => onMaxPriceChange(e.target.value)}
+          />
+        </div>
+      </div>
     </div>
   );
 };
@@ -42,6 +85,12 @@ ProductFilters.propTypes = {
   selectedCategory: PropTypes.string.isRequired,
   onCategoryChange: PropTypes.func.isRequired,
   productCount: PropTypes.number.isRequired,
+  sort: PropTypes.string.isRequired,
+  onSortChange: PropTypes.func.isRequired,
+  minPrice: PropTypes.string.isRequired,
+  maxPrice: PropTypes.string.isRequired,
+  onMinPriceChange: PropTypes.func.isRequired,
+  onMaxPriceChange: PropTypes.func.isRequired,
 };
 
 export default ProductFilters;
@@ -1,31 +1,52 @@
-import { useState, useEffect, useMemo } from 'react';
+import { useState, useEffect } from 'react';
+import api from '../services/api';
 
-export const useProducts = (allowedCategories = null) => {
-  const [allProducts, setAllProducts] = useState(() => {
-    const cached = localStorage.getItem('products');
-    return cached ? JSON.parse(cached) : [];
-  });
-  const [loading, setLoading] = useState(allProducts.length === 0);
+/**
+ * One page of the catalog, filtered, sorted and paged by the backend.
+ * Drivers shopping with a sponsor get only that sponsor's allowed categories,
+ * without its hidden products; everyone else gets the full catalog.
+ * `exclude` is a comma-separated string of product ids to leave out as well.
+ */
+export const useProducts = ({
+  isDriver = false,
+  sponsorId = null,
+  category = 'all',
+  search = '',
+  minPrice = '',
+  maxPrice = '',
+  sort = 'price_asc',
+  page = 1,
+  pageSize = 24,
+  exclude = '',
+} = {}) => {
+  const [result, setResult] = useState({ products: [], total: 0, pages: 0, categories: [] });
+  const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
-  // Fetch all products from Fake Store API
   useEffect(() => {
     let isMounted = true;
     const fetchProducts = async () => {
+      setLoading(true);
       try {
-        const response = await fetch('https://fakestoreapi.com/products');
-        if (!response.ok) {
-          throw new Error('Failed to fetch products');
-        }
-        const data = await response.json();
+        const params = { category, sort, page, page_size: pageSize };
+        if (search) params.q = search;
+        if (minPrice !== '') params.min_price = minPrice;
+        if (maxPrice !== '') params.max_price = maxPrice;
+        if (isDriver && sponsorId) params.sponsor_id = sponsorId;
+        if (exclude) params.exclude = exclude;
 
-        if (isMounted && JSON.stringify(data) !== JSON.stringify(allProducts)) {
-          setAllProducts(data);
-          localStorage.setItem('products', JSON.stringify(data));
+        const response = await api.get(isDriver ? '/driver/catalog' : '/catalog', { params });
+        if (isMounted) {
+          setResult({
+            products: response.data.products || [],
+            total: response.data.total || 0,
+            pages: response.data.pages || 0,
+            categories: response.data.categories || [],
+          });
+          setError(null);
         }
-        setError(null);
       } catch (err) {
-        setError(err.message);
+        if (isMounted) setError(err.response?.data?.error || err.message);
         console.error('Error fetching products:', err);
       } finally {
         if (isMounted) setLoading(false);
@@ -33,27 +54,7 @@ export const useProducts = (allowedCategories = null) => {
     };
     fetchProducts();
     return () => { isMounted = false; };
-  }, []);
-
-    // Filter products based on allowed categories
-  const filteredProducts = useMemo(() => {
-    // If no filter (null), show all products
-    if (!allowedCategories) {
-      return allProducts;
-    }
-    
-    // If empty array, show no products
-    if (allowedCategories.length === 0) {
-      return [];
-    }
-    
-    // Filter products by allowed categories
-    const filtered = allProducts.filter(product => 
-      allowedCategories.includes(product.category)
-    );
-    
-    return filtered;
-  }, [allProducts, allowedCategories]);
+  }, [isDriver, sponsorId, category, search, minPrice, maxPrice, sort, page, pageSize, exclude]);
 
-  return { products: filteredProducts, loading, error };
+  return { ...result, loading, error };
 };
@@ -18,6 +18,11 @@ const Market = () => {
   const [notification, setNotification] = useState(null);
   const [selectedSponsor, setSelectedSponsor] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
+  const [search, setSearch] = useState('');
+  const [sort, setSort] = useState('price_asc');
+  const [minPrice, setMinPrice] = useState('');
+  const [maxPrice, setMaxPrice] = useState('');
+  const [page, setPage] = useState(1);
   
   // Get driver's sponsors if they are a driver
   const driverSponsors = useMemo(() => {
@@ -34,29 +39,25 @@ const Market = () => {
     }
   }, [driverSponsors, selectedSponsor]);
   
-  // Calculate allowed categories based on selected sponsor
-  const allowedCategories = useMemo(() => {
-    if (!user || user.role_name !== 'Driver' || !user.role?.sponsors) {
-      return null;
-    }
-    
-    if (!selectedSponsor) {
-      return null;
-    }
-    
-    // Get the specific sponsor's allowed categories
-    const sponsor = user.role.sponsors.find(s => s.sponsor_id === parseInt(selectedSponsor));
-    if (!sponsor) {
-      return null;
-    }
-    
-    if (!sponsor.allowed_categories || sponsor.allowed_categories === null) {
-      return null;
-    }
-    
-    return sponsor.allowed_categories;
-  }, [user, selectedSponsor]);
-  
+  // Debounce the search box so typing does not send a request per keystroke
+  useEffect(() => {
+    const timer = setTimeout(() => setSearch(searchQuery.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+
+  const { hiddenProducts, isHidden, hideProduct, unhideProduct } = useHiddenProducts();
+
+  // The driver's own hidden products are left out by the backend too, before
+  // paging, so pages stay full and totals are right
+  const excluded = useMemo(() => {
+    return showHidden ? '' : [...hiddenProducts].sort((a, b) => a - b).join(',');
+  }, [hiddenProducts, showHidden]);
+
+  // Any filter change starts again from the first page
+  useEffect(() => {
+    setPage(1);
+  }, [selectedSponsor, selectedCategory, search, sort, minPrice, maxPrice]);
+
   // Get point balance for selected sponsor
   const pointBalance = useMemo(() => {
     if (!user || !user.role) return 0;
@@ -71,26 +72,28 @@ const Market = () => {
     return 0;
   }, [user, selectedSponsor]);
   
-  const { products, loading: productsLoading, error: productsError } = useProducts(allowedCategories);
-  const { addToCart, getCartItemCount } = useCart();
-  const { isHidden, hideProduct, unhideProduct } = useHiddenProducts();
-
-  // Extract unique categories from products (memoized for performance)
-  const categories = useMemo(() => {
-    return [...new Set(products.map((p) => p.category))];
-  }, [products]);
+  const isDriver = user?.role_name?.toLowerCase() === 'driver';
 
-  // Filter products by category, search query, and hidden status (memoized for performance)
-  const filteredProducts = useMemo(() => {
-    return products.filter((product) => {
-      const matchesCategory = selectedCategory === 'all' || product.category === selectedCategory;
-      const matchesHidden = showHidden || !isHidden(product.id);
-      const matchesSearch = searchQuery === '' || 
-        product.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        (product.description && product.description.toLowerCase().includes(searchQuery.toLowerCase()));
-      return matchesCategory && matchesHidden && matchesSearch;
-    });
-  }, [products, selectedCategory, showHidden, isHidden, searchQuery]);
+  // Sponsor categories, hidden products, filters, sorting and paging are applied by the backend
+  const {
+    products,
+    total,
+    pages,
+    categories,
+    loading: productsLoading,
+    error: productsError,
+  } = useProducts({
+    isDriver,
+    sponsorId: selectedSponsor,
+    category: selectedCategory,
+    search,
+    minPrice,
+    maxPrice,
+    sort,
+    page,
+    exclude: excluded,
+  });
+  const { addToCart, getCartItemCount } = useCart();
 
   // Handlers
   const handleAddToCart = (product) => {
@@ -127,8 +130,8 @@ const Market = () => {
     navigate('/cart');
   };
 
-  // Loading and error states
-  if (productsLoading) {
+  // Loading and error states (only before the first page arrives)
+  if (productsLoading && products.length === 0 && !productsError) {
     return (
       <Layout>
         <div className="dashboard">
@@ -150,7 +153,6 @@ const Market = () => {
     );
   }
 
-  const isDriver = user?.role_name?.toLowerCase() === 'driver';
   const cartItemCount = getCartItemCount();
 
   return (
@@ -241,13 +243,19 @@ const Market = () => {
               categories={categories}
               selectedCategory={selectedCategory}
               onCategoryChange={setSelectedCategory}
-              productCount={filteredProducts.length}
+              productCount={total}
+              sort={sort}
+              onSortChange={setSort}
+              minPrice={minPrice}
+              maxPrice={maxPrice}
+              onMinPriceChange={setMinPrice}
+              onMaxPriceChange={setMaxPrice}
             />
           </aside>
 
           {/* Product Grid */}
           <main className="market-main">
-            {filteredProducts.length === 0 ? (
+            {products.length === 0 ? (
               <div className="no-products">
                 <p>No products found.</p>
                 {!showHidden && isDriver && (
@@ -261,7 +269,7 @@ const Market = () => {
               </div>
             ) : (
               <div className="product-grid">
-                {filteredProducts.map((product) => (
+                {products.map((product) => (
                   <ProductCard
                     key={product.id}
                     product={product}
@@ -273,6 +281,26 @@ const Market = () => {
                 ))}
               </div>
             )}
+
+            {pages > 1 && (
+              <div className="pagination">
+                <button
+                  className="btn btn-secondary"
+                  disabled={page <= 1 || productsLoading}
+                  onClick={() => setPage(page - 1)}
+                >
+                  Previous
+                </button>
+                <span className="pagination-info">Page {page} of {pages}</span>
+                <button
+                  className="btn btn-secondary"
+                  disabled={page >= pages || productsLoading}
+                  onClick={() => setPage(page + 1)}
+                >
+                  Next
+                </button>
+              </div>
+            )}
           </main>
         </div>
       </div>
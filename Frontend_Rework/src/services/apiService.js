@@ -274,6 +274,20 @@ export const orderService = {
   },
 };
 
+// Expand a ?layout=columnar report ({ columns, row_count, data: { column: [values] } })
+// back into the row objects the report pages render.
+const rowsFromColumnar = (report) => {
+  if (report?.layout !== 'columnar') return report;
+  const { columns, data, row_count: rowCount, ...rest } = report;
+  const rows = new Array(rowCount);
+  for (let i = 0; i < rowCount; i++) {
+    const row = {};
+    for (const column of columns) row[column] = data[column][i];
+    rows[i] = row;
+  }
+  return { ...rest, data: rows };
+};
+
 export const reportService = {
   // Admin Reports
   getSalesReport: async (filters = {}) => {
@@ -282,9 +296,11 @@ export const reportService = {
     if (filters.endDate) params.append('end_date', filters.endDate);
     if (filters.sponsorId) params.append('sponsor_id', filters.sponsorId);
     if (filters.viewType) params.append('view_type', filters.viewType);
+    // Detailed views can run to thousands of rows; fetch them in the compact layout
+    if (filters.viewType === 'detailed') params.append('layout', 'columnar');
 
     const response = await api.get(`/admin/reports/sales?${params.toString()}`);
-    return response.data;
+    return rowsFromColumnar(response.data);
   },
 
   getDriversReport: async (filters = {}) => {
@@ -313,9 +329,10 @@ export const reportService = {
     if (filters.sponsorId) params.append('sponsor_id', filters.sponsorId);
     if (filters.driverId) params.append('driver_id', filters.driverId);
     if (filters.viewType) params.append('view_type', filters.viewType);
+    if (filters.viewType === 'detailed') params.append('layout', 'columnar');
 
     const response = await api.get(`/admin/reports/sales-by-driver?${params.toString()}`);
-    return response.data;
+    return rowsFromColumnar(response.data);
   },
 
   getInvoiceReport: async (filters = {}) => {
@@ -0,0 +1,14 @@
+-- Denylist of revoked access tokens, keyed by the JWT's jti claim.
+-- Rows only matter until the token's own expiry; expired rows are purged
+-- by the app (see utils/revocation.py). Workers sync incrementally on
+-- revoked_at and keep a Bloom filter of the set in memory.
+CREATE TABLE IF NOT EXISTS `revoked_tokens` (
+  `jti` varchar(64) NOT NULL,
+  `user_id` int DEFAULT NULL,
+  `reason` varchar(32) DEFAULT NULL,
+  `revoked_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  `expires_at` datetime(6) NOT NULL,
+  PRIMARY KEY (`jti`),
+  KEY `idx_revoked_at` (`revoked_at`),
+  KEY `idx_revoked_exp` (`expires_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,41 @@
+-- Typed change_log columns instead of pipe-delimited change_type strings
+-- ("POINT_CHANGE|driver_id:5|sponsor_id:2|points:10|reason:..."), so reports
+-- can filter on indexed columns. user_id stays the actor. change_type is
+-- kept for old readers; new rows store the bare event type there.
+-- MySQL has no ADD COLUMN IF NOT EXISTS, so the ALTER is guarded to keep
+-- this file safe to re-run.
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.columns
+   WHERE table_schema = DATABASE() AND table_name = 'change_log' AND column_name = 'event_type') = 0,
+  'ALTER TABLE `change_log`
+     ADD COLUMN `event_type` varchar(40) DEFAULT NULL AFTER `change_type`,
+     ADD COLUMN `driver_id` int DEFAULT NULL AFTER `event_type`,
+     ADD COLUMN `sponsor_id` int DEFAULT NULL AFTER `driver_id`,
+     ADD COLUMN `points` int DEFAULT NULL AFTER `sponsor_id`,
+     ADD COLUMN `status` varchar(20) DEFAULT NULL AFTER `points`,
+     ADD COLUMN `reason` varchar(255) DEFAULT NULL AFTER `status`,
+     ADD KEY `idx_changelog_event_time` (`event_type`, `occurred_at`),
+     ADD KEY `idx_changelog_sponsor_event_time` (`sponsor_id`, `event_type`, `occurred_at`),
+     ADD KEY `idx_changelog_driver_time` (`driver_id`, `occurred_at`)',
+  'DO 0'
+);
+PREPARE change_log_ddl FROM @ddl;
+EXECUTE change_log_ddl;
+DEALLOCATE PREPARE change_log_ddl;
+
+-- Backfill from the encoded strings; rows without a field keep NULL
+UPDATE `change_log`
+SET
+  `event_type` = LEFT(SUBSTRING_INDEX(`change_type`, '|', 1), 40),
+  `driver_id`  = IF(`change_type` LIKE '%|driver\_id:%',
+                    CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(`change_type`, '|driver_id:', -1), '|', 1) AS SIGNED), NULL),
+  `sponsor_id` = IF(`change_type` LIKE '%|sponsor\_id:%',
+                    CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(`change_type`, '|sponsor_id:', -1), '|', 1) AS SIGNED), NULL),
+  `points`     = IF(`change_type` LIKE '%|points:%',
+                    CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(`change_type`, '|points:', -1), '|', 1) AS SIGNED), NULL),
+  `status`     = IF(`change_type` LIKE '%|status:%',
+                    LEFT(SUBSTRING_INDEX(SUBSTRING_INDEX(`change_type`, '|status:', -1), '|', 1), 20), NULL),
+  -- reason is always last and may itself contain '|'
+  `reason`     = IF(`change_type` LIKE '%|reason:%',
+                    LEFT(SUBSTRING(`change_type`, LOCATE('|reason:', `change_type`) + 8), 255), NULL)
+WHERE `event_type` IS NULL;
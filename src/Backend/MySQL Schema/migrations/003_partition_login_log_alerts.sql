@@ -0,0 +1,99 @@
+-- Monthly RANGE partitioning for login_log (occurred_at) and alerts
+-- (date_created), so date-filtered reports prune to the months they ask for
+-- and old months can be archived and dropped a partition at a time
+-- (see partition_maintenance.py).
+--
+-- MySQL requirements this migration meets:
+--   * every unique key must include the partitioning column, so the primary
+--     keys become (log_id, occurred_at) / (alert_id, date_created);
+--   * partitioned InnoDB tables cannot have foreign keys, so those are
+--     dropped. Their cascades are done by the app (account deletion
+--     deletes the user's alerts and nulls login_log.user_id).
+--
+-- The tables start with a single catch-all partition. partition_maintenance.py
+-- then splits it into months, from the oldest row up to a few months ahead.
+-- Each step is guarded so the file is safe to re-run.
+
+-- login_log
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.table_constraints
+   WHERE table_schema = DATABASE() AND table_name = 'login_log'
+     AND constraint_name = 'fk_loginlog_user' AND constraint_type = 'FOREIGN KEY') > 0,
+  'ALTER TABLE `login_log` DROP FOREIGN KEY `fk_loginlog_user`',
+  'DO 0'
+);
+PREPARE partition_ddl FROM @ddl;
+EXECUTE partition_ddl;
+DEALLOCATE PREPARE partition_ddl;
+
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.key_column_usage
+   WHERE table_schema = DATABASE() AND table_name = 'login_log' AND constraint_name = 'PRIMARY') = 1,
+  'ALTER TABLE `login_log`
+     DROP PRIMARY KEY,
+     ADD PRIMARY KEY (`log_id`, `occurred_at`),
+     ADD KEY `idx_loginlog_time` (`occurred_at`)',
+  'DO 0'
+);
+PREPARE partition_ddl FROM @ddl;
+EXECUTE partition_ddl;
+DEALLOCATE PREPARE partition_ddl;
+
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.partitions
+   WHERE table_schema = DATABASE() AND table_name = 'login_log' AND partition_name IS NOT NULL) = 0,
+  'ALTER TABLE `login_log` PARTITION BY RANGE COLUMNS (`occurred_at`) (
+     PARTITION `p_future` VALUES LESS THAN (MAXVALUE)
+   )',
+  'DO 0'
+);
+PREPARE partition_ddl FROM @ddl;
+EXECUTE partition_ddl;
+DEALLOCATE PREPARE partition_ddl;
+
+-- alerts
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.table_constraints
+   WHERE table_schema = DATABASE() AND table_name = 'alerts'
+     AND constraint_name = 'fk_alerts_user' AND constraint_type = 'FOREIGN KEY') > 0,
+  'ALTER TABLE `alerts` DROP FOREIGN KEY `fk_alerts_user`',
+  'DO 0'
+);
+PREPARE partition_ddl FROM @ddl;
+EXECUTE partition_ddl;
+DEALLOCATE PREPARE partition_ddl;
+
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.table_constraints
+   WHERE table_schema = DATABASE() AND table_name = 'alerts'
+     AND constraint_name = 'fk_alerts_type' AND constraint_type = 'FOREIGN KEY') > 0,
+  'ALTER TABLE `alerts` DROP FOREIGN KEY `fk_alerts_type`',
+  'DO 0'
+);
+PREPARE partition_ddl FROM @ddl;
+EXECUTE partition_ddl;
+DEALLOCATE PREPARE partition_ddl;
+
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.key_column_usage
+   WHERE table_schema = DATABASE() AND table_name = 'alerts' AND constraint_name = 'PRIMARY') = 1,
+  'ALTER TABLE `alerts`
+     DROP PRIMARY KEY,
+     ADD PRIMARY KEY (`alert_id`, `date_created`)',
+  'DO 0'
+);
+PREPARE partition_ddl FROM @ddl;
+EXECUTE partition_ddl;
+DEALLOCATE PREPARE partition_ddl;
+
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.partitions
+   WHERE table_schema = DATABASE() AND table_name = 'alerts' AND partition_name IS NOT NULL) = 0,
+  'ALTER TABLE `alerts` PARTITION BY RANGE COLUMNS (`date_created`) (
+     PARTITION `p_future` VALUES LESS THAN (MAXVALUE)
+   )',
+  'DO 0'
+);
+PREPARE partition_ddl FROM @ddl;
+EXECUTE partition_ddl;
+DEALLOCATE PREPARE partition_ddl;
@@ -0,0 +1,22 @@
+-- Local mirror of the upstream product catalog (Fake Store API), kept in
+-- sync by product_sync.py. product_id is the upstream id, the same value
+-- order_items.product_id and transactions.item_id store. content_hash is
+-- the SHA-256 of the product's canonical JSON, so a sync only rewrites rows
+-- that changed. Products that disappear upstream are kept (old orders still
+-- point at them) with is_active = 0.
+CREATE TABLE IF NOT EXISTS `product` (
+  `product_id` int NOT NULL,
+  `title` varchar(255) NOT NULL,
+  `price` decimal(10,2) NOT NULL,
+  `category` varchar(100) NOT NULL,
+  `image` varchar(1024) DEFAULT NULL,
+  `description` text,
+  `rating_rate` decimal(3,2) DEFAULT NULL,
+  `rating_count` int DEFAULT NULL,
+  `content_hash` char(64) NOT NULL,
+  `is_active` tinyint(1) NOT NULL DEFAULT '1',
+  `synced_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  `updated_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (`product_id`),
+  KEY `idx_product_active_category_price` (`is_active`, `category`, `price`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
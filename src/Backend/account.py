@@ -1,8 +1,10 @@
 # src/Backend/account.py
 from flask import Blueprint, jsonify, g, request
 import logging
-from utils.db import get_db_connection
-from auth import token_required, require_role
+from utils.db import get_db_connection, execute_prepared_one, DatabaseUnavailable
+from utils.streaming import stream_mode, stream_query
+from utils import identity, revocation, sessions
+from auth import token_required, require_role, current_claims
 import io
 import re
 import secrets
@@ -15,6 +17,19 @@ SENSITIVE_USER_FIELDS = {"ssn"}
 HIDE_TECH_FIELDS      = {"email_lc"}
 EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
+# Hot lookups run through execute_prepared_one(); keep the text fixed so the
+# per-connection prepared statement cache can reuse them.
+SQL_DRIVER_SPONSOR_BALANCE = """
+    SELECT driver_sponsor_id, balance
+    FROM driver_sponsor
+    WHERE driver_id = %s AND sponsor_id = %s
+"""
+SQL_ACTIVE_DRIVER_SPONSOR_BALANCE = SQL_DRIVER_SPONSOR_BALANCE + " AND status = 'ACTIVE'"
+
+# Emails are matched through the indexed generated column (uq_user_email_lc);
+# `email = %s` cannot use that index and scans `user`.
+SQL_USER_BY_EMAIL = "SELECT user_id, type_id, organization_id FROM `user` WHERE email_lc = LOWER(%s)"
+
 def _claims_user_id():
     claims = getattr(g, "decoded_token", {}) or {}
     return claims.get("user_id") or claims.get("sub")
@@ -22,8 +37,6 @@ def _claims_user_id():
 @account_bp.route("/api/account", methods=["GET"])
 @token_required
 def account_api():
-    from flask_jwt_extended import get_jwt
-    
     user_id = _claims_user_id()
     if not user_id:
         return jsonify({"error": "Unauthorized"}), 401
@@ -34,7 +47,7 @@ def account_api():
         return jsonify({"error": "Unauthorized"}), 401
 
     # Get JWT claims to check for impersonation
-    claims = get_jwt() or {}
+    claims = current_claims()
     is_impersonating = claims.get('impersonating', False)
     original_user_id = claims.get('original_user_id')
     original_role = claims.get('original_role')
@@ -92,12 +105,9 @@ def account_api():
         elif type_id == 3:  # Driver
             log = logging.getLogger('account')
             try:
-                # 1) Find this user's driver_id
-                cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-                drow = cur.fetchone()
-                if drow:
-                    driver_id = drow["driver_id"]
-
+                # 1) This user's driver_id (resolved by token_required)
+                driver_id = g.driver_id
+                if driver_id:
                     # Minimal role blob (no legacy sponsor_id/balance here)
                     role_blob = {"driver_id": driver_id}
 
@@ -166,8 +176,6 @@ def update_account():
     Allows updating: first_name, last_name, city, state, country
     Email cannot be changed (unique identifier)
     """
-    from flask_jwt_extended import get_jwt
-    
     user_id = _claims_user_id()
     if not user_id:
         return jsonify({"error": "Unauthorized"}), 401
@@ -228,6 +236,8 @@ def update_account():
             "user": user_data
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
@@ -242,99 +252,93 @@ def update_account():
 
 
 # Admin Accounts API
+# One row per (user, driver sponsorship); role tables are prefixed so their
+# columns don't collide with the user's own in a dictionary cursor.
+ADMIN_ACCOUNTS_SQL = """
+    SELECT
+        u.*,
+        ut.type_id AS ut_type_id, ut.type_name AS ut_type_name,
+        a.admin_id AS a_admin_id, a.user_id AS a_user_id, a.admin_permissions AS a_admin_permissions,
+        sp.sponsor_id AS sp_sponsor_id, sp.user_id AS sp_user_id, sp.name AS sp_name, sp.description AS sp_description,
+        d.driver_id AS d_driver_id,
+        ds.driver_sponsor_id AS ds_driver_sponsor_id, ds.balance AS ds_balance, ds.status AS ds_status,
+        ds.since_at AS ds_since_at, ds.until_at AS ds_until_at,
+        dss.sponsor_id AS ds_sponsor_id, dss.name AS ds_name, dss.description AS ds_description
+    FROM `user` u
+    LEFT JOIN user_type ut ON ut.type_id = u.type_id
+    LEFT JOIN admin a ON a.user_id = u.user_id AND u.type_id = 1
+    LEFT JOIN sponsor sp ON sp.user_id = u.user_id AND u.type_id = 2
+    LEFT JOIN driver d ON d.user_id = u.user_id AND u.type_id = 3
+    LEFT JOIN driver_sponsor ds ON ds.driver_id = d.driver_id
+    LEFT JOIN sponsor dss ON dss.sponsor_id = ds.sponsor_id
+    ORDER BY u.user_id, dss.name
+"""
+_ACCOUNT_JOIN_PREFIXES = ("ut_", "a_", "sp_", "d_", "ds_")
+
+
+def _strip_prefix(row, prefix):
+    return {k[len(prefix):]: v for k, v in row.items() if k.startswith(prefix)}
+
+
+def _account_from_row(row):
+    user_data = {
+        k: v for k, v in row.items()
+        if not k.startswith(_ACCOUNT_JOIN_PREFIXES)
+        and k.lower() not in ["password", "created_at", "updated_at"]
+    }
+    type_info = _strip_prefix(row, "ut_") if row["ut_type_id"] is not None else None
+
+    role_blob = None
+    if row["a_admin_id"] is not None:
+        role_blob = _strip_prefix(row, "a_")
+    elif row["sp_sponsor_id"] is not None:
+        role_blob = _strip_prefix(row, "sp_")
+    elif row["d_driver_id"] is not None:
+        role_blob = {"driver_id": row["d_driver_id"], "sponsors": [], "total_balance": 0.0}
+
+    return {
+        "user": user_data,
+        "type": type_info,
+        "role_name": type_info.get("type_name") if type_info else None,
+        "role": role_blob
+    }
+
+
+def _group_account_rows(rows):
+    """Fold ADMIN_ACCOUNTS_SQL rows (ordered by user) into one account per user"""
+    account = None
+    for row in rows:
+        if account is None or row["user_id"] != account["user"]["user_id"]:
+            if account is not None:
+                yield account
+            account = _account_from_row(row)
+        if row["ds_driver_sponsor_id"] is not None:
+            sponsorship = _strip_prefix(row, "ds_")
+            account["role"]["sponsors"].append(sponsorship)
+            account["role"]["total_balance"] += float(sponsorship.get("balance") or 0)
+    if account is not None:
+        yield account
+
+
 @account_bp.route("/api/admin/accounts", methods=["GET"])
 @token_required
 @require_role("admin")
 def admin_accounts_api():
-    
-    
+    """
+    All accounts with type info and role details, from one joined query.
+    Query params:
+    - stream=1 / format=ndjson: stream the list instead of buffering it (see utils.streaming)
+    """
+    mode = stream_mode()
+    if mode:
+        return stream_query(ADMIN_ACCOUNTS_SQL, key="accounts", mode=mode, transform=_group_account_rows)
+
     conn = get_db_connection()
     cur = None
     try:
         cur = conn.cursor(dictionary=True)
-
-        # --- 1) Get all users ---
-        cur.execute("SELECT * FROM `user`")
-        users = cur.fetchall() or []
-
-        results = []
-
-        for u in users:
-            user_id = u["user_id"]
-            type_id = u.get("type_id")
-
-            # Remove sensitive/tech fields if your constants exist
-            user_data = {
-                k: v for k, v in u.items()
-                if k.lower() not in ["password", "created_at", "updated_at"]
-            }
-
-            # --- 2) Get user type info ---
-            cur.execute("SELECT * FROM user_type WHERE type_id = %s", (type_id,))
-            trow = cur.fetchone()
-            type_info = dict(trow) if trow else None
-            role_name = type_info.get("type_name") if type_info else None
-
-            # --- 3) Role-specific details ---
-            role_blob = None
-
-            # Admin
-            if type_id == 1:
-                cur.execute("""
-                    SELECT admin_id, user_id, admin_permissions
-                    FROM admin
-                    WHERE user_id = %s
-                """, (user_id,))
-                r = cur.fetchone()
-                if r:
-                    role_blob = dict(r)
-
-            # Sponsor
-            elif type_id == 2:
-                cur.execute("""
-                    SELECT sponsor_id, user_id, name, description
-                    FROM sponsor
-                    WHERE user_id = %s
-                """, (user_id,))
-                r = cur.fetchone()
-                if r:
-                    role_blob = dict(r)
-
-            # Driver
-            elif type_id == 3:
-                # 1) Find this user's driver_id
-                cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-                drow = cur.fetchone()
-                if drow:
-                    driver_id = drow["driver_id"]
-                    role_blob = {"driver_id": driver_id}
-
-                    # 2) Get sponsors for this driver
-                    cur.execute("""
-                        SELECT
-                            ds.driver_sponsor_id,
-                            ds.balance,
-                            ds.status,
-                            ds.since_at,
-                            ds.until_at,
-                            s.sponsor_id,
-                            s.name,
-                            s.description
-                        FROM driver_sponsor ds
-                        JOIN sponsor s ON s.sponsor_id = ds.sponsor_id
-                        WHERE ds.driver_id = %s
-                        ORDER BY s.name
-                    """, (driver_id,))
-                    sponsors = cur.fetchall() or []
-                    role_blob["sponsors"] = sponsors
-                    role_blob["total_balance"] = float(sum((row.get("balance") or 0) for row in sponsors))
-
-            results.append({
-                "user": user_data,
-                "type": type_info,
-                "role_name": role_name,
-                "role": role_blob
-            })
+        cur.execute(ADMIN_ACCOUNTS_SQL)
+        results = list(_group_account_rows(cur.fetchall() or []))
 
         return jsonify({"accounts": results}), 200
 
@@ -420,10 +424,19 @@ def delete_account(account_id):
         except Exception:
             pass  # Table might not exist
         
+        # Sign out the account everywhere (rows also cascade with the user)
+        sessions.revoke_user(account_id, conn)
+        
+        # alerts / login_log are partitioned and so have no FKs (migration 003):
+        # do their former ON DELETE CASCADE / SET NULL here
+        cur.execute("DELETE FROM alerts WHERE user_id = %s", (account_id,))
+        cur.execute("UPDATE login_log SET user_id = NULL WHERE user_id = %s", (account_id,))
+        
         # Finally, delete the user record
         cur.execute("DELETE FROM `user` WHERE user_id = %s", (account_id,))
         
         conn.commit()
+        identity.invalidate(account_id)
         
         return jsonify({
             "success": True,
@@ -431,6 +444,8 @@ def delete_account(account_id):
             "user_id": account_id
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
@@ -452,7 +467,7 @@ def admin_impersonate():
     Admin-only endpoint to impersonate another user.
     Creates a new JWT with the target user's identity while preserving original admin ID.
     """
-    from flask_jwt_extended import create_access_token, get_jwt
+    from flask_jwt_extended import create_access_token
     from flask import current_app
     
     data = request.get_json() or {}
@@ -462,7 +477,7 @@ def admin_impersonate():
         return jsonify({"error": "account_id required"}), 400
     
     # Get current admin's info from JWT
-    claims = get_jwt() or {}
+    claims = current_claims()
     original_user_id = claims.get('user_id')
     
     conn = None
@@ -497,7 +512,8 @@ def admin_impersonate():
                 'username': target_user['username'] or target_user['email'],
                 'impersonating': True,
                 'original_user_id': original_user_id,
-                'original_role': 'admin'
+                'original_role': 'admin',
+                'sid': claims.get('sid')
             }
         )
         
@@ -521,9 +537,13 @@ def admin_impersonate():
             httponly=True, secure=secure, samesite=samesite,
             path='/'
         )
+        # The replaced token stays valid until its exp unless revoked
+        revocation.revoke(claims, 'impersonation')
         
         return resp, 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error in admin impersonate: {e}")
         return jsonify({"error": str(e)}), 500
@@ -543,7 +563,7 @@ def sponsor_impersonate():
     Sponsor-only endpoint to impersonate their drivers.
     Creates a new JWT with the driver's identity while preserving original sponsor ID.
     """
-    from flask_jwt_extended import create_access_token, get_jwt
+    from flask_jwt_extended import create_access_token
     from flask import current_app
     
     data = request.get_json() or {}
@@ -553,7 +573,7 @@ def sponsor_impersonate():
         return jsonify({"error": "account_id required"}), 400
     
     # Get current sponsor's info from JWT
-    claims = get_jwt() or {}
+    claims = current_claims()
     sponsor_user_id = claims.get('user_id')
     
     conn = None
@@ -562,14 +582,11 @@ def sponsor_impersonate():
         conn = get_db_connection()
         cur = conn.cursor(dictionary=True)
         
-        # Get sponsor_id from current user
-        cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (sponsor_user_id,))
-        sponsor_row = cur.fetchone()
-        if not sponsor_row:
+        # sponsor_id of the current user
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             return jsonify({"error": "Sponsor not found"}), 403
         
-        sponsor_id = sponsor_row['sponsor_id']
-        
         # Verify target is a driver enrolled with this sponsor
         cur.execute("""
             SELECT d.driver_id, d.user_id
@@ -607,7 +624,8 @@ def sponsor_impersonate():
                 'username': target_user['username'] or target_user['email'],
                 'impersonating': True,
                 'original_user_id': sponsor_user_id,
-                'original_role': 'sponsor'
+                'original_role': 'sponsor',
+                'sid': claims.get('sid')
             }
         )
         
@@ -631,9 +649,13 @@ def sponsor_impersonate():
             httponly=True, secure=secure, samesite=samesite,
             path='/'
         )
+        # The replaced token stays valid until its exp unless revoked
+        revocation.revoke(claims, 'impersonation')
         
         return resp, 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error in sponsor impersonate: {e}")
         return jsonify({"error": str(e)}), 500
@@ -652,11 +674,11 @@ def stop_impersonation():
     Stop impersonating and return to original user.
     Works for both admin and sponsor impersonation.
     """
-    from flask_jwt_extended import create_access_token, get_jwt
+    from flask_jwt_extended import create_access_token
     from flask import current_app
     
     # Get current JWT claims
-    claims = get_jwt() or {}
+    claims = current_claims()
     
     if not claims.get('impersonating'):
         return jsonify({"error": "Not currently impersonating"}), 400
@@ -691,7 +713,8 @@ def stop_impersonation():
             additional_claims={
                 'role': original_role,
                 'user_id': original_user_id,
-                'username': original_user['username'] or original_user['email']
+                'username': original_user['username'] or original_user['email'],
+                'sid': claims.get('sid')
             }
         )
         
@@ -715,9 +738,13 @@ def stop_impersonation():
             httponly=True, secure=secure, samesite=samesite,
             path='/'
         )
+        # The replaced token stays valid until its exp unless revoked
+        revocation.revoke(claims, 'stop_impersonation')
         
         return resp, 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error stopping impersonation: {e}")
         return jsonify({"error": str(e)}), 500
@@ -825,7 +852,7 @@ def sponsor_bulk_drivers():
                     continue
 
                 # If a user with this email exists, reuse; else create new driver user
-                cur.execute("SELECT user_id, type_id FROM `user` WHERE email=%s", (email,))
+                cur.execute(SQL_USER_BY_EMAIL, (email,))
                 existing = cur.fetchone()
 
                 if existing:
@@ -859,6 +886,7 @@ def sponsor_bulk_drivers():
                 if not drow:
                     cur.execute("INSERT INTO driver (user_id) VALUES (%s)", (driver_user_id,))
                     driver_id = cur.lastrowid
+                    identity.invalidate(driver_user_id)
                 else:
                     driver_id = drow["driver_id"]
 
@@ -941,27 +969,12 @@ def purchase_api():
         cur = conn.cursor(dictionary=True)
         
         # 1. Verify user is a driver
-        cur.execute("""
-            SELECT d.driver_id
-            FROM driver d
-            JOIN `user` u ON d.user_id = u.user_id
-            WHERE u.user_id = %s AND u.type_id = 3
-        """, (user_id,))
-        driver_data = cur.fetchone()
-        
-        if not driver_data:
+        driver_id = g.driver_id
+        if not driver_id:
             return jsonify({"error": "Only drivers can make purchases"}), 403
         
-        driver_id = driver_data['driver_id']
-        
         # 2. Get driver-sponsor relationship and balance
-        cur.execute("""
-            SELECT driver_sponsor_id, balance
-            FROM driver_sponsor
-            WHERE driver_id = %s AND sponsor_id = %s AND status = 'ACTIVE'
-        """, (driver_id, sponsor_id))
-        
-        ds_row = cur.fetchone()
+        ds_row = execute_prepared_one(conn, SQL_ACTIVE_DRIVER_SPONSOR_BALANCE, (driver_id, sponsor_id))
         if not ds_row:
             return jsonify({"error": "No active relationship with this sponsor"}), 403
         
@@ -1073,6 +1086,8 @@ def purchase_api():
             "sponsor_id": sponsor_id
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
@@ -1201,21 +1216,13 @@ def sponsor_add_points(driver_id):
     try:
         cur = conn.cursor(dictionary=True)
 
-        # Get sponsor_id for this user
-        cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-        sponsor = cur.fetchone()
-        if not sponsor:
+        # sponsor_id for this user
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             return jsonify({"error": "Sponsor not found"}), 404
 
-        sponsor_id = sponsor["sponsor_id"]
-
         # Verify that this sponsor is associated with the driver
-        cur.execute("""
-            SELECT driver_sponsor_id, balance
-            FROM driver_sponsor
-            WHERE driver_id = %s AND sponsor_id = %s
-        """, (driver_id, sponsor_id))
-        ds_row = cur.fetchone()
+        ds_row = execute_prepared_one(conn, SQL_DRIVER_SPONSOR_BALANCE, (driver_id, sponsor_id))
 
         if not ds_row:
             return jsonify({"error": "Driver not found or not associated with this sponsor"}), 404
@@ -1482,10 +1489,7 @@ def admin_bulk_accounts():
                         continue
 
                     # Create/locate sponsor user
-                    cur.execute(
-                        "SELECT user_id, type_id, organization_id FROM `user` WHERE email=%s",
-                        (email,)
-                    )
+                    cur.execute(SQL_USER_BY_EMAIL, (email,))
                     existing = cur.fetchone()
                     if existing:
                         sponsor_user_id = existing["user_id"]
@@ -1563,10 +1567,7 @@ def admin_bulk_accounts():
                         continue
 
                     # Create/locate driver user
-                    cur.execute(
-                        "SELECT user_id, type_id, organization_id FROM `user` WHERE email=%s",
-                        (email,)
-                    )
+                    cur.execute(SQL_USER_BY_EMAIL, (email,))
                     existing = cur.fetchone()
                     if existing:
                         driver_user_id = existing["user_id"]
@@ -1610,6 +1611,7 @@ def admin_bulk_accounts():
                     else:
                         cur.execute("INSERT INTO driver (user_id) VALUES (%s)", (driver_user_id,))
                         driver_id = cur.lastrowid
+                        identity.invalidate(driver_user_id)
 
                     conn.commit()
                     success += 1
@@ -1667,12 +1669,10 @@ def driver_sponsors_api():
     try:
         cur = conn.cursor(dictionary=True)
 
-        # Find this user's driver_id
-        cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-        drow = cur.fetchone()
-        if not drow:
+        # This user's driver_id
+        driver_id = g.driver_id
+        if not driver_id:
             return jsonify({"error": "Driver not found"}), 404
-        driver_id = drow["driver_id"]
 
         # Get all sponsors and balances
         cur.execute("""
@@ -1736,11 +1736,9 @@ def sponsors_available_api():
     try:
         cur = conn.cursor(dictionary=True)
 
-        cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-        drow = cur.fetchone()
-        if not drow:
+        driver_id = g.driver_id
+        if not driver_id:
             return jsonify({"error": "Driver not found"}), 404
-        driver_id = drow["driver_id"]
 
         cur.execute(
             """
@@ -1792,11 +1790,9 @@ def driver_apply_sponsor_api():
     try:
         cur = conn.cursor(dictionary=True)
 
-        cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-        drow = cur.fetchone()
-        if not drow:
+        driver_id = g.driver_id
+        if not driver_id:
             return jsonify({"error": "Driver not found"}), 404
-        driver_id = drow["driver_id"]
 
         cur.execute("SELECT sponsor_id FROM sponsor WHERE sponsor_id=%s", (sponsor_id,))
         if not cur.fetchone():
@@ -1864,11 +1860,9 @@ def sponsor_remove_driver_api():
     try:
         cur = conn.cursor(dictionary=True)
 
-        cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-        srow = cur.fetchone()
-        if not srow:
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             return jsonify({"error": "Sponsor not found"}), 404
-        sponsor_id = srow["sponsor_id"]
 
         cur.execute(
             """
@@ -1903,45 +1897,135 @@ def sponsor_remove_driver_api():
 # DRIVER CATALOG (Market Products)
 # =========================
 
+def _json_list(value):
+    """JSON list column (allowed_categories, hidden_products) -> list, or None if unset/invalid."""
+    import json
+    if value is None:
+        return None
+    try:
+        parsed = json.loads(value) if isinstance(value, str) else value
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, list) else None
+
+
+def _catalog_page(allowed_categories=None, hidden_products=()):
+    """
+    One page of the catalog for the current request's query string:
+      category, min_price, max_price, sort (price_asc|price_desc|id),
+      q, page (from 1), page_size (max MAX_PAGE_SIZE),
+      exclude (comma-separated product ids, e.g. the driver's own hidden ones)
+    allowed_categories None means every category; hidden_products are never returned.
+    Returns (body, status).
+    """
+    from services import get_catalog_index
+    from catalog_index import SORTS, MAX_PAGE_SIZE
+
+    args = request.args
+    try:
+        min_price = float(args['min_price']) if args.get('min_price') else None
+        max_price = float(args['max_price']) if args.get('max_price') else None
+        page = int(args.get('page', 1))
+        page_size = int(args.get('page_size', 24))
+        excluded = {int(pid) for pid in args.get('exclude', '').split(',') if pid.strip()}
+    except ValueError:
+        return {"error": "min_price, max_price, page, page_size and exclude must be numbers"}, 400
+    sort = args.get('sort', 'price_asc')
+    if sort not in SORTS:
+        return {"error": f"sort must be one of {', '.join(SORTS)}"}, 400
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+
+    index = get_catalog_index()
+    if index is None:
+        return {"error": "Failed to fetch products"}, 503
+
+    allowed = None if allowed_categories is None else set(allowed_categories)
+    visible = [c for c in index.categories if allowed is None or c in allowed]
+    category = args.get('category')
+    if category and category != 'all':
+        wanted = [category] if category in visible else []
+    else:
+        wanted = None if allowed is None else visible
+
+    products, total = index.query(
+        categories=wanted,
+        min_price=min_price,
+        max_price=max_price,
+        sort=sort,
+        exclude=excluded.union(hidden_products),
+        q=args.get('q'),
+        offset=(page - 1) * page_size,
+        limit=page_size,
+    )
+    return {
+        "products": products,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (total + page_size - 1) // page_size,
+        "categories": visible,
+    }, 200
+
+
+@account_bp.route('/api/catalog', methods=['GET'])
+@token_required
+@require_role(['admin', 'sponsor'])
+def get_catalog():
+    """
+    One page of the full catalog (no sponsor rules), for admins and sponsors
+    Drivers must use /api/driver/catalog, which applies their sponsor's rules
+    Query params: see _catalog_page
+    """
+    try:
+        body, status = _catalog_page()
+        return jsonify(body), status
+    except Exception as e:
+        print(f"Error fetching catalog: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @account_bp.route('/api/driver/catalog', methods=['GET'])
 @token_required
 @require_role("driver")
 def get_driver_catalog():
     """
-    Get all products from Fake Store API for the driver
-    Optionally filter by sponsor with ?sponsor_id=X
-    Returns: List of all available products
+    One page of products for the driver, filtered, sorted and paged server-side
+    With ?sponsor_id=X only that sponsor's allowed categories are returned and
+    its hidden products are left out
+    Query params: sponsor_id, plus those of _catalog_page
     """
-    user_id = g.decoded_token.get("user_id") or g.decoded_token.get("sub")
-    
     conn = None
     cur = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(dictionary=True)
-        
-        # Get driver_id
-        cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-        driver = cur.fetchone()
-        if not driver:
+        driver_id = g.driver_id
+        if not driver_id:
             return jsonify({"error": "Driver not found"}), 404
-        driver_id = driver['driver_id']
-        
-        # Get all products from Fake Store API
-        from services import get_fake_store_data
-        products = get_fake_store_data()
-        
-        if not products:
-            return jsonify({"error": "Failed to fetch products"}), 500
-        
-        sponsor_id = request.args.get('sponsor_id')
-        
-        return jsonify({
-            "products": products,
-            "driver_id": driver_id,
-            "sponsor_id": sponsor_id
-        }), 200
-        
+
+        allowed_categories = None
+        hidden_products = ()
+        sponsor_id = request.args.get('sponsor_id', type=int)
+        if sponsor_id is not None:
+            conn = get_db_connection()
+            if not execute_prepared_one(conn, SQL_ACTIVE_DRIVER_SPONSOR_BALANCE, (driver_id, sponsor_id)):
+                return jsonify({"error": "No active relationship with this sponsor"}), 403
+            cur = conn.cursor(dictionary=True)
+            cur.execute(
+                "SELECT allowed_categories, hidden_products FROM sponsor WHERE sponsor_id = %s",
+                (sponsor_id,)
+            )
+            sponsor = cur.fetchone() or {}
+            allowed_categories = _json_list(sponsor.get('allowed_categories'))
+            hidden_products = _json_list(sponsor.get('hidden_products')) or ()
+
+        body, status = _catalog_page(allowed_categories, hidden_products)
+        if status == 200:
+            body["driver_id"] = driver_id
+            body["sponsor_id"] = sponsor_id
+        return jsonify(body), status
+
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error fetching driver catalog: {e}")
         import traceback
@@ -1967,21 +2051,19 @@ def get_sponsor_catalog():
     Uses JSON field in sponsor table - no separate curation table needed
     Returns: List of products with is_hidden flag for sponsor-level curation
     """
-    user_id = g.decoded_token.get("user_id") or g.decoded_token.get("sub")
-    
     conn = None
     cur = None
     try:
         conn = get_db_connection()
         cur = conn.cursor(dictionary=True)
         
-        # Get sponsor_id and hidden_products JSON
-        cur.execute("SELECT sponsor_id, hidden_products FROM sponsor WHERE user_id = %s", (user_id,))
-        sponsor = cur.fetchone()
-        if not sponsor:
+        # sponsor_id (resolved by token_required) and its hidden_products JSON
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             return jsonify({"error": "Sponsor not found"}), 404
-        
-        sponsor_id = sponsor['sponsor_id']
+
+        cur.execute("SELECT hidden_products FROM sponsor WHERE sponsor_id = %s", (sponsor_id,))
+        sponsor = cur.fetchone() or {}
         
         # Parse hidden products from JSON field
         import json
@@ -2001,8 +2083,8 @@ def get_sponsor_catalog():
         if not products:
             return jsonify({"error": "Failed to fetch products"}), 500
         
-        # Add is_hidden flag to each product
-        for product in products:
+        # Add is_hidden flag to each product (a copy, not the cached catalog)
+        for product in products.get('products', []):
             product['is_hidden'] = product['id'] in hidden_product_ids
         
         return jsonify({
@@ -2010,6 +2092,8 @@ def get_sponsor_catalog():
             "sponsor_id": sponsor_id
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error fetching sponsor catalog: {e}")
         import traceback
@@ -2031,8 +2115,6 @@ def toggle_sponsor_product_visibility():
     Updates JSON field in sponsor table - no separate curation table needed
     Body: { "product_id": 123, "is_hidden": true/false }
     """
-    user_id = g.decoded_token.get("user_id") or g.decoded_token.get("sub")
-    
     data = request.get_json() or {}
     product_id = data.get('product_id')
     is_hidden = data.get('is_hidden', True)
@@ -2047,13 +2129,13 @@ def toggle_sponsor_product_visibility():
         conn.autocommit = False
         cur = conn.cursor(dictionary=True)
         
-        # Get sponsor_id and current hidden_products
-        cur.execute("SELECT sponsor_id, hidden_products FROM sponsor WHERE user_id = %s", (user_id,))
-        sponsor = cur.fetchone()
-        if not sponsor:
+        # sponsor_id (resolved by token_required) and its current hidden_products
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             return jsonify({"error": "Sponsor not found"}), 404
-        
-        sponsor_id = sponsor['sponsor_id']
+
+        cur.execute("SELECT hidden_products FROM sponsor WHERE sponsor_id = %s", (sponsor_id,))
+        sponsor = cur.fetchone() or {}
         
         # Parse current hidden products
         import json
@@ -2090,6 +2172,8 @@ def toggle_sponsor_product_visibility():
             "is_hidden": is_hidden
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
@@ -2347,6 +2431,8 @@ def admin_update_account(user_id):
                         cur.execute(query, sponsor_values)
 
         conn.commit()
+        if "type_id" in data and is_admin:
+            identity.invalidate(user_id)
         return jsonify({"message": "Account updated successfully"}), 200
 
     except Exception as e:
@@ -2371,7 +2457,7 @@ def reset_user_password(user_id):
     """Reset a user's password to a random generated password"""
     import secrets
     import string
-    from werkzeug.security import generate_password_hash
+    from utils.password_hashing import hash_password, HashingOverloaded
     
     conn = get_db_connection()
     cur = None
@@ -2390,7 +2476,7 @@ def reset_user_password(user_id):
         new_password = ''.join(secrets.choice(alphabet) for i in range(12))
         
         # Hash the password
-        hashed_password = generate_password_hash(new_password)
+        hashed_password = hash_password(new_password)
         
         # Update user password
         cur.execute("""
@@ -2406,6 +2492,9 @@ def reset_user_password(user_id):
             "new_password": new_password
         }), 200
 
+    except HashingOverloaded:
+        conn.rollback()
+        raise
     except Exception as e:
         conn.rollback()
         print("Error in reset_user_password:", e)
@@ -2462,22 +2551,14 @@ def sponsor_create_user():
     """
     from user_management import UserCreationService
     
-    user_id = _claims_user_id()
     data = request.get_json() or {}
     
-    # Get the sponsor_id for the current user
-    conn = get_db_connection()
+    # sponsor_id of the current user (resolved by token_required)
+    sponsor_id = g.sponsor_id
+    if not sponsor_id:
+        return jsonify({"error": "Sponsor organization not found"}), 404
+    
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-        sponsor = cur.fetchone()
-        
-        if not sponsor:
-            return jsonify({"error": "Sponsor organization not found"}), 404
-        
-        sponsor_id = sponsor['sponsor_id']
-        conn.close()
-        
         # Create sponsor user for this organization
         new_user_id, error = UserCreationService.create_sponsor_user_for_organization(data, sponsor_id)
         
@@ -2490,11 +2571,10 @@ def sponsor_create_user():
             "sponsor_id": sponsor_id
         }), 201
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if conn:
-            conn.close()
 
 
 # ==================== ALERTS ENDPOINTS ====================
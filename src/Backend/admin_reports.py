@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request, g
-from utils.db import get_db_connection
+from utils.db import get_db_connection, read_only, fetch_columnar, columnar_payload, DatabaseUnavailable
+from utils.streaming import stream_mode, stream_query
 from auth import token_required, require_role
 import logging
 from datetime import datetime
@@ -50,6 +51,140 @@ def _build_date_filter(start_date, end_date, date_column='date'):
     return "", params
 
 
+def _wants_columnar():
+    """
+    ?layout=columnar returns {"columns": [...], "row_count": n, "data": {column: [values]}}
+    instead of a list of row objects: built from tuples without a dict per row,
+    and without repeating every key in every row of the JSON.
+    """
+    return request.args.get('layout') == 'columnar'
+
+def _audit_log_entry(row):
+    """Convert datetime objects to ISO format strings for JSON serialization"""
+    if row['date']:
+        row['date'] = row['date'].isoformat()
+    return row
+
+def _audit_log_query(cur, start_date, end_date, sponsor_id, category):
+    """
+    Build the audit log as one UNION ALL over every source, newest first.
+    Each source yields the same columns: date, category, sponsor, user, action, details
+    """
+    cur.execute("""
+        SELECT table_name AS name FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name IN ('driver_balance_changes', 'account_changes')
+    """)
+    optional_tables = {row['name'] for row in cur.fetchall() or []}
+    
+    parts = []
+    params = []
+    
+    # 1. Driver Applications (from alerts table - SPONSORSHIP_CHANGE type)
+    if category in ['driver_applications', 'all']:
+        date_filter, date_params = _build_date_filter(start_date, end_date, 'a.date_created')
+        sponsor_filter = "AND ds.sponsor_id = %s" if sponsor_id else ""
+        parts.append(f"""
+            SELECT 
+                a.date_created AS date,
+                'Driver Application' AS category,
+                s.name AS sponsor,
+                'System' AS user,
+                CASE ds.status WHEN 'ACTIVE' THEN 'Approved' WHEN 'INACTIVE' THEN 'Rejected' ELSE 'Pending' END AS action,
+                CONCAT('Driver: ', u.first_name, ' ', u.last_name,
+                       IF(a.details IS NULL OR a.details = '', '', CONCAT(' | ', a.details))) AS details
+            FROM alerts a
+            JOIN alert_type_definitions atd ON a.alert_type_id = atd.alert_type_id
+            JOIN `user` u ON a.user_id = u.user_id
+            LEFT JOIN driver d ON u.user_id = d.user_id
+            LEFT JOIN driver_sponsor ds ON d.driver_id = ds.driver_id AND a.related_id = ds.driver_sponsor_id
+            LEFT JOIN sponsor s ON ds.sponsor_id = s.sponsor_id
+            WHERE atd.alert_type = 'SPONSORSHIP_CHANGE' {date_filter} {sponsor_filter}
+        """)
+        params += date_params + ([sponsor_id] if sponsor_id else [])
+    
+    # 2. Point changes (from driver_balance_changes)
+    if category in ['point_changes', 'all'] and 'driver_balance_changes' in optional_tables:
+        date_filter, date_params = _build_date_filter(start_date, end_date, 'dbc.changed_at')
+        sponsor_filter = "AND dbc.sponsor_id = %s" if sponsor_id else ""
+        parts.append(f"""
+            SELECT 
+                dbc.changed_at AS date,
+                'Point Change' AS category,
+                s.name AS sponsor,
+                'System' AS user,
+                'Balance Updated' AS action,
+                CONCAT('Driver: ', u.first_name, ' ', u.last_name,
+                       IF(dbc.reason IS NULL OR dbc.reason = '', '', CONCAT(' | Reason: ', dbc.reason))) AS details
+            FROM driver_balance_changes dbc
+            JOIN driver d ON dbc.driver_id = d.driver_id
+            JOIN `user` u ON d.user_id = u.user_id
+            LEFT JOIN sponsor s ON dbc.sponsor_id = s.sponsor_id
+            WHERE 1=1 {date_filter} {sponsor_filter}
+        """)
+        params += date_params + ([sponsor_id] if sponsor_id else [])
+    
+    # 3. Password Changes (from change_log, plus account_changes if present)
+    if category in ['password_changes', 'all']:
+        date_filter, date_params = _build_date_filter(start_date, end_date, 'cl.occurred_at')
+        parts.append(f"""
+            SELECT 
+                cl.occurred_at AS date,
+                'Password Change' AS category,
+                NULL AS sponsor,
+                CONCAT(u.first_name, ' ', u.last_name) AS user,
+                REPLACE(cl.event_type, '_', ' ') AS action,
+                CONCAT('User ID: ', cl.user_id, ' | Email: ', u.email) AS details
+            FROM change_log cl
+            LEFT JOIN `user` u ON cl.user_id = u.user_id
+            WHERE cl.event_type LIKE 'PASSWORD%' {date_filter}
+        """)
+        params += date_params
+        
+        if 'account_changes' in optional_tables:
+            date_filter, date_params = _build_date_filter(start_date, end_date, 'ac.changed_at')
+            parts.append(f"""
+                SELECT 
+                    ac.changed_at AS date,
+                    'Password Change' AS category,
+                    NULL AS sponsor,
+                    CONCAT(u.first_name, ' ', u.last_name) AS user,
+                    ac.change_type AS action,
+                    CONCAT('User ID: ', ac.user_id, ' | Email: ', u.email) AS details
+                FROM account_changes ac
+                LEFT JOIN `user` u ON ac.user_id = u.user_id
+                WHERE ac.change_type = 'PASSWORD' {date_filter}
+            """)
+            params += date_params
+    
+    # 4. Login Attempts (from login_log)
+    if category in ['login_attempts', 'all']:
+        date_filter, date_params = _build_date_filter(start_date, end_date, 'll.occurred_at')
+        sponsor_filter = "AND s.sponsor_id = %s" if sponsor_id else ""
+        parts.append(f"""
+            SELECT 
+                ll.occurred_at AS date,
+                'Login Attempt' AS category,
+                s.name AS sponsor,
+                COALESCE(CONCAT(u.first_name, ' ', u.last_name), ll.email_attempted) AS user,
+                IF(ll.success = 1, 'Login Success', 'Login Failed') AS action,
+                CONCAT(
+                    'Email: ', ll.email_attempted,
+                    IF(ll.success = 0 AND ll.failure_reason IS NOT NULL, 
+                       CONCAT(' | Reason: ', ll.failure_reason),
+                       ''),
+                    ' | IP: ', COALESCE(ll.ip_address, 'Unknown')
+                ) AS details
+            FROM login_log ll
+            LEFT JOIN `user` u ON ll.user_id = u.user_id
+            LEFT JOIN sponsor s ON s.user_id = u.user_id
+            WHERE 1=1 {date_filter} {sponsor_filter}
+        """)
+        params += date_params + ([sponsor_id] if sponsor_id else [])
+    
+    query = " UNION ALL ".join(f"({part.strip()})" for part in parts) + " ORDER BY date DESC"
+    return query, tuple(params)
+
+
 # ============================================
 # ADMIN REPORT ENDPOINTS
 # ============================================
@@ -57,10 +192,12 @@ def _build_date_filter(start_date, end_date, date_column='date'):
 @admin_reports_bp.route("/api/admin/reports/sales", methods=["GET"])
 @token_required
 @require_role("admin")
+@read_only
 def admin_sales_report():
     """
     Get sales/purchase analytics
-    Query params: start_date, end_date, sponsor_id, view_type (summary/detailed)
+    Query params: start_date, end_date, sponsor_id, view_type (summary/detailed),
+    layout=columnar (compact column-major data, see _wants_columnar)
     """
     try:
         # Parse filters
@@ -113,8 +250,6 @@ def admin_sales_report():
             params.extend(date_params)
             query += " ORDER BY t.date DESC"
             
-            cur.execute(query, tuple(params))
-            
         else:
             # Summary view: aggregated by sponsor
             query = """
@@ -138,22 +273,27 @@ def admin_sales_report():
             query += date_filter
             params.extend(date_params)
             query += " GROUP BY s.sponsor_id, s.name ORDER BY total_sales DESC"
-            
-            cur.execute(query, tuple(params))
         
-        results = cur.fetchall() or []
-        
-        return jsonify({
+        response = {
             "report_type": "sales",
             "view_type": view_type,
             "filters": {
                 "start_date": start_date,
                 "end_date": end_date,
                 "sponsor_id": sponsor_id
-            },
-            "data": results
-        }), 200
+            }
+        }
         
+        if _wants_columnar():
+            response.update(layout="columnar", **columnar_payload(*fetch_columnar(conn, query, tuple(params))))
+            return jsonify(response), 200
+        
+        cur.execute(query, tuple(params))
+        response["data"] = cur.fetchall() or []
+        return jsonify(response), 200
+        
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in admin_sales_report: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
@@ -167,6 +307,7 @@ def admin_sales_report():
 @admin_reports_bp.route("/api/admin/reports/drivers", methods=["GET"])
 @token_required
 @require_role("admin")
+@read_only
 def admin_drivers_report():
     """
     Get driver activity analytics
@@ -244,6 +385,8 @@ def admin_drivers_report():
             "data": results
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in admin_drivers_report: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
@@ -257,6 +400,7 @@ def admin_drivers_report():
 @admin_reports_bp.route("/api/admin/reports/sponsors", methods=["GET"])
 @token_required
 @require_role("admin")
+@read_only
 def admin_sponsors_report():
     """
     Get sponsor analytics
@@ -312,6 +456,8 @@ def admin_sponsors_report():
             "data": results
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in admin_sponsors_report: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
@@ -325,6 +471,7 @@ def admin_sponsors_report():
 @admin_reports_bp.route("/api/admin/reports/sales-by-driver", methods=["GET"])
 @token_required
 @require_role("admin")
+@read_only
 def admin_sales_by_driver_report():
     """
     Sales by Driver Report
@@ -335,6 +482,7 @@ def admin_sales_by_driver_report():
     - end_date: YYYY-MM-DD (optional)
     - sponsor_id: int (optional) - filter to specific sponsor
     - driver_id: int (optional) - filter to specific driver
+    - layout: 'columnar' (optional) - compact column-major data, see _wants_columnar
     """
     conn = None
     cur = None
@@ -416,10 +564,7 @@ def admin_sales_by_driver_report():
             """
         
         params = tuple(date_params + additional_params)
-        cur.execute(query, params)
-        results = cur.fetchall() or []
-        
-        return jsonify({
+        response = {
             "report_type": "sales_by_driver",
             "view_type": view_type,
             "filters": {
@@ -427,10 +572,19 @@ def admin_sales_by_driver_report():
                 "end_date": end_date,
                 "sponsor_id": sponsor_id,
                 "driver_id": driver_id
-            },
-            "data": results
-        }), 200
+            }
+        }
+        
+        if _wants_columnar():
+            response.update(layout="columnar", **columnar_payload(*fetch_columnar(conn, query, params)))
+            return jsonify(response), 200
         
+        cur.execute(query, params)
+        response["data"] = cur.fetchall() or []
+        return jsonify(response), 200
+        
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in admin_sales_by_driver_report: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
@@ -444,6 +598,7 @@ def admin_sales_by_driver_report():
 @admin_reports_bp.route("/api/admin/reports/invoice", methods=["GET"])
 @token_required
 @require_role("admin")
+@read_only
 def admin_invoice_report():
     """
     Invoice Report
@@ -580,6 +735,8 @@ def admin_invoice_report():
             "summary": list(sponsor_totals.values())
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in admin_invoice_report: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
@@ -593,6 +750,7 @@ def admin_invoice_report():
 @admin_reports_bp.route("/api/admin/reports/audit-log", methods=["GET"])
 @token_required
 @require_role("admin")
+@read_only
 def admin_audit_log_report():
     """
     Audit Log Report
@@ -608,6 +766,7 @@ def admin_audit_log_report():
     - sponsor_id: int (optional) - filter to specific sponsor
     - category: string (optional) - filter by log type:
         'driver_applications', 'point_changes', 'password_changes', 'login_attempts', 'all'
+    - stream=1 / format=ndjson: stream the entries instead of buffering them (see utils.streaming)
     """
     conn = None
     cur = None
@@ -630,210 +789,35 @@ def admin_audit_log_report():
         conn = get_db_connection()
         cur = conn.cursor(dictionary=True)
         
-        audit_logs = []
-        
-        # Helper to parse pipe-delimited change_type string
-        def parse_change_data(change_type):
-            """Parse change_type like 'DRIVER_APPLICATION|driver_id:5|sponsor_id:2|status:ACTIVE|reason:Good driver'"""
-            data = {}
-            if not change_type:
-                return data
-            parts = change_type.split('|')
-            for part in parts:
-                if ':' in part:
-                    key, value = part.split(':', 1)
-                    data[key] = value
-            return data
-        
-        # Build date filters
-        date_filter_change, date_params_change = _build_date_filter(start_date, end_date, 'cl.occurred_at')
-        date_filter_login, date_params_login = _build_date_filter(start_date, end_date, 'll.occurred_at')
-        
-        # 1. Driver Applications (from alerts table - SPONSORSHIP_CHANGE type)
-        if category in ['driver_applications', 'all']:
-            try:
-                date_filter_alerts, date_params_alerts = _build_date_filter(start_date, end_date, 'a.date_created')
-                
-                sponsor_filter = "AND ds.sponsor_id = %s" if sponsor_id else ""
-                sponsor_params = [sponsor_id] if sponsor_id else []
-                
-                query_alerts = f"""
-                    SELECT 
-                        a.date_created AS date,
-                        'Driver Application' AS category,
-                        s.name AS sponsor,
-                        CONCAT(u.first_name, ' ', u.last_name) AS driver,
-                        a.details,
-                        ds.status,
-                        a.alert_id
-                    FROM alerts a
-                    JOIN alert_type_definitions atd ON a.alert_type_id = atd.alert_type_id
-                    JOIN `user` u ON a.user_id = u.user_id
-                    LEFT JOIN driver d ON u.user_id = d.user_id
-                    LEFT JOIN driver_sponsor ds ON d.driver_id = ds.driver_id AND a.related_id = ds.driver_sponsor_id
-                    LEFT JOIN sponsor s ON ds.sponsor_id = s.sponsor_id
-                    WHERE atd.alert_type = 'SPONSORSHIP_CHANGE' {date_filter_alerts} {sponsor_filter}
-                    ORDER BY a.date_created DESC
-                """
-                
-                cur.execute(query_alerts, tuple(date_params_alerts + sponsor_params))
-                sponsorship_alerts = cur.fetchall() or []
-                
-                for alert in sponsorship_alerts:
-                    status = alert.get('status', 'PENDING')
-                    action = 'Approved' if status == 'ACTIVE' else 'Rejected' if status == 'INACTIVE' else 'Pending'
-                    
-                    audit_logs.append({
-                        'date': alert['date'],
-                        'category': 'Driver Application',
-                        'sponsor': alert['sponsor'],
-                        'user': 'System',  # Alerts don't track who created them
-                        'action': action,
-                        'details': f"Driver: {alert['driver']}{' | ' + alert['details'] if alert['details'] else ''}"
-                    })
-            except Exception as e:
-                logger.debug(f"Error querying alerts for driver applications: {e}")
-        
-        # Also check driver_balance_changes table for point changes
-        if category in ['all', 'point_changes']:
-            try:
-                cur.execute("SHOW TABLES LIKE 'driver_balance_changes'")
-                if cur.fetchone():
-                    date_filter_dbc, date_params_dbc = _build_date_filter(start_date, end_date, 'dbc.changed_at')
-                    
-                    sponsor_filter = "AND dbc.sponsor_id = %s" if sponsor_id else ""
-                    sponsor_params = [sponsor_id] if sponsor_id else []
-                    
-                    query_dbc = f"""
-                        SELECT 
-                            dbc.changed_at AS date,
-                            'Point Change' AS category,
-                            s.name AS sponsor,
-                            CONCAT(u.first_name, ' ', u.last_name) AS driver,
-                            dbc.reason,
-                            dbc.balance_change_id
-                        FROM driver_balance_changes dbc
-                        JOIN driver d ON dbc.driver_id = d.driver_id
-                        JOIN `user` u ON d.user_id = u.user_id
-                        LEFT JOIN sponsor s ON dbc.sponsor_id = s.sponsor_id
-                        WHERE 1=1 {date_filter_dbc} {sponsor_filter}
-                        ORDER BY dbc.changed_at DESC
-                    """
-                    
-                    cur.execute(query_dbc, tuple(date_params_dbc + sponsor_params))
-                    balance_changes = cur.fetchall() or []
-                    
-                    for change in balance_changes:
-                        audit_logs.append({
-                            'date': change['date'],
-                            'category': 'Point Change',
-                            'sponsor': change['sponsor'],
-                            'user': 'System',  # No user tracked in this table
-                            'action': 'Balance Updated',
-                            'details': f"Driver: {change['driver']}{' | Reason: ' + change['reason'] if change['reason'] else ''}"
-                        })
-            except Exception as e:
-                logger.debug(f"driver_balance_changes table not found or error: {e}")
-        
-        # 3. Password Changes (from change_log)
-        if category in ['password_changes', 'all']:
-            query = f"""
-                SELECT 
-                    cl.occurred_at AS date,
-                    'Password Change' AS category,
-                    NULL AS sponsor,
-                    CONCAT(u.first_name, ' ', u.last_name) AS user,
-                    REPLACE(cl.change_type, '_', ' ') AS action,
-                    CONCAT('User ID: ', cl.user_id, ' | Email: ', u.email) AS details
-                FROM change_log cl
-                LEFT JOIN `user` u ON cl.user_id = u.user_id
-                WHERE cl.change_type LIKE '%PASSWORD%' {date_filter_change}
-                ORDER BY cl.occurred_at DESC
-            """
-            
-            cur.execute(query, tuple(date_params_change))
-            audit_logs.extend(cur.fetchall() or [])
-            
-            # Also check account_changes table if it exists
-            try:
-                # Check if account_changes table exists
-                cur.execute("SHOW TABLES LIKE 'account_changes'")
-                if cur.fetchone():
-                    # Build date filter for account_changes
-                    date_filter_ac, date_params_ac = _build_date_filter(start_date, end_date, 'ac.changed_at')
-                    
-                    query_ac = f"""
-                        SELECT 
-                            ac.changed_at AS date,
-                            'Password Change' AS category,
-                            NULL AS sponsor,
-                            CONCAT(u.first_name, ' ', u.last_name) AS user,
-                            ac.change_type AS action,
-                            CONCAT('User ID: ', ac.user_id, ' | Email: ', u.email) AS details
-                        FROM account_changes ac
-                        LEFT JOIN `user` u ON ac.user_id = u.user_id
-                        WHERE ac.change_type = 'PASSWORD' {date_filter_ac}
-                        ORDER BY ac.changed_at DESC
-                    """
-                    
-                    cur.execute(query_ac, tuple(date_params_ac))
-                    audit_logs.extend(cur.fetchall() or [])
-            except Exception as e:
-                # Table might not exist, just continue
-                logger.debug(f"account_changes table not found or error: {e}")
-        
-        # 4. Login Attempts (from login_log)
-        if category in ['login_attempts', 'all']:
-            query = f"""
-                SELECT 
-                    ll.occurred_at AS date,
-                    'Login Attempt' AS category,
-                    s.name AS sponsor,
-                    COALESCE(CONCAT(u.first_name, ' ', u.last_name), ll.email_attempted) AS user,
-                    IF(ll.success = 1, 'Login Success', 'Login Failed') AS action,
-                    CONCAT(
-                        'Email: ', ll.email_attempted,
-                        IF(ll.success = 0 AND ll.failure_reason IS NOT NULL, 
-                           CONCAT(' | Reason: ', ll.failure_reason),
-                           ''),
-                        ' | IP: ', COALESCE(ll.ip_address, 'Unknown')
-                    ) AS details
-                FROM login_log ll
-                LEFT JOIN `user` u ON ll.user_id = u.user_id
-                LEFT JOIN sponsor s ON s.user_id = u.user_id
-                WHERE 1=1 {date_filter_login}
-            """
-            
-            params = list(date_params_login)
-            if sponsor_id:
-                query += " AND s.sponsor_id = %s"
-                params.append(sponsor_id)
-            
-            query += " ORDER BY ll.occurred_at DESC"
-            
-            cur.execute(query, tuple(params))
-            audit_logs.extend(cur.fetchall() or [])
-        
-        # Sort all logs by date descending
-        audit_logs.sort(key=lambda x: x['date'], reverse=True)
+        query, params = _audit_log_query(cur, start_date, end_date, sponsor_id, category)
+        filters = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "sponsor_id": sponsor_id,
+            "category": category
+        }
+        
+        mode = stream_mode()
+        if mode:
+            return stream_query(
+                query, params, key="data", mode=mode,
+                transform=lambda rows: map(_audit_log_entry, rows),
+                head={"report_type": "audit_log", "filters": filters},
+                tail=lambda count: {"total_entries": count},
+            )
         
-        # Convert datetime objects to ISO format strings for JSON serialization
-        for log in audit_logs:
-            if log['date']:
-                log['date'] = log['date'].isoformat()
+        cur.execute(query, params)
+        audit_logs = [_audit_log_entry(row) for row in cur.fetchall() or []]
         
         return jsonify({
             "report_type": "audit_log",
-            "filters": {
-                "start_date": start_date,
-                "end_date": end_date,
-                "sponsor_id": sponsor_id,
-                "category": category
-            },
+            "filters": filters,
             "data": audit_logs,
             "total_entries": len(audit_logs)
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in admin_audit_log_report: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
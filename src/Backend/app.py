@@ -1,10 +1,15 @@
 import os
 import logging
-from flask import Flask
+from flask import Flask, jsonify, request
 from flask_caching import Cache
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
+
+# Load .env before importing the blueprints: modules below read their
+# settings (pool, query stats, hashing, audit, caches) at import time
+load_dotenv()
+
 import base64
 import os
 from sponsor_reports import sponsor_reports_bp
@@ -54,9 +59,12 @@ from account import account_bp
 from sponsor import sponsor_bp
 from admin_reports import admin_reports_bp
 from orders import orders_bp
+from metrics import metrics_bp
+from utils.db import release_request_connections, primary_unavailable, DatabaseUnavailable, log_db_identity
+from utils.password_hashing import HashingOverloaded
+import product_sync
 
 # App initialization
-load_dotenv()
 configure_logging()  # <<— initialize logging before anything logs
 
 # Determine static folder path using absolute paths
@@ -121,6 +129,43 @@ app.register_blueprint(sponsor_bp)
 app.register_blueprint(admin_reports_bp)
 app.register_blueprint(sponsor_reports_bp)
 app.register_blueprint(orders_bp)
+app.register_blueprint(metrics_bp)
+
+# Return pooled DB connections a handler forgot to close (and log the leak)
+app.teardown_request(release_request_connections)
+
+# Log which database this process talks to once, instead of on every login
+log_db_identity()
+product_sync.start()  # keep the local product mirror current
+
+# While the database is down, fail API calls fast instead of tying up workers
+def _db_unavailable_response(retry_after):
+    resp = jsonify({"error": "Database temporarily unavailable, please retry shortly"})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = str(retry_after)
+    return resp
+
+@app.before_request
+def reject_when_db_down():
+    # Metrics stay reachable so the outage can be inspected
+    if not request.path.startswith('/api/') or request.path.startswith('/api/admin/metrics/'):
+        return None
+    down, retry_after = primary_unavailable()
+    if down:
+        return _db_unavailable_response(retry_after)
+    return None
+
+@app.errorhandler(DatabaseUnavailable)
+def handle_db_unavailable(e):
+    logging.getLogger(__name__).warning(f"DB unavailable: {e}")
+    return _db_unavailable_response(getattr(e, 'retry_after', 1))
+
+@app.errorhandler(HashingOverloaded)
+def handle_hashing_overloaded(e):
+    resp = jsonify({"error": "Server busy, please retry shortly"})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = str(e.retry_after)
+    return resp
 
 # Serve React App (for production)
 # This catch-all route must be registered LAST so API routes take priority
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Script to apply pending SQL migrations from "MySQL Schema/migrations".
+Files run once each, in filename order; applied ones are recorded in the
+schema_migrations table. Migrations keep to plain statements separated by
+";" at the end of a line (no DELIMITER blocks).
+"""
+import sys
+import os
+import glob
+
+# Add the Backend directory to path so we can import db utility
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.db import get_db_connection, DatabaseUnavailable
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MySQL Schema", "migrations")
+
+
+def sql_statements(path):
+    """Statements of a migration file, comments stripped."""
+    with open(path, encoding="utf-8") as fh:
+        lines = [line for line in fh if not line.lstrip().startswith("--")]
+    for stmt in "".join(lines).split(";\n"):
+        stmt = stmt.strip().rstrip(";").strip()
+        if stmt:
+            yield stmt
+
+
+def apply_migrations():
+    """Apply every migration not yet recorded in schema_migrations"""
+    conn = None
+    cursor = None
+    try:
+        try:
+            conn = get_db_connection()
+        except DatabaseUnavailable as e:
+            print(f"Failed to connect to database: {e}")
+            return 1
+
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                filename varchar(255) NOT NULL,
+                applied_at datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+                PRIMARY KEY (filename)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """)
+        cursor.execute("SELECT filename FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        pending = [p for p in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql")))
+                   if os.path.basename(p) not in applied]
+        if not pending:
+            print("No pending migrations")
+            return 0
+
+        for path in pending:
+            name = os.path.basename(path)
+            print(f"Applying {name}...")
+            # DDL commits implicitly in MySQL, so each file must be safe to re-run
+            for stmt in sql_statements(path):
+                cursor.execute(stmt)
+                if cursor.with_rows:
+                    cursor.fetchall()
+            cursor.execute("INSERT INTO schema_migrations (filename) VALUES (%s)", (name,))
+            conn.commit()
+
+        print(f"Applied {len(pending)} migration(s)")
+        return 0
+
+    except Exception as e:
+        print(f"Error applying migrations: {e}")
+        if conn:
+            conn.rollback()
+        return 1
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+if __name__ == '__main__':
+    sys.exit(apply_migrations())
@@ -2,8 +2,7 @@
 Audit logging helper functions for various system events.
 Follows DRY, KISS, and SOLID principles.
 """
-import datetime
-from utils.db import get_db_connection
+from audit_logging import audit_writer
 from flask import request
 import logging
 
@@ -27,29 +26,9 @@ def log_driver_application(driver_id, sponsor_id, status, reason=None, actioned_
         reason: Optional reason for rejection
         actioned_by: User ID of the person who approved/rejected
     """
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Store as JSON-like text in change_type
-        change_data = f"DRIVER_APPLICATION|driver_id:{driver_id}|sponsor_id:{sponsor_id}|status:{status}"
-        if reason:
-            change_data += f"|reason:{reason}"
-        
-        cursor.execute(
-            """
-            INSERT INTO change_log (user_id, change_type, occurred_at)
-            VALUES (%s, %s, %s)
-            """,
-            (actioned_by, change_data, datetime.datetime.now(datetime.timezone.utc))
-        )
-        conn.commit()
-        logger.info(f"Logged driver application: driver={driver_id}, sponsor={sponsor_id}, status={status}")
-    except Exception as e:
-        logger.error(f'Driver application log error: {e}')
-    finally:
-        if 'conn' in locals() and conn:
-            conn.close()
+    audit_writer.log_change('DRIVER_APPLICATION', actor=actioned_by, driver_id=driver_id,
+                            sponsor_id=sponsor_id, status=status, reason=reason)
+    logger.info(f"Logged driver application: driver={driver_id}, sponsor={sponsor_id}, status={status}")
 
 
 def log_point_change(driver_id, sponsor_id, points, reason=None, actioned_by=None):
@@ -63,28 +42,9 @@ def log_point_change(driver_id, sponsor_id, points, reason=None, actioned_by=Non
         reason: Optional reason for the change
         actioned_by: User ID of the person making the change
     """
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        change_data = f"POINT_CHANGE|driver_id:{driver_id}|sponsor_id:{sponsor_id}|points:{points}"
-        if reason:
-            change_data += f"|reason:{reason}"
-        
-        cursor.execute(
-            """
-            INSERT INTO change_log (user_id, change_type, occurred_at)
-            VALUES (%s, %s, %s)
-            """,
-            (actioned_by, change_data, datetime.datetime.now(datetime.timezone.utc))
-        )
-        conn.commit()
-        logger.info(f"Logged point change: driver={driver_id}, sponsor={sponsor_id}, points={points}")
-    except Exception as e:
-        logger.error(f'Point change log error: {e}')
-    finally:
-        if 'conn' in locals() and conn:
-            conn.close()
+    audit_writer.log_change('POINT_CHANGE', actor=actioned_by, driver_id=driver_id,
+                            sponsor_id=sponsor_id, points=points, reason=reason)
+    logger.info(f"Logged point change: driver={driver_id}, sponsor={sponsor_id}, points={points}")
 
 
 def log_password_change(user_id, change_type='PASSWORD_CHANGE'):
@@ -95,21 +55,5 @@ def log_password_change(user_id, change_type='PASSWORD_CHANGE'):
         user_id: The user whose password changed
         change_type: Type of change (PASSWORD_CHANGE, PASSWORD_RESET, etc.)
     """
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """
-            INSERT INTO change_log (user_id, change_type, occurred_at)
-            VALUES (%s, %s, %s)
-            """,
-            (user_id, change_type, datetime.datetime.now(datetime.timezone.utc))
-        )
-        conn.commit()
-        logger.info(f"Logged password change: user={user_id}, type={change_type}")
-    except Exception as e:
-        logger.error(f'Password change log error: {e}')
-    finally:
-        if 'conn' in locals() and conn:
-            conn.close()
+    audit_writer.log_change(change_type, actor=user_id)
+    logger.info(f"Logged password change: user={user_id}, type={change_type}")
@@ -0,0 +1,145 @@
+"""
+Batched background writer for audit rows (login_log, change_log).
+
+Request handlers only put a tuple on a bounded in-process queue. A
+background job drains it every AUDIT_FLUSH_SECONDS, or as soon as
+AUDIT_BATCH_SIZE rows are waiting, and inserts them with one executemany
+and one commit per batch. Whatever is still queued is written at exit.
+
+Backpressure: when the queue is full the caller waits up to
+AUDIT_QUEUE_WAIT seconds for room, then spills its row to the local
+journal (see audit_logging.journal) instead of touching the database, so
+a slow or unavailable database never adds a DB round trip to a request.
+Batches that fail to insert are journaled too and replayed in bulk once
+the database is back. AUDIT_QUEUE_SIZE=0 writes every row inline.
+
+  AUDIT_BATCH_SIZE=500   AUDIT_FLUSH_SECONDS=1
+  AUDIT_QUEUE_SIZE=10000 AUDIT_QUEUE_WAIT=0.1
+"""
+import datetime
+import logging
+import os
+import queue
+import threading
+from utils.background import PeriodicTask
+from utils.db import get_db_connection
+from audit_logging.journal import Journal
+from utils.env import env_int, env_float
+
+logger = logging.getLogger('audit')
+
+
+BATCH_SIZE = max(1, env_int('AUDIT_BATCH_SIZE', 500))
+FLUSH_SECONDS = env_float('AUDIT_FLUSH_SECONDS', 1)
+QUEUE_SIZE = env_int('AUDIT_QUEUE_SIZE', 10_000)
+QUEUE_WAIT = env_float('AUDIT_QUEUE_WAIT', 0.1)
+
+
+class AuditWriter:
+    """Queue rows for one INSERT statement and write them in batches."""
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        self._queue = queue.Queue(maxsize=max(QUEUE_SIZE, 0))
+        self._flush_lock = threading.Lock()
+        self._task = PeriodicTask(f'audit-{name}', FLUSH_SECONDS, self.flush, final_run=True)
+        self.journal = Journal(name, self._insert)
+        self._pid = None
+        self.written = 0
+        self.spilled = 0
+        self.failed = 0
+
+    def submit(self, row):
+        """Queue one row (a tuple matching sql's placeholders)."""
+        if QUEUE_SIZE <= 0:
+            self._write([row])
+            return
+        if self._pid != os.getpid():
+            # First row in this process: also replay journals an earlier run left
+            self._pid = os.getpid()
+            self.journal.start()
+        self._task.start()
+        try:
+            self._queue.put(row, timeout=QUEUE_WAIT)
+        except queue.Full:
+            # Writer is behind: journal the row (no fsync here) rather than drop it
+            self.spilled += 1
+            self.journal.append([row])
+            return
+        if self._queue.qsize() >= BATCH_SIZE:
+            self._task.trigger()
+
+    def flush(self):
+        """Write everything queued so far, BATCH_SIZE rows per statement."""
+        total = 0
+        with self._flush_lock:
+            while True:
+                batch = []
+                try:
+                    while len(batch) < BATCH_SIZE:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if not batch:
+                    break
+                total += self._write(batch)
+                if len(batch) < BATCH_SIZE:
+                    break
+        return total
+
+    def _insert(self, rows):
+        conn = get_db_connection(shared=False)
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(self.sql, rows)
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        self.written += len(rows)
+
+    def _write(self, rows):
+        try:
+            self._insert(rows)
+        except Exception as e:
+            self.failed += len(rows)
+            logger.error(f'{self.name} audit write of {len(rows)} rows failed, journaling them: {e}')
+            try:
+                self.journal.append(rows, durable=True)
+            except OSError as oe:
+                logger.error(f'{self.name} journal append failed, {len(rows)} audit rows lost: {oe}')
+            return 0
+        return len(rows)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'spilled': self.spilled,
+            'failed': self.failed,
+            'journal': self.journal.stats(),
+        }
+
+
+login_log = AuditWriter('login_log', """
+    INSERT INTO login_log (
+        occurred_at, user_id, email_attempted, success, failure_reason, ip_address, user_agent, source, mfa_used, request_id, session_id
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+""")
+
+change_log = AuditWriter('change_log', """
+    INSERT INTO change_log (
+        user_id, change_type, event_type, driver_id, sponsor_id, points, status, reason, occurred_at
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+""")
+
+
+def log_change(event_type, actor=None, driver_id=None, sponsor_id=None, points=None,
+               status=None, reason=None):
+    """Queue a change_log row with its typed columns (migration 002); actor is the acting user_id."""
+    change_log.submit((
+        actor, event_type, event_type, driver_id, sponsor_id, points, status,
+        reason[:255] if reason else reason,
+        datetime.datetime.now(datetime.timezone.utc),
+    ))
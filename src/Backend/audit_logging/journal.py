@@ -0,0 +1,200 @@
+"""
+Local spill journal for audit rows the database could not take.
+
+When a batch insert fails (or the in-memory queue is full) the rows are
+appended to an NDJSON file per table and process instead of being
+dropped. Appends only reach the page cache; a background job fsyncs dirty
+journals every AUDIT_JOURNAL_FSYNC_SECONDS, so a burst of spills costs one
+fsync, not one per row. Failed batches from the writer thread are synced
+immediately.
+
+A replayer runs every AUDIT_JOURNAL_REPLAY_SECONDS while journal files
+exist. It claims them by atomic rename, so several workers never replay
+the same file, and bulk inserts them. A claimed file is deleted only after
+its rows are committed. If the database is still down the file is put back
+for the next round. Delivery is at-least-once: a crash between commit and
+delete replays that file again. Files left by dead processes (including a
+previous run) are picked up too.
+
+  AUDIT_JOURNAL_DIR=<Backend>/audit_journal   AUDIT_JOURNAL_MAX_MB=256
+  AUDIT_JOURNAL_FSYNC_SECONDS=0.2             AUDIT_JOURNAL_REPLAY_SECONDS=10
+"""
+import datetime
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from utils.background import PeriodicTask
+from utils.env import env_float
+
+logger = logging.getLogger('audit')
+
+
+JOURNAL_DIR = os.getenv('AUDIT_JOURNAL_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'audit_journal')
+MAX_BYTES = int(env_float('AUDIT_JOURNAL_MAX_MB', 256) * 1024 * 1024)
+FSYNC_SECONDS = env_float('AUDIT_JOURNAL_FSYNC_SECONDS', 0.2)
+REPLAY_SECONDS = env_float('AUDIT_JOURNAL_REPLAY_SECONDS', 10)
+REPLAY_BATCH = 1000
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {'$dt': value.isoformat()}
+    raise TypeError(f'cannot journal {type(value).__name__}')
+
+
+def _decode(row):
+    return tuple(
+        datetime.datetime.fromisoformat(v['$dt']) if isinstance(v, dict) and '$dt' in v else v
+        for v in row
+    )
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Journal:
+    """
+    Append-only spill file for one table. `insert(rows)` must write and
+    commit the rows or raise; it is only called from the replayer.
+    """
+
+    def __init__(self, name, insert):
+        self.name = name
+        self.insert = insert
+        self._lock = threading.Lock()
+        self._fh = None
+        self._fh_pid = None
+        self._dirty = False
+        self.spilled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self._syncer = PeriodicTask(f'audit-journal-fsync-{name}', FSYNC_SECONDS, self.sync, final_run=True)
+        self._replayer = PeriodicTask(f'audit-journal-replay-{name}', REPLAY_SECONDS, self.replay)
+
+    def _path(self, pid):
+        return os.path.join(JOURNAL_DIR, f'{self.name}.{pid}.ndjson')
+
+    def _open(self):
+        # Caller holds _lock. A forked worker gets its own file.
+        if self._fh is None or self._fh_pid != os.getpid():
+            os.makedirs(JOURNAL_DIR, exist_ok=True)
+            self._fh = open(self._path(os.getpid()), 'a', encoding='utf-8')
+            self._fh_pid = os.getpid()
+        return self._fh
+
+    def append(self, rows, durable=False):
+        """Spill rows; durable=True fsyncs before returning (background callers only)."""
+        lines = ''.join(json.dumps(list(row), default=_encode) + '\n' for row in rows)
+        with self._lock:
+            fh = self._open()
+            if fh.tell() + len(lines) > MAX_BYTES:
+                self.dropped += len(rows)
+                logger.error(f'{self.name} journal is full ({MAX_BYTES} bytes); dropped {len(rows)} audit rows')
+                return
+            fh.write(lines)
+            fh.flush()
+            self.spilled += len(rows)
+            if durable:
+                os.fsync(fh.fileno())
+            else:
+                self._dirty = True
+        if not durable:
+            self._syncer.start()
+        self._replayer.start()
+
+    def sync(self):
+        with self._lock:
+            if self._dirty and self._fh is not None and self._fh_pid == os.getpid():
+                os.fsync(self._fh.fileno())
+                self._dirty = False
+
+    def start(self):
+        """Replay journals left by an earlier run, if there are any."""
+        if glob.glob(os.path.join(JOURNAL_DIR, f'{self.name}.*')):
+            self._replayer.start()
+
+    def _rotate(self):
+        """Rename live journals (ours, and those of dead processes) to *.pending."""
+        with self._lock:
+            if self._fh is not None and self._fh_pid == os.getpid():
+                os.fsync(self._fh.fileno())
+                self._fh.close()
+                self._fh = None
+                self._dirty = False
+        for path in glob.glob(os.path.join(JOURNAL_DIR, f'{self.name}.*.ndjson')):
+            pid = int(path.rsplit('.', 2)[-2])
+            if pid == os.getpid() or not _pid_alive(pid):
+                try:
+                    os.rename(path, f'{path}.{time.time_ns()}.pending')
+                except FileNotFoundError:
+                    pass  # another worker rotated it first
+
+    def _claim(self):
+        """Atomically take pending files (and files a dead replayer left claimed)."""
+        claimed = []
+        candidates = glob.glob(os.path.join(JOURNAL_DIR, f'{self.name}.*.pending'))
+        for path in glob.glob(os.path.join(JOURNAL_DIR, f'{self.name}.*.replaying.*')):
+            if not _pid_alive(int(path.rsplit('.', 1)[-1])):
+                candidates.append(path)
+        for path in sorted(candidates):
+            base = path.rsplit('.replaying.', 1)[0]
+            target = f'{base}.replaying.{os.getpid()}'
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue
+            claimed.append((target, base))
+        return claimed
+
+    def replay(self):
+        """Bulk insert every journaled row; returns the number replayed."""
+        if not os.path.isdir(JOURNAL_DIR):
+            return 0
+        self._rotate()
+        total = 0
+        for path, pending in self._claim():
+            rows = []
+            with open(path, encoding='utf-8') as fh:
+                for line in fh:
+                    try:
+                        rows.append(_decode(json.loads(line)))
+                    except ValueError:
+                        # Torn last line from a crash mid-append
+                        logger.warning(f'Skipping unreadable line in {path}')
+            done = 0
+            try:
+                while done < len(rows):
+                    self.insert(rows[done:done + REPLAY_BATCH])
+                    done += REPLAY_BATCH
+            except Exception as e:
+                logger.error(f'{self.name} journal replay failed, will retry: {e}')
+                if done:
+                    # Keep only the batches that were not committed
+                    with open(path, 'w', encoding='utf-8') as fh:
+                        fh.writelines(json.dumps(list(row), default=_encode) + '\n' for row in rows[done:])
+                        fh.flush()
+                        os.fsync(fh.fileno())
+                os.rename(path, pending)
+                total += done
+                break
+            os.remove(path)
+            total += len(rows)
+            logger.info(f'Replayed {len(rows)} journaled {self.name} rows')
+        self.replayed += total
+        if total == 0 and not glob.glob(os.path.join(JOURNAL_DIR, f'{self.name}.*')):
+            self._replayer.stop()
+        return total
+
+    def stats(self):
+        return {'spilled': self.spilled, 'replayed': self.replayed, 'dropped': self.dropped}
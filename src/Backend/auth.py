@@ -1,11 +1,14 @@
 import os
 import datetime
+import hashlib
 import logging
+import threading
+import time
 import traceback
 import datetime
+from collections import OrderedDict
 from flask import Blueprint, request, jsonify, g, redirect, current_app
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import (
     create_access_token,
     set_access_cookies,
@@ -13,7 +16,12 @@ from flask_jwt_extended import (
     verify_jwt_in_request,
     get_jwt,
 )
-from utils.db import get_db_connection
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import InvalidTokenError
+from utils.db import get_db_connection, DatabaseUnavailable
+from utils.env import env_int
+from utils import identity, login_throttle, revocation, sessions
+from utils.password_hashing import hash_password, verify_password, needs_rehash, rehash_later, HashingOverloaded
 from audit_logging.login_audit_logs import log_login_attempt, log_password_change
 
 # =========================
@@ -42,12 +50,6 @@ def _redact(d: dict) -> dict:
             safe[k] = "***REDACTED***"
     return safe
 
-def _log_db_identity(cur):
-    cur.execute("SELECT DATABASE(), @@hostname, CURRENT_USER()")
-    db, host, user = cur.fetchone()
-    logger.info(f"DB identity => database={db} host={host} current_user={user}")
-    return db, host, user
-
 def _exec(cur, sql, params=None, label=None):
     label = f"{label}: " if label else ""
     logger.debug(f"{label}SQL => {sql}  PARAMS => {params}")
@@ -56,6 +58,23 @@ def _exec(cur, sql, params=None, label=None):
 
 auth_bp = Blueprint("auth_bp", __name__, url_prefix="/api")
 
+# Everything login needs in one round trip: credentials, role, role ids and lockout state
+SQL_LOGIN_LOOKUP = """
+    SELECT uc.user_id, uc.password, u.type_id, s.sponsor_id, d.driver_id,
+           li.failed_attempts, li.is_locked, li.locked_until
+    FROM user_credentials uc
+    LEFT JOIN `user` u ON u.user_id = uc.user_id
+    LEFT JOIN sponsor s ON s.user_id = uc.user_id
+    LEFT JOIN driver d ON d.user_id = uc.user_id
+    LEFT JOIN login_info li ON li.user_id = uc.user_id
+    WHERE uc.username_lc = LOWER(%s)
+    LIMIT 1
+"""
+# Usernames are matched through the indexed generated column
+# (uq_usercred_username_lc); `username = %s` cannot use it and scans the table.
+SQL_USER_ID_BY_USERNAME = "SELECT user_id FROM user_credentials WHERE username_lc = LOWER(%s)"
+ROLE_MAP = {1: 'admin', 2: 'sponsor', 3: 'driver'}
+
 # =========================
 # REGISTER
 # =========================
@@ -85,15 +104,13 @@ def register():
     # Force driver type (3). We no longer register admins/sponsors from this endpoint.
     type_id = 3
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = hash_password(password)
     conn = None
     try:
         conn = get_db_connection()
         conn.autocommit = False
         cur = conn.cursor()
 
-        _ = _log_db_identity(cur)
-
         # 1) user
         _exec(cur,
               "INSERT INTO `user` (first_name, last_name, email, ssn, city, state, country, type_id) "
@@ -135,6 +152,8 @@ def register():
             'user_id': user_id
         }), 201
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
@@ -149,6 +168,26 @@ def register():
 # =========================
 # LOGIN
 # =========================
+def _throttled(retry_after):
+    resp = jsonify({'error': 'Too many login attempts, please try again later'})
+    resp.status_code = 429
+    resp.headers['Retry-After'] = str(retry_after)
+    return resp
+
+
+def _store_rehash(user_id, old_hash, new_hash):
+    """Swap in an upgraded hash unless the password changed meanwhile."""
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute("UPDATE user_credentials SET password = %s WHERE user_id = %s AND password = %s",
+                    (new_hash, user_id, old_hash))
+        conn.commit()
+        cur.close()
+        logger.info(f"Rehashed password for user_id={user_id} (rows={cur.rowcount})")
+    finally:
+        conn.close()
+
 @auth_bp.post("/login")
 def login():
     data = request.get_json() or {}
@@ -161,54 +200,83 @@ def login():
         logger.warning("Validation failed: missing username or password")
         return jsonify({'error': 'Missing username or password'}), 400
 
+    # Rejected before any lookup or hashing while the username or IP is throttled
+    ip = request.remote_addr
+    wait = login_throttle.check(username, ip)
+    if wait:
+        logger.info(f"Login throttled for {username!r} from {ip} ({wait}s)")
+        return _throttled(wait)
+
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(shared=False)
         cur = conn.cursor(dictionary=True)
 
-        _log_db_identity(cur)
-
-        _exec(cur, "SELECT user_id, password FROM user_credentials WHERE username = %s",
-              (username,), label="fetch credentials")
+        _exec(cur, SQL_LOGIN_LOOKUP, (username,), label="fetch credentials")
         cred = cur.fetchone()
+        cur.close()
+        # Nothing else in login touches the DB; free the connection before the (slow) hash check
+        conn.close()
+        conn = None
         if not cred:
             logger.info("Login failed: NO_SUCH_USER")
+            login_throttle.record_failure(username, ip)
             log_login_attempt(None, username, False, failure_reason='NO_SUCH_USER')
             return jsonify({'error': 'Invalid username or password'}), 401
 
         user_id = cred['user_id']
         hashed_password = cred['password']
 
-        ok = check_password_hash(hashed_password, password) or (hashed_password == password)  # temporary fallback
+        if cred['is_locked']:
+            wait = login_throttle.lock_from_db(username, cred['locked_until'])
+            if wait:
+                logger.info(f"Login failed: LOCKED_OUT for user_id={user_id}")
+                log_login_attempt(user_id, username, False, failure_reason='LOCKED_OUT')
+                return _throttled(wait)
+
+        ok = verify_password(hashed_password, password)
         if not ok:
             logger.info(f"Login failed: BAD_PASSWORD for user_id={user_id}")
+            login_throttle.record_failure(username, ip, user_id)
             log_login_attempt(user_id, username, False, failure_reason='BAD_PASSWORD')
             return jsonify({'error': 'Invalid username or password'}), 401
 
-        cur.execute("SELECT type_id FROM `user` WHERE user_id = %s", (user_id,))
-        urow = cur.fetchone() or {}
-        type_id = urow.get('type_id') if isinstance(urow, dict) else (urow[0] if urow else None)
-        role_map = {1: 'admin', 2: 'sponsor', 3: 'driver'}
-        role = role_map.get(type_id, 'user')
+        login_throttle.record_success(username, user_id,
+                                      had_failures=bool(cred['failed_attempts'] or cred['is_locked']))
+
+        role = ROLE_MAP.get(cred['type_id'], 'user')
+        identity.remember(user_id, cred['sponsor_id'], cred['driver_id'])
+        if needs_rehash(hashed_password):
+            # Outdated parameters (or legacy plaintext): upgrade off the response path
+            rehash_later(password, lambda new_hash: _store_rehash(user_id, hashed_password, new_hash))
 
         logger.info(f"Login success: user_id={user_id} role={role}")
         log_login_attempt(user_id, username, True)
 
         # Create access token and include user info in claims
         remember = bool(data.get('remember'))
+        if remember:
+            lifetime = 30 * 24 * 3600
+        else:
+            lifetime = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 24 * 3600)
+            if isinstance(lifetime, datetime.timedelta):
+                lifetime = lifetime.total_seconds()
+        # Server-side session row; the token is only honoured while it exists
+        sid = sessions.create(user_id, lifetime, ip, request.headers.get('User-Agent'))
+        claims = {'role': role, 'user_id': user_id, 'username': username, 'sid': sid}
         # If the user asked to be remembered, extend token lifetime (30 days).
         if remember:
             expires = datetime.timedelta(days=30)
             logger.info(f"Issuing remembered token for user_id={user_id} (expires in 30 days)")
             access_token = create_access_token(
                 identity=str(user_id),
-                additional_claims={'role': role, 'user_id': user_id, 'username': username},
+                additional_claims=claims,
                 expires_delta=expires
             )
         else:
             access_token = create_access_token(
                 identity=str(user_id),
-                additional_claims={'role': role, 'user_id': user_id, 'username': username}
+                additional_claims=claims
             )
         resp = jsonify({'role': role})
         # Set cookie manually so we can control whether it's a session cookie
@@ -228,6 +296,8 @@ def login():
                             path='/')
         return resp, 200
 
+    except (DatabaseUnavailable, HashingOverloaded):
+        raise
     except Exception as e:
         logger.error(f"Error in /api/login: {e}\n{traceback.format_exc()}")
         log_login_attempt(None, username, False, failure_reason='OTHER')
@@ -246,23 +316,31 @@ def password_reset():
     if not username or not newpassword:
         return jsonify({'error': 'Missing username or new password'}), 400
 
+    # Hash before taking a DB connection so it isn't held during the hash
+    hashed_password = hash_password(newpassword)
+
     conn = None
     try:
         conn = get_db_connection()
         cur = conn.cursor()
 
-        _log_db_identity(cur)
+        cur.execute(SQL_USER_ID_BY_USERNAME, (username,))
+        row = cur.fetchone()
+        if not row:
+            return jsonify({'error': 'User not found'}), 404
+        reset_user_id = row[0]
 
-        hashed_password = generate_password_hash(newpassword)
+        _exec(cur, "UPDATE user_credentials SET password=%s WHERE user_id=%s",
+              (hashed_password, reset_user_id), label="update password")
 
-        _exec(cur, "UPDATE user_credentials SET password=%s WHERE username=%s",
-              (hashed_password, username), label="update password")
-        if cur.rowcount == 0:
-            return jsonify({'error': 'User not found'}), 404
+        # Sign out every existing session of this account
+        sessions.revoke_user(reset_user_id, conn)
         
         #log_password_change(None, username, source='WEB')
 
         conn.commit()
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
@@ -281,29 +359,156 @@ def logout():
     try:
         resp = jsonify({'msg': 'Logout successful'})
         cookie_name = current_app.config.get('JWT_ACCESS_COOKIE_NAME', 'access_token_cookie')
+        claims = None
+        try:
+            claims = current_claims()
+        except (JWTExtendedException, InvalidTokenError):
+            pass  # no valid token: nothing to revoke
+        if claims:
+            # End the session first and on its own, so a failed revoked_tokens
+            # write cannot leave the current_sessions row alive
+            try:
+                sessions.revoke(claims.get('sid'))
+            finally:
+                revocation.revoke(claims, 'logout')
+        forget_token(request.cookies.get(cookie_name))
         resp.delete_cookie(cookie_name, path='/')
         try:
             unset_jwt_cookies(resp)
         except Exception:
             pass
         return resp, 200
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
-        logger.error(f"Error during logout: {e}")
+        logger.error(f"Error during logout: {e}\n{traceback.format_exc()}")
         return jsonify({'error': 'Logout failed'}), 500
 
+# =========================
+# Verified-claims cache
+# =========================
+# token_required and require_role are stacked on most endpoints, and handlers
+# read the claims again; verify each token once per request, and keep recently
+# verified tokens (keyed by digest, never the raw token) until they expire.
+JWT_CLAIMS_CACHE_SIZE = env_int('JWT_CLAIMS_CACHE_SIZE', 4096)
+
+_claims_cache = OrderedDict()   # sha256(token) -> (claims, exp)
+_claims_lock = threading.Lock()
+
+
+def _raw_token():
+    """The encoded access token from the locations flask_jwt_extended reads."""
+    locations = current_app.config.get('JWT_TOKEN_LOCATION', ['cookies'])
+    if isinstance(locations, str):
+        locations = [locations]
+    if 'cookies' in locations:
+        cookie_name = current_app.config.get('JWT_ACCESS_COOKIE_NAME', 'access_token_cookie')
+        token = request.cookies.get(cookie_name)
+        if token:
+            return token
+    if 'headers' in locations:
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            return header[7:].strip() or None
+    return None
+
+
+def _cacheable():
+    # With cookie CSRF protection on, state-changing requests must go through
+    # the library so the double-submit token is checked every time
+    if request.method in ('GET', 'HEAD', 'OPTIONS'):
+        return True
+    return not current_app.config.get('JWT_COOKIE_CSRF_PROTECT', True)
+
+
+def current_claims():
+    """
+    Verified JWT claims for this request (raises if the token is missing or
+    invalid). Verification runs at most once per request; a token verified by
+    an earlier request is served from the process cache until its exp.
+    """
+    claims = g.get('_jwt_claims')
+    if claims is not None:
+        return claims
+
+    token = _raw_token()
+    key = hashlib.sha256(token.encode()).digest() if token and JWT_CLAIMS_CACHE_SIZE > 0 else None
+    if key is not None and _cacheable():
+        with _claims_lock:
+            hit = _claims_cache.get(key)
+            if hit is not None:
+                if hit[1] > time.time():
+                    _claims_cache.move_to_end(key)
+                    g._jwt_claims = hit[0]
+                    return hit[0]
+                del _claims_cache[key]
+
+    verify_jwt_in_request()
+    claims = get_jwt() or {}
+    exp = claims.get('exp')
+    if key is not None and exp:
+        with _claims_lock:
+            _claims_cache[key] = (claims, exp)
+            _claims_cache.move_to_end(key)
+            while len(_claims_cache) > JWT_CLAIMS_CACHE_SIZE:
+                _claims_cache.popitem(last=False)
+    g._jwt_claims = claims
+    return claims
+
+
+def forget_token(token):
+    """Drop a token from the verified-claims cache (e.g. on logout)."""
+    if token:
+        with _claims_lock:
+            _claims_cache.pop(hashlib.sha256(token.encode()).digest(), None)
+
+
+def _bind_identity(claims):
+    """Put the caller's sponsor_id / driver_id on g (cached, see utils.identity)."""
+    if 'sponsor_id' in g:
+        return
+    ids = identity.resolve(claims.get('user_id') or claims.get('sub'))
+    g.sponsor_id = ids.sponsor_id
+    g.driver_id = ids.driver_id
+
+
+def _token_ok(claims):
+    """
+    False if the token's jti was revoked (see utils.revocation) or, for
+    tokens with a sid claim, once their session row is gone (see utils.sessions).
+    """
+    ok = g.get('_token_ok')
+    if ok is None:
+        ok = not revocation.is_revoked(claims.get('jti'))
+        sid = claims.get('sid')
+        if ok and sid:
+            # Impersonation tokens carry the session of the admin/sponsor who started it
+            owner = (claims.get('original_user_id') or claims.get('impersonated_by')
+                     or claims.get('user_id') or claims.get('sub'))
+            ok = sessions.is_active(sid, owner)
+            if ok:
+                sessions.touch(sid)
+        g._token_ok = ok
+    return ok
+
+
 # To protect api endpoints
 def token_required(f):
     """Compatibility wrapper that verifies JWT in request (header or cookie) and
     stores claims in `g.decoded_token` for downstream code expecting that variable.
+    Also sets `g.sponsor_id` / `g.driver_id` (None when the caller has no such row).
     """
     @wraps(f)
     def wrapper(*args, **kwargs):
         cookie_name = current_app.config.get('JWT_ACCESS_COOKIE_NAME', 'access_token_cookie')
         has_cookie = cookie_name in request.cookies
         try:
-            verify_jwt_in_request()
-            claims = get_jwt() or {}
+            claims = current_claims()
+            if not _token_ok(claims):
+                raise PermissionError('token revoked or session expired')
             g.decoded_token = claims
+        except DatabaseUnavailable:
+            raise
         except Exception as exc:
             accept = request.headers.get('Accept', '')
             is_json_request = request.path.startswith('/api/') or 'application/json' in accept
@@ -311,6 +516,7 @@ def token_required(f):
             if not is_json_request:
                 return redirect('/login')
             return jsonify({'error': 'Token missing or invalid'}), 401
+        _bind_identity(claims)
         return f(*args, **kwargs)
     return wrapper
 
@@ -326,8 +532,9 @@ def require_role(required):
         @wraps(f)
         def wrapped(*args, **kwargs):
             try:
-                verify_jwt_in_request()
-                claims = get_jwt() or {}
+                claims = current_claims()
+                if not _token_ok(claims):
+                    raise PermissionError('token revoked or session expired')
                 role = claims.get('role')
                 allowed = required if isinstance(required, (list, tuple, set)) else [required]
                 if role not in allowed:
@@ -337,7 +544,10 @@ def require_role(required):
                     return jsonify({'error': 'Forbidden'}), 403
                 # keep backward compatibility
                 g.decoded_token = claims
+                _bind_identity(claims)
                 return f(*args, **kwargs)
+            except DatabaseUnavailable:
+                raise
             except Exception as exc:
                 logger.info(f"require_role: JWT verification/role check failed -> {type(exc).__name__}: {str(exc)}")
                 accept = request.headers.get('Accept', '')
@@ -452,12 +662,9 @@ def sponsor_impersonate_driver():
         conn = get_db_connection()
         cur = conn.cursor(dictionary=True)
         
-        # Get sponsor_id
-        cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (sponsor_user_id,))
-        sponsor = cur.fetchone()
-        if not sponsor:
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             return jsonify({"error": "Sponsor not found"}), 404
-        sponsor_id = sponsor['sponsor_id']
         
         # Verify driver belongs to this sponsor (ACTIVE relationship only)
         cur.execute("""
@@ -484,6 +691,7 @@ def sponsor_impersonate_driver():
                 'user_id': target_user_id,
                 'username': driver['email'],
                 'impersonated_by': sponsor_user_id,  # Track who is impersonating
+                'sid': g.decoded_token.get('sid'),  # ends with the sponsor's session
                 'is_impersonation': True,
                 'sponsor_impersonation': True  # Flag for sponsor impersonation
             },
@@ -504,6 +712,8 @@ def sponsor_impersonate_driver():
             }
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in sponsor impersonation: {e}")
         return jsonify({"error": str(e)}), 500
@@ -529,6 +739,8 @@ def impersonate_login():
         
         if not claims.get("is_impersonation"):
             return jsonify({"error": "Invalid impersonation token"}), 403
+        if revocation.is_revoked(claims.get("jti")):
+            return jsonify({"error": "Invalid token"}), 401
         
         # Create response and set the cookie
         response = jsonify({
@@ -0,0 +1,129 @@
+"""
+In-memory index over one catalog snapshot (see services.get_catalog_index).
+
+Built once per snapshot:
+  * by_id                     product id -> product
+  * per category and overall  products sorted by (price, id), with a
+                              parallel list of prices for bisect
+
+A price-sorted query bisects the price range in each selected posting list
+(O(log n) per category) and then reads only the page it returns. With one
+category and nothing excluded the page is a plain slice, O(log n + k);
+several categories are merged lazily with heapq.merge; excluded (hidden)
+ids are skipped while walking and subtracted from the total in O(h).
+sort=id and a text search (q) have to look at every product in the price
+range.
+
+Query results are copies, so callers can annotate them freely.
+"""
+import bisect
+import heapq
+from itertools import islice
+
+SORTS = ('price_asc', 'price_desc', 'id')
+MAX_PAGE_SIZE = 100
+
+
+class _Postings:
+    """Products of one category (or all of them) in (price, id) order."""
+
+    def __init__(self, products):
+        self.items = sorted(products, key=lambda p: (p['price'], p['id']))
+        self.prices = [p['price'] for p in self.items]
+
+    def bounds(self, min_price, max_price):
+        lo = 0 if min_price is None else bisect.bisect_left(self.prices, min_price)
+        hi = len(self.items) if max_price is None else bisect.bisect_right(self.prices, max_price)
+        return lo, max(lo, hi)
+
+
+def _walk(items, start, stop, step):
+    return (items[i] for i in range(start, stop, step))
+
+
+class CatalogIndex:
+
+    def __init__(self, products):
+        products = [dict(p, price=float(p.get('price') or 0)) for p in products if p.get('id') is not None]
+        self.by_id = {p['id']: p for p in products}
+        self.all = _Postings(products)
+        groups = {}
+        for p in products:
+            groups.setdefault(p.get('category') or '', []).append(p)
+        self.by_category = {name: _Postings(items) for name, items in groups.items()}
+        self.categories = sorted(self.by_category)
+
+    def get(self, product_id):
+        product = self.by_id.get(product_id)
+        return dict(product) if product is not None else None
+
+    def query(self, categories=None, min_price=None, max_price=None, sort='price_asc',
+              exclude=(), q=None, offset=0, limit=24):
+        """
+        One page of products as (items, total).
+          categories  iterable of allowed category names, None for all
+          exclude     ids never returned (e.g. the sponsor's hidden products)
+          q           case-insensitive substring of title or description
+        """
+        if categories is None:
+            runs = [self.all]
+            wanted = None
+        else:
+            wanted = set(categories)
+            runs = [self.by_category[c] for c in sorted(wanted) if c in self.by_category]
+        exclude = set(exclude or ())
+        needle = (q or '').strip().lower()
+        descending = sort == 'price_desc'
+
+        if sort == 'id':
+            # Not price ordered: gather the price range, then order by id
+            candidates = []
+            for run in runs:
+                lo, hi = run.bounds(min_price, max_price)
+                candidates.extend(run.items[lo:hi])
+            candidates.sort(key=lambda p: p['id'])
+            stream = iter(candidates)
+            in_range = len(candidates)
+        else:
+            spans = [(run, *run.bounds(min_price, max_price)) for run in runs]
+            in_range = sum(hi - lo for _, lo, hi in spans)
+            if len(spans) == 1 and not exclude and not needle:
+                run, lo, hi = spans[0]
+                if descending:
+                    start, stop = max(lo, hi - offset - limit), max(lo, hi - offset)
+                    page = run.items[start:stop][::-1]
+                else:
+                    page = run.items[lo + offset:min(hi, lo + offset + limit)]
+                return [dict(p) for p in page], in_range
+            # Walk by index: slicing would copy the whole price range
+            parts = [
+                _walk(run.items, hi - 1, lo - 1, -1) if descending else _walk(run.items, lo, hi, 1)
+                for run, lo, hi in spans
+            ]
+            stream = parts[0] if len(parts) == 1 else heapq.merge(
+                *parts, key=lambda p: (p['price'], p['id']), reverse=descending)
+
+        if exclude:
+            stream = (p for p in stream if p['id'] not in exclude)
+        if needle:
+            stream = (p for p in stream
+                      if needle in (p.get('title') or '').lower()
+                      or needle in (p.get('description') or '').lower())
+            matches = list(stream)
+            return [dict(p) for p in matches[offset:offset + limit]], len(matches)
+
+        total = in_range - sum(
+            1 for pid in exclude if self._in_range(pid, wanted, min_price, max_price))
+        return [dict(p) for p in islice(stream, offset, offset + limit)], total
+
+    def _in_range(self, product_id, categories, min_price, max_price):
+        p = self.by_id.get(product_id)
+        if p is None:
+            return False
+        if categories is not None and (p.get('category') or '') not in categories:
+            return False
+        if min_price is not None and p['price'] < min_price:
+            return False
+        if max_price is not None and p['price'] > max_price:
+            return False
+        return True
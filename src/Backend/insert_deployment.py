@@ -10,16 +10,18 @@ from datetime import date
 # Add the Backend directory to path so we can import db utility
 sys.path.insert(0, os.path.dirname(__file__))
 
-from utils.db import get_db_connection
+from utils.db import get_db_connection, DatabaseUnavailable
 
 def insert_deployment():
     """Insert a new deployment record with correct sprint number"""
     conn = None
+    cursor = None
     try:
         # Get database connection using same method as the app
-        conn = get_db_connection()
-        if not conn or not conn.is_connected():
-            print("Failed to connect to database")
+        try:
+            conn = get_db_connection()
+        except DatabaseUnavailable as e:
+            print(f"Failed to connect to database: {e}")
             sys.exit(1)
         
         cursor = conn.cursor()
@@ -53,8 +55,9 @@ def insert_deployment():
         return 1
         
     finally:
-        if conn and conn.is_connected():
+        if cursor:
             cursor.close()
+        if conn:
             conn.close()
 
 if __name__ == '__main__':
@@ -0,0 +1,65 @@
+# src/Backend/metrics.py
+from flask import Blueprint, jsonify, request
+from utils.db import pool_stats
+from utils.query_stats import query_stats
+from auth import token_required, require_role
+from audit_logging import audit_writer
+from services import catalog_cache_stats
+
+metrics_bp = Blueprint("metrics", __name__)
+
+# ============================================
+# OPERATIONAL METRICS (per worker process)
+# ============================================
+
+@metrics_bp.route("/api/admin/metrics/pool", methods=["GET"])
+@token_required
+@require_role("admin")
+def pool_metrics():
+    """Connection pool statistics: in use, idle, wait time, timeouts, leaks"""
+    return jsonify(pool_stats()), 200
+
+
+@metrics_bp.route("/api/admin/metrics/queries", methods=["GET"])
+@token_required
+@require_role("admin")
+def query_metrics():
+    """
+    Per-statement timings, slowest (by total time) first.
+    Query params:
+      group    = fingerprint (default) | endpoint | both
+      endpoint = only statements run by this Flask endpoint, e.g. account.purchase_api
+      limit    = max rows (default 50, 0 for all)
+      reset    = 1 to clear the counters after reading
+    """
+    group = request.args.get("group", "fingerprint")
+    if group not in ("fingerprint", "endpoint", "both"):
+        return jsonify({"error": "group must be fingerprint, endpoint or both"}), 400
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    rows = query_stats.snapshot(group=group, endpoint=request.args.get("endpoint"), limit=limit)
+    if request.args.get("reset") == "1":
+        query_stats.reset()
+    return jsonify({"group": group, "queries": rows}), 200
+
+
+@metrics_bp.route("/api/admin/metrics/audit", methods=["GET"])
+@token_required
+@require_role("admin")
+def audit_metrics():
+    """Audit writer queues: rows waiting, written, spilled to the journal, failed inserts, journal replay"""
+    return jsonify({
+        "login_log": audit_writer.login_log.stats(),
+        "change_log": audit_writer.change_log.stats(),
+    }), 200
+
+
+@metrics_bp.route("/api/admin/metrics/catalog", methods=["GET"])
+@token_required
+@require_role("admin")
+def catalog_metrics():
+    """Product catalog cache: hits, stale hits, misses, coalesced misses, refreshes, snapshot age"""
+    return jsonify(catalog_cache_stats()), 200
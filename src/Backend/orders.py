@@ -1,6 +1,7 @@
 # src/Backend/orders.py
 from flask import Blueprint, jsonify, request, g
-from utils.db import get_db_connection
+from utils.db import get_db_connection, read_only, DatabaseUnavailable
+from utils.streaming import stream_mode, stream_query
 from auth import token_required, require_role
 import logging
 
@@ -17,9 +18,26 @@ def _get_user_role():
     claims = getattr(g, "decoded_token", {}) or {}
     return claims.get("role")
 
+_ORDER_ITEM_FIELDS = ('order_item_id', 'product_id', 'quantity', 'points_per_item', 'product_title', 'product_image')
+
+def _group_order_rows(rows):
+    """Fold order rows LEFT JOINed with order_items (ordered by order) into orders with an items list"""
+    order = None
+    for row in rows:
+        if order is None or row['order_id'] != order['order_id']:
+            if order is not None:
+                yield order
+            order = {k: v for k, v in row.items() if k not in _ORDER_ITEM_FIELDS}
+            order['items'] = []
+        if row['order_item_id'] is not None:
+            order['items'].append({k: row[k] for k in _ORDER_ITEM_FIELDS})
+    if order is not None:
+        yield order
+
 
 @orders_bp.route("/api/orders", methods=["GET"])
 @token_required
+@read_only
 def get_orders():
     """
     Get orders based on user role:
@@ -33,6 +51,7 @@ def get_orders():
     - sponsor_id: Filter by specific sponsor (admin only)
     - start_date: Filter orders created after this date (YYYY-MM-DD)
     - end_date: Filter orders created before this date (YYYY-MM-DD)
+    - stream=1 / format=ndjson: stream the list instead of buffering it (see utils.streaming)
     """
     user_id = _claims_user_id()
     if not user_id:
@@ -61,13 +80,10 @@ def get_orders():
         # Build the base query based on role
         if role == 'driver':
             # Drivers see only their orders
-            cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-            driver_row = cur.fetchone()
-            if not driver_row:
+            driver_id = g.driver_id
+            if not driver_id:
                 return jsonify({"error": "Driver not found"}), 404
             
-            driver_id = driver_row['driver_id']
-            
             base_query = """
                 SELECT 
                     o.order_id,
@@ -80,24 +96,29 @@ def get_orders():
                     o.created_at,
                     o.updated_at,
                     CONCAT(u.first_name, ' ', u.last_name) as driver_name,
-                    s.name as sponsor_name
+                    s.name as sponsor_name,
+                    oi.order_item_id,
+                    oi.product_id,
+                    oi.quantity,
+                    oi.points_per_item,
+                    p.title AS product_title,
+                    p.image AS product_image
                 FROM orders o
                 JOIN driver d ON o.driver_id = d.driver_id
                 JOIN `user` u ON d.user_id = u.user_id
                 JOIN sponsor s ON o.sponsor_id = s.sponsor_id
+                LEFT JOIN order_items oi ON oi.order_id = o.order_id
+                LEFT JOIN product p ON p.product_id = oi.product_id
                 WHERE o.driver_id = %s
             """
             params = [driver_id]
             
         elif role == 'sponsor':
             # Sponsors see orders from their drivers (purchased with their points)
-            cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-            sponsor_row = cur.fetchone()
-            if not sponsor_row:
+            sponsor_id = g.sponsor_id
+            if not sponsor_id:
                 return jsonify({"error": "Sponsor not found"}), 404
             
-            sponsor_id = sponsor_row['sponsor_id']
-            
             base_query = """
                 SELECT 
                     o.order_id,
@@ -110,11 +131,19 @@ def get_orders():
                     o.created_at,
                     o.updated_at,
                     CONCAT(u.first_name, ' ', u.last_name) as driver_name,
-                    s.name as sponsor_name
+                    s.name as sponsor_name,
+                    oi.order_item_id,
+                    oi.product_id,
+                    oi.quantity,
+                    oi.points_per_item,
+                    p.title AS product_title,
+                    p.image AS product_image
                 FROM orders o
                 JOIN driver d ON o.driver_id = d.driver_id
                 JOIN `user` u ON d.user_id = u.user_id
                 JOIN sponsor s ON o.sponsor_id = s.sponsor_id
+                LEFT JOIN order_items oi ON oi.order_id = o.order_id
+                LEFT JOIN product p ON p.product_id = oi.product_id
                 WHERE o.sponsor_id = %s
             """
             params = [sponsor_id]
@@ -133,11 +162,19 @@ def get_orders():
                     o.created_at,
                     o.updated_at,
                     CONCAT(u.first_name, ' ', u.last_name) as driver_name,
-                    s.name as sponsor_name
+                    s.name as sponsor_name,
+                    oi.order_item_id,
+                    oi.product_id,
+                    oi.quantity,
+                    oi.points_per_item,
+                    p.title AS product_title,
+                    p.image AS product_image
                 FROM orders o
                 JOIN driver d ON o.driver_id = d.driver_id
                 JOIN `user` u ON d.user_id = u.user_id
                 JOIN sponsor s ON o.sponsor_id = s.sponsor_id
+                LEFT JOIN order_items oi ON oi.order_id = o.order_id
+                LEFT JOIN product p ON p.product_id = oi.product_id
                 WHERE 1=1
             """
             params = []
@@ -165,31 +202,28 @@ def get_orders():
             base_query += " AND DATE(o.created_at) <= %s"
             params.append(end_date)
         
-        # Order by most recent first
-        base_query += " ORDER BY o.created_at DESC"
+        # Order by most recent first; an order's item rows stay adjacent for grouping
+        base_query += " ORDER BY o.created_at DESC, o.order_id DESC, oi.order_item_id"
+        
+        mode = stream_mode()
+        if mode:
+            return stream_query(
+                base_query, tuple(params), key="orders", mode=mode,
+                transform=_group_order_rows,
+                tail=lambda count: {"total": count},
+            )
         
         # Execute query
         cur.execute(base_query, params)
-        orders = cur.fetchall() or []
-        
-        # Get order items for each order
-        for order in orders:
-            cur.execute("""
-                SELECT 
-                    oi.order_item_id,
-                    oi.product_id,
-                    oi.quantity,
-                    oi.points_per_item
-                FROM order_items oi
-                WHERE oi.order_id = %s
-            """, (order['order_id'],))
-            order['items'] = cur.fetchall() or []
+        orders = list(_group_order_rows(cur.fetchall() or []))
         
         return jsonify({
             "orders": orders,
             "total": len(orders)
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in get_orders: {str(e)}")
         import traceback
@@ -255,15 +289,11 @@ def get_order_details(order_id):
         
         # Permission check
         if role == 'driver':
-            cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-            driver_row = cur.fetchone()
-            if not driver_row or driver_row['driver_id'] != order['driver_id']:
+            if not g.driver_id or g.driver_id != order['driver_id']:
                 return jsonify({"error": "Permission denied"}), 403
         
         elif role == 'sponsor':
-            cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-            sponsor_row = cur.fetchone()
-            if not sponsor_row or sponsor_row['sponsor_id'] != order['sponsor_id']:
+            if not g.sponsor_id or g.sponsor_id != order['sponsor_id']:
                 return jsonify({"error": "Permission denied"}), 403
         
         # Get order items
@@ -272,14 +302,19 @@ def get_order_details(order_id):
                 oi.order_item_id,
                 oi.product_id,
                 oi.quantity,
-                oi.points_per_item
+                oi.points_per_item,
+                p.title AS product_title,
+                p.image AS product_image
             FROM order_items oi
+            LEFT JOIN product p ON p.product_id = oi.product_id
             WHERE oi.order_id = %s
         """, (order_id,))
         order['items'] = cur.fetchall() or []
         
         return jsonify({"order": order}), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in get_order_details: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
@@ -344,15 +379,11 @@ def cancel_order(order_id):
         
         # Permission check
         if role == 'driver':
-            cur.execute("SELECT driver_id FROM driver WHERE user_id = %s", (user_id,))
-            driver_row = cur.fetchone()
-            if not driver_row or driver_row['driver_id'] != order['driver_id']:
+            if not g.driver_id or g.driver_id != order['driver_id']:
                 return jsonify({"error": "Permission denied"}), 403
         
         elif role == 'sponsor':
-            cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-            sponsor_row = cur.fetchone()
-            if not sponsor_row or sponsor_row['sponsor_id'] != order['sponsor_id']:
+            if not g.sponsor_id or g.sponsor_id != order['sponsor_id']:
                 return jsonify({"error": "Permission denied"}), 403
         
         # Check if order can be cancelled
@@ -437,6 +468,8 @@ def cancel_order(order_id):
             "new_balance": int(new_balance * 100)
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
@@ -497,9 +530,7 @@ def update_order(order_id):
         
         # Permission check for sponsors
         if role == 'sponsor':
-            cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-            sponsor_row = cur.fetchone()
-            if not sponsor_row or sponsor_row['sponsor_id'] != order['sponsor_id']:
+            if not g.sponsor_id or g.sponsor_id != order['sponsor_id']:
                 return jsonify({"error": "Permission denied"}), 403
         
         # Cannot update delivered or cancelled orders
@@ -557,6 +588,8 @@ def update_order(order_id):
             "order": updated_order
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
@@ -627,9 +660,7 @@ def update_order_status(order_id):
         
         # Permission check for sponsors
         if role == 'sponsor':
-            cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-            sponsor_row = cur.fetchone()
-            if not sponsor_row or sponsor_row['sponsor_id'] != order['sponsor_id']:
+            if not g.sponsor_id or g.sponsor_id != order['sponsor_id']:
                 return jsonify({"error": "Permission denied"}), 403
         
         current_status = order['status']
@@ -686,6 +717,8 @@ def update_order_status(order_id):
             "previous_status": current_status
         }), 200
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         if conn:
             conn.rollback()
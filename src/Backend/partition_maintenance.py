@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Script to maintain the monthly partitions of login_log and alerts
+(migration 003).
+
+  * Splits the catch-all p_future partition so that every month from the
+    oldest row up to PARTITION_MONTHS_AHEAD months from now has its own
+    partition (pYYYYMM holds that month). The first run after the migration
+    moves all existing rows once; afterwards p_future is empty and a split
+    is a metadata change.
+  * Archives months older than PARTITION_RETENTION_MONTHS: each partition is
+    exported to PARTITION_ARCHIVE_DIR/<table>/<table>-pYYYYMM.ndjson.gz (one
+    JSON object per row), and dropped only once that file is complete and
+    synced to disk.
+
+Runs on every deploy, and is safe to run more often, e.g. daily from cron:
+  15 3 * * *  cd .../src/Backend && python3 partition_maintenance.py
+
+  PARTITION_MONTHS_AHEAD=3   PARTITION_RETENTION_MONTHS=13
+  PARTITION_ARCHIVE_DIR=<Backend>/partition_archive
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import sys
+
+# Add the Backend directory to path so we can import db utility
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.db import get_db_connection, DatabaseUnavailable
+from utils.env import env_int
+
+# Partitioned table -> partitioning column
+TABLES = {
+    'login_log': 'occurred_at',
+    'alerts': 'date_created',
+}
+MONTHS_AHEAD = env_int('PARTITION_MONTHS_AHEAD', 3)
+RETENTION_MONTHS = env_int('PARTITION_RETENTION_MONTHS', 13)
+ARCHIVE_DIR = os.getenv('PARTITION_ARCHIVE_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'partition_archive')
+EXPORT_BATCH = 5000
+
+
+def add_months(day, months):
+    """First day of the month `months` after day's month."""
+    index = day.year * 12 + day.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def month_partitions(cur, table):
+    """[(partition_name, first day of its month)] in order; p_future is left out."""
+    cur.execute("""
+        SELECT partition_name, partition_description
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """, (table,))
+    result = []
+    for name, description in cur.fetchall():
+        if description == 'MAXVALUE':
+            continue
+        upper = datetime.date.fromisoformat(description.strip("'")[:10])
+        result.append((name, add_months(upper, -1)))
+    return result
+
+
+def ensure_future(cur, table, column, today, dry_run=False):
+    """Give every month up to MONTHS_AHEAD its own partition; returns how many were added."""
+    existing = month_partitions(cur, table)
+    if existing:
+        first = add_months(existing[-1][1], 1)
+    else:
+        cur.execute(f"SELECT MIN(`{column}`) FROM `{table}`")
+        oldest = cur.fetchone()[0]
+        first = add_months(oldest or today, 0)
+    last = add_months(today, MONTHS_AHEAD)
+
+    months = []
+    month = first
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    if not months:
+        return 0
+
+    parts = ",\n".join(
+        f"PARTITION p{m:%Y%m} VALUES LESS THAN ('{add_months(m, 1).isoformat()}')" for m in months
+    )
+    sql = (f"ALTER TABLE `{table}` REORGANIZE PARTITION p_future INTO (\n{parts},\n"
+           f"PARTITION p_future VALUES LESS THAN (MAXVALUE))")
+    print(f"{table}: adding partitions p{months[0]:%Y%m}..p{months[-1]:%Y%m}")
+    if not dry_run:
+        cur.execute(sql)
+    return len(months)
+
+
+def export_partition(conn, table, partition):
+    """Write every row of one partition to a gzipped NDJSON file; returns (path, rows)."""
+    directory = os.path.join(ARCHIVE_DIR, table)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{table}-{partition}.ndjson.gz")
+    tmp_path = path + ".tmp"
+
+    rows = 0
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT * FROM `{table}` PARTITION (`{partition}`)")
+        columns = cur.column_names
+        with open(tmp_path, 'wb') as raw:
+            with gzip.open(raw, 'wt', encoding='utf-8') as out:
+                while True:
+                    batch = cur.fetchmany(EXPORT_BATCH)
+                    if not batch:
+                        break
+                    for row in batch:
+                        out.write(json.dumps(dict(zip(columns, row)), default=str) + "\n")
+                    rows += len(batch)
+            raw.flush()
+            os.fsync(raw.fileno())
+    finally:
+        cur.close()
+    os.replace(tmp_path, path)
+    return path, rows
+
+
+def archive_old(conn, table, today, dry_run=False):
+    """Export and drop partitions of months before the retention window; returns how many."""
+    cutoff = add_months(today, -RETENTION_MONTHS)
+    cur = conn.cursor()
+    old = [name for name, month in month_partitions(cur, table) if month < cutoff]
+    cur.close()
+
+    for name in old:
+        if dry_run:
+            print(f"{table}: would archive and drop {name}")
+            continue
+        path, rows = export_partition(conn, table, name)
+        print(f"{table}: exported {rows} rows from {name} to {path}")
+        cur = conn.cursor()
+        cur.execute(f"ALTER TABLE `{table}` DROP PARTITION `{name}`")
+        cur.close()
+        print(f"{table}: dropped {name}")
+    return len(old)
+
+
+def maintain_partitions(dry_run=False):
+    """Create upcoming partitions and archive expired ones for every partitioned table"""
+    conn = None
+    cursor = None
+    try:
+        try:
+            conn = get_db_connection()
+        except DatabaseUnavailable as e:
+            print(f"Failed to connect to database: {e}")
+            return 1
+
+        # Rows are stamped in UTC (audit_writer), so month boundaries are too
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        cursor = conn.cursor()
+        for table, column in TABLES.items():
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.partitions
+                WHERE table_schema = DATABASE() AND table_name = %s AND partition_name = 'p_future'
+            """, (table,))
+            if cursor.fetchone()[0] == 0:
+                print(f"{table}: not partitioned yet (apply migrations first), skipping")
+                continue
+            ensure_future(cursor, table, column, today, dry_run)
+            archive_old(conn, table, today, dry_run)
+
+        print("Partition maintenance complete")
+        return 0
+
+    except Exception as e:
+        print(f"Error maintaining partitions: {e}")
+        return 1
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="print what would change without altering anything")
+    args = parser.parse_args()
+    sys.exit(maintain_partitions(args.dry_run))
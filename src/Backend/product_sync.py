@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Script / background job to mirror the upstream product catalog (Fake Store
+API) into the product table (migration 004).
+
+Each run fetches the upstream list once and compares a SHA-256 of every
+product's fields with the content_hash already stored, so only new or
+changed products are written, in one bulk upsert. Products missing
+upstream are marked is_active = 0 rather than deleted (orders still
+reference them). An empty or failed upstream response changes nothing.
+
+The app runs it in the background every PRODUCT_SYNC_SECONDS (0 disables)
+and once at startup. The deploy also runs it once, so the mirror is filled
+before the new code serves traffic:
+  python3 product_sync.py
+
+  PRODUCT_SYNC_SECONDS=900
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+
+# Add the Backend directory to path so we can import db utility
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.background import PeriodicTask
+from utils.db import get_db_connection, DatabaseUnavailable
+from utils.env import env_float
+import services
+
+logger = logging.getLogger('product_sync')
+
+SYNC_SECONDS = env_float('PRODUCT_SYNC_SECONDS', 900)
+UPSERT_BATCH = 500
+
+SQL_UPSERT_PRODUCT = """
+    INSERT INTO product (
+        product_id, title, price, category, image, description, rating_rate, rating_count,
+        content_hash, is_active, synced_at, updated_at
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 1, NOW(6), NOW(6))
+    ON DUPLICATE KEY UPDATE
+        title = VALUES(title),
+        price = VALUES(price),
+        category = VALUES(category),
+        image = VALUES(image),
+        description = VALUES(description),
+        rating_rate = VALUES(rating_rate),
+        rating_count = VALUES(rating_count),
+        content_hash = VALUES(content_hash),
+        is_active = 1,
+        synced_at = NOW(6),
+        updated_at = NOW(6)
+"""
+
+
+def product_row(product):
+    """(product_id, title, ..., content_hash) for SQL_UPSERT_PRODUCT."""
+    rating = product.get("rating") or {}
+    row = (
+        int(product["id"]),
+        str(product.get("title") or "")[:255],
+        round(float(product.get("price") or 0), 2),
+        str(product.get("category") or "")[:100],
+        product.get("image"),
+        product.get("description"),
+        rating.get("rate"),
+        rating.get("count"),
+    )
+    digest = hashlib.sha256(json.dumps(row, separators=(",", ":")).encode()).hexdigest()
+    return row + (digest,)
+
+
+def sync_products():
+    """Upsert changed products and deactivate vanished ones; returns counts, or None if skipped."""
+    upstream = services.fetch_upstream_products()
+    if "error" in upstream or not upstream.get("products"):
+        logger.warning(f"Product sync skipped, upstream returned nothing usable: {upstream.get('error')}")
+        return None
+
+    rows = {}
+    for product in upstream["products"]:
+        try:
+            row = product_row(product)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Skipping malformed upstream product {product!r:.200}: {e}")
+            continue
+        rows[row[0]] = row
+
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT product_id, content_hash, is_active FROM product")
+        stored = {product_id: (digest, active) for product_id, digest, active in cur.fetchall()}
+
+        changed = [row for pid, row in rows.items() if stored.get(pid) != (row[-1], 1)]
+        gone = [pid for pid, (_, active) in stored.items() if active and pid not in rows]
+
+        for start in range(0, len(changed), UPSERT_BATCH):
+            cur.executemany(SQL_UPSERT_PRODUCT, changed[start:start + UPSERT_BATCH])
+        if gone:
+            placeholders = ", ".join(["%s"] * len(gone))
+            cur.execute(f"UPDATE product SET is_active = 0, updated_at = NOW(6) WHERE product_id IN ({placeholders})",
+                        tuple(gone))
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+    if changed or gone:
+        services.invalidate_catalog()
+    counts = {"upstream": len(rows), "upserted": len(changed), "deactivated": len(gone)}
+    logger.info(f"Product sync: {counts}")
+    return counts
+
+
+_syncer = PeriodicTask('product-sync', SYNC_SECONDS, sync_products)
+
+
+def start():
+    """Start the periodic sync in this process and run it once right away."""
+    if SYNC_SECONDS <= 0:
+        return
+    _syncer.start()
+    _syncer.trigger()
+
+
+if __name__ == '__main__':
+    try:
+        result = sync_products()
+    except DatabaseUnavailable as e:
+        print(f"Failed to connect to database: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error syncing products: {e}")
+        sys.exit(1)
+    if result is None:
+        print("Upstream catalog unavailable; mirror left unchanged")
+        sys.exit(1)
+    print(f"Synced products: {result}")
+    sys.exit(0)
@@ -1,8 +1,45 @@
+"""
+Product catalog, behind a per-process cache.
+
+Products are read from the local product table, which product_sync.py
+mirrors from the upstream Fake Store API. The upstream is only called
+directly while the mirror is still empty (before its first sync) or the
+database cannot be read.
+
+get_fake_store_data() serves a snapshot younger than CATALOG_TTL without
+touching the database. Once it is older, callers still get it immediately
+while one background thread reloads it (stale-while-revalidate), until
+it is older than CATALOG_MAX_STALE; only then, or when there is no snapshot
+yet, does a caller wait for the load. Concurrent waiters share one load
+(singleflight). If a load fails the last good snapshot is kept and served,
+however old; the source is retried at most every CATALOG_RETRY_SECONDS
+meanwhile, so an outage does not make requests wait.
+
+get_catalog_index() serves the same snapshot through a CatalogIndex
+(catalog_index.py), built once per snapshot, for filtered and paged reads.
+
+  CATALOG_TTL=60   CATALOG_MAX_STALE=3600   CATALOG_UPSTREAM_TIMEOUT=10
+  CATALOG_RETRY_SECONDS=30
+"""
+import logging
+import threading
+import time
 import requests
+from utils.db import get_db_connection
+from utils.env import env_float
+from catalog_index import CatalogIndex
+
+logger = logging.getLogger('services')
+
+CATALOG_TTL = env_float('CATALOG_TTL', 60)
+CATALOG_MAX_STALE = env_float('CATALOG_MAX_STALE', 3600)
+CATALOG_UPSTREAM_TIMEOUT = env_float('CATALOG_UPSTREAM_TIMEOUT', 10)
+CATALOG_RETRY_SECONDS = env_float('CATALOG_RETRY_SECONDS', 30)
+
 
 # ------------------------------
 # Fake Store API interaction
-def get_fake_store_data():
+def fetch_upstream_products():
     """Get products from Fake Store API"""
     try:
         # Fake Store API - no authentication needed
@@ -15,7 +52,7 @@ def get_fake_store_data():
             'Accept-Language': 'en-US,en;q=0.9',
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = requests.get(url, headers=headers, timeout=CATALOG_UPSTREAM_TIMEOUT)
         
         if response.status_code == 200:
             products = response.json()
@@ -35,4 +72,180 @@ def get_fake_store_data():
         return {"error": "Request timeout", "products": [], "total": 0}
     except Exception as e:
         print(f"Fake Store API exception: {str(e)}")
-        return {"error": str(e), "products": [], "total": 0}
\ No newline at end of file
+        return {"error": str(e), "products": [], "total": 0}
+
+
+# ------------------------------
+# Local mirror (product table, see product_sync.py)
+SQL_ACTIVE_PRODUCTS = """
+    SELECT product_id, title, price, description, category, image, rating_rate, rating_count
+    FROM product
+    WHERE is_active = 1
+    ORDER BY product_id
+"""
+
+
+def read_product_mirror():
+    """Active products from the mirror, in the upstream's JSON shape; None if it is empty."""
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute(SQL_ACTIVE_PRODUCTS)
+        rows = cur.fetchall()
+        cur.close()
+    finally:
+        conn.close()
+    if not rows:
+        return None
+    products = [
+        {
+            "id": product_id,
+            "title": title,
+            "price": float(price),
+            "description": description,
+            "category": category,
+            "image": image,
+            "rating": {
+                "rate": float(rate) if rate is not None else None,
+                "count": count,
+            },
+        }
+        for product_id, title, price, description, category, image, rate, count in rows
+    ]
+    return {"products": products, "total": len(products)}
+
+
+def _load_catalog():
+    """The mirror, or the upstream while the mirror is empty or unreadable."""
+    try:
+        mirrored = read_product_mirror()
+        if mirrored is not None:
+            return mirrored
+        logger.warning("Product mirror is empty, reading the upstream catalog")
+    except Exception as e:
+        logger.error(f"Product mirror unavailable, reading the upstream catalog: {e}")
+    return fetch_upstream_products()
+
+
+# ------------------------------
+# Catalog cache
+_catalog_lock = threading.Lock()
+_catalog = None            # last good {"products", "total"}
+_catalog_at = 0.0          # time.monotonic() it was fetched
+_failed_at = None          # time.monotonic() of the last failed refresh
+_inflight = None           # threading.Event while an upstream request runs
+_index = None              # (snapshot, CatalogIndex) for the latest snapshot
+_catalog_stats = {
+    "hits": 0,             # fresh snapshot served
+    "stale_hits": 0,       # stale snapshot served while a refresh runs
+    "misses": 0,           # caller had to wait for the upstream
+    "coalesced": 0,        # ...but shared another caller's request
+    "refreshes": 0,
+    "refresh_failures": 0,
+    "last_good_served": 0, # upstream failed, last good snapshot served instead
+}
+
+
+def _copy(snapshot):
+    # Handlers annotate products (e.g. is_hidden), so never hand out the cached dicts
+    return {"products": [dict(p) for p in snapshot["products"]], "total": snapshot["total"]}
+
+
+def _refresh():
+    """Fetch once and publish the result; wakes everyone waiting on this flight."""
+    global _catalog, _catalog_at, _failed_at, _inflight
+    try:
+        result = _load_catalog()
+    except Exception as e:
+        result = {"error": str(e), "products": [], "total": 0}
+    with _catalog_lock:
+        _catalog_stats["refreshes"] += 1
+        if "error" in result:
+            _catalog_stats["refresh_failures"] += 1
+            _failed_at = time.monotonic()
+        else:
+            _catalog, _catalog_at, _failed_at = result, time.monotonic(), None
+        done, _inflight = _inflight, None
+    done.set()
+    return result
+
+
+def _snapshot():
+    """The cached snapshot itself (shared: do not modify), or an error dict."""
+    global _inflight
+    with _catalog_lock:
+        age = time.monotonic() - _catalog_at
+        if _catalog is not None and age < CATALOG_TTL:
+            _catalog_stats["hits"] += 1
+            return _catalog
+        if _catalog is not None and age < CATALOG_MAX_STALE:
+            _catalog_stats["stale_hits"] += 1
+            if _inflight is None:
+                _inflight = threading.Event()
+                threading.Thread(target=_refresh, name="catalog-refresh", daemon=True).start()
+            return _catalog
+        if _catalog is not None and _failed_at is not None and time.monotonic() - _failed_at < CATALOG_RETRY_SECONDS:
+            _catalog_stats["last_good_served"] += 1
+            return _catalog
+
+        _catalog_stats["misses"] += 1
+        flight = _inflight
+        leader = flight is None
+        if leader:
+            flight = _inflight = threading.Event()
+        else:
+            _catalog_stats["coalesced"] += 1
+
+    if leader:
+        result = _refresh()
+    else:
+        flight.wait(CATALOG_UPSTREAM_TIMEOUT + 15)
+        result = None
+
+    with _catalog_lock:
+        if _catalog is not None and (result is None or "error" in result):
+            if result is not None:
+                _catalog_stats["last_good_served"] += 1
+            return _catalog
+    if result is None:
+        return {"error": "Catalog unavailable", "products": [], "total": 0}
+    return result
+
+
+def get_fake_store_data():
+    """Products from the upstream catalog, served from the per-process cache."""
+    snapshot = _snapshot()
+    return snapshot if "error" in snapshot else _copy(snapshot)
+
+
+def get_catalog_index():
+    """CatalogIndex over the current snapshot (rebuilt when it changes), or None if unavailable."""
+    global _index
+    snapshot = _snapshot()
+    if "error" in snapshot:
+        return None
+    index = _index
+    if index is None or index[0] is not snapshot:
+        index = (snapshot, CatalogIndex(snapshot["products"]))
+        _index = index
+    return index[1]
+
+
+def invalidate_catalog():
+    """Mark the snapshot stale (e.g. after a sync) so the next request reloads it in the background."""
+    global _catalog_at
+    with _catalog_lock:
+        if _catalog is not None:
+            _catalog_at = min(_catalog_at, time.monotonic() - CATALOG_TTL)
+
+
+def catalog_cache_stats():
+    """Counters plus the age of the cached snapshot (per worker process)."""
+    with _catalog_lock:
+        stats = dict(_catalog_stats)
+        stats["cached_products"] = _catalog["total"] if _catalog else 0
+        stats["age_seconds"] = round(time.monotonic() - _catalog_at, 1) if _catalog else None
+        stats["refreshing"] = _inflight is not None
+    stats["ttl_seconds"] = CATALOG_TTL
+    stats["max_stale_seconds"] = CATALOG_MAX_STALE
+    return stats
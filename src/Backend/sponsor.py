@@ -1,6 +1,7 @@
 # src/Backend/sponsor.py
 from flask import Blueprint, jsonify, g, request
 from utils.db import get_db_connection
+from utils.streaming import stream_mode, stream_query
 from auth import token_required
 import mysql.connector
 import json
@@ -35,22 +36,12 @@ def get_pending_drivers():
     try:
         cur = conn.cursor(dictionary=True)
 
-        # 1. Find this sponsor's sponsor_id using their user_id
-        cur.execute(
-            """
-            SELECT sponsor_id
-            FROM sponsor
-            WHERE user_id = %s
-            """,
-            (sponsor_user_id,)
-        )
-        sponsor_row = cur.fetchone()
-        if not sponsor_row:
+        # 1. This sponsor's sponsor_id (resolved by token_required)
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             # User is not a sponsor in the sponsor table
             return jsonify({"error": "Forbidden: not a sponsor"}), 403
 
-        sponsor_id = sponsor_row["sponsor_id"]
-
         # 2. Pull pending driver requests for THIS sponsor
         # We:
         #   - Filter driver_sponsor to this sponsor_id and status='PENDING'
@@ -124,12 +115,10 @@ def approve_pending_driver(driver_id):
     try:
         cur = conn.cursor(dictionary=True)
 
-        # Get sponsor_id for logged-in sponsor
-        cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (sponsor_user_id,))
-        sponsor = cur.fetchone()
-        if not sponsor:
+        # sponsor_id for logged-in sponsor
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             return jsonify({"error": "User is not a sponsor"}), 403
-        sponsor_id = sponsor["sponsor_id"]
 
         # Update driver_sponsor entry if it's pending
         cur.execute(
@@ -179,11 +168,9 @@ def reject_pending_driver(driver_id):
     try:
         cur = conn.cursor(dictionary=True)
 
-        cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (sponsor_user_id,))
-        sponsor = cur.fetchone()
-        if not sponsor:
+        sponsor_id = g.sponsor_id
+        if not sponsor_id:
             return jsonify({"error": "User is not a sponsor"}), 403
-        sponsor_id = sponsor["sponsor_id"]
 
         cur.execute(
             """
@@ -298,13 +285,7 @@ def update_catalog_filters():
     try:
         cur = conn.cursor(dictionary=True)
 
-        # Get sponsor_id
-        cur.execute(
-            "SELECT sponsor_id FROM sponsor WHERE user_id = %s",
-            (sponsor_user_id,)
-        )
-        sponsor = cur.fetchone()
-        if not sponsor:
+        if not g.sponsor_id:
             return jsonify({"error": "Forbidden: not a sponsor"}), 403
 
         # Convert to JSON string or NULL
@@ -334,6 +315,77 @@ def update_catalog_filters():
         if cur:
             cur.close()
         conn.close()
+
+
+# Transaction history of a sponsor's active drivers (commission dashboard)
+COMMISSION_TRANSACTIONS_SQL = """
+    SELECT 
+        t.transaction_id,
+        t.date,
+        t.amount,
+        t.item_id,
+        u.first_name,
+        u.last_name,
+        d.driver_id
+    FROM transactions t
+    INNER JOIN driver_sponsor ds ON t.driver_sponsor_id = ds.driver_sponsor_id
+    INNER JOIN driver d ON ds.driver_id = d.driver_id
+    INNER JOIN `user` u ON d.user_id = u.user_id
+    WHERE ds.sponsor_id = %s
+      AND ds.status = 'ACTIVE'
+    ORDER BY t.date DESC
+"""
+
+
+class _CommissionSummary:
+    """Running commission totals, accumulated while the transaction history is formatted"""
+
+    commission_rate = 0.01  # 1% commission to development company
+
+    def __init__(self, point_value, active_drivers):
+        self.point_value = point_value
+        self.active_drivers = active_drivers
+        self.total_points_redeemed = 0.0  # Points spent on purchases (negative transactions)
+        self.total_points_awarded = 0.0   # Points given to drivers (positive transactions)
+        self.purchase_count = 0
+
+    def consume(self, transactions):
+        """Yield formatted transaction history entries, updating the totals"""
+        for txn in transactions:
+            amount = float(txn["amount"])
+            if amount < 0:
+                # This is a purchase/redemption
+                self.total_points_redeemed += abs(amount)
+                self.purchase_count += 1
+            else:
+                # This is points being awarded
+                self.total_points_awarded += amount
+            yield {
+                "transaction_id": txn["transaction_id"],
+                "date": txn["date"].isoformat() if txn["date"] else None,
+                "driver_name": f"{txn['first_name']} {txn['last_name']}",
+                "driver_id": txn["driver_id"],
+                "points": abs(amount),
+                "dollar_value": abs(amount) * self.point_value,
+                "item_id": txn["item_id"],
+                "type": "purchase" if amount < 0 else "award"
+            }
+
+    def as_dict(self):
+        # Calculate dollar values and commission
+        total_sales_dollars = self.total_points_redeemed * self.point_value
+        commission_owed = total_sales_dollars * self.commission_rate
+        return {
+            "total_points_redeemed": round(self.total_points_redeemed, 2),
+            "total_points_awarded": round(self.total_points_awarded, 2),
+            "total_sales_dollars": round(total_sales_dollars, 2),
+            "purchase_count": self.purchase_count,
+            "active_drivers": self.active_drivers,
+            "commission_owed": round(commission_owed, 2),
+            "commission_rate": self.commission_rate,
+            "point_value": self.point_value
+        }
+
 @sponsor_bp.route("/api/sponsor/commission-summary", methods=["GET"])
 @token_required
 def get_commission_summary():
@@ -346,6 +398,8 @@ def get_commission_summary():
     
     Note: Commission is calculated as points_spent × point_value × 0.01
     Default point value is $0.01, so 100 points = $1.00, commission = $0.01
+
+    stream=1 / format=ndjson streams the transactions, with the summary at the end
     """
     sponsor_user_id = _claims_user_id()
     if not sponsor_user_id:
@@ -368,50 +422,6 @@ def get_commission_summary():
         sponsor_id = sponsor["sponsor_id"]
         point_value = float(sponsor.get("point_value", 0.01))  # Default $0.01 per point
 
-        # Get all transactions for this sponsor's drivers
-        cur.execute(
-            """
-            SELECT 
-                t.transaction_id,
-                t.date,
-                t.amount,
-                t.item_id,
-                u.first_name,
-                u.last_name,
-                d.driver_id
-            FROM transactions t
-            INNER JOIN driver_sponsor ds ON t.driver_sponsor_id = ds.driver_sponsor_id
-            INNER JOIN driver d ON ds.driver_id = d.driver_id
-            INNER JOIN `user` u ON d.user_id = u.user_id
-            WHERE ds.sponsor_id = %s
-              AND ds.status = 'ACTIVE'
-            ORDER BY t.date DESC
-            """,
-            (sponsor_id,)
-        )
-        
-        transactions = cur.fetchall() or []
-
-        # Calculate summary metrics
-        total_points_redeemed = 0.0  # Points spent on purchases (negative transactions)
-        total_points_awarded = 0.0   # Points given to drivers (positive transactions)
-        purchase_count = 0
-        
-        for txn in transactions:
-            amount = float(txn["amount"])
-            if amount < 0:
-                # This is a purchase/redemption
-                total_points_redeemed += abs(amount)
-                purchase_count += 1
-            else:
-                # This is points being awarded
-                total_points_awarded += amount
-
-        # Calculate dollar values and commission
-        total_sales_dollars = total_points_redeemed * point_value
-        commission_rate = 0.01  # 1% commission to development company
-        commission_owed = total_sales_dollars * commission_rate
-
         # Get active driver count
         cur.execute(
             """
@@ -425,32 +435,22 @@ def get_commission_summary():
         driver_count_row = cur.fetchone()
         active_drivers = int(driver_count_row["active_count"]) if driver_count_row else 0
 
-        # Format transaction history
-        transaction_history = []
-        for txn in transactions:
-            amount = float(txn["amount"])
-            transaction_history.append({
-                "transaction_id": txn["transaction_id"],
-                "date": txn["date"].isoformat() if txn["date"] else None,
-                "driver_name": f"{txn['first_name']} {txn['last_name']}",
-                "driver_id": txn["driver_id"],
-                "points": abs(amount),
-                "dollar_value": abs(amount) * point_value,
-                "item_id": txn["item_id"],
-                "type": "purchase" if amount < 0 else "award"
-            })
+        summary = _CommissionSummary(point_value, active_drivers)
+        mode = stream_mode()
+        if mode:
+            # Transactions go out as they are read; the totals follow them
+            return stream_query(
+                COMMISSION_TRANSACTIONS_SQL, (sponsor_id,), key="transactions", mode=mode,
+                transform=summary.consume,
+                tail=lambda count: {"summary": summary.as_dict()},
+            )
+
+        # Get all transactions for this sponsor's drivers
+        cur.execute(COMMISSION_TRANSACTIONS_SQL, (sponsor_id,))
+        transaction_history = list(summary.consume(cur.fetchall() or []))
 
         return jsonify({
-            "summary": {
-                "total_points_redeemed": round(total_points_redeemed, 2),
-                "total_points_awarded": round(total_points_awarded, 2),
-                "total_sales_dollars": round(total_sales_dollars, 2),
-                "purchase_count": purchase_count,
-                "active_drivers": active_drivers,
-                "commission_owed": round(commission_owed, 2),
-                "commission_rate": commission_rate,
-                "point_value": point_value
-            },
+            "summary": summary.as_dict(),
             "transactions": transaction_history
         }), 200
 
@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request, g
-from utils.db import get_db_connection
+from utils.db import get_db_connection, read_only
 from auth import token_required, require_role
 import mysql.connector
 import traceback
@@ -7,26 +7,13 @@ import traceback
 sponsor_reports_bp = Blueprint('sponsor_reports', __name__, url_prefix='/api/sponsor/reports')
 
 def _get_sponsor_id_from_token():
-    """Extract sponsor_id from JWT claims by querying DB with user_id"""
-    claims = getattr(g, "decoded_token", {}) or {}
-    user_id = claims.get("user_id") or claims.get("sub")
-    
-    if not user_id:
-        return None
-    
-    conn = get_db_connection()
-    try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT sponsor_id FROM sponsor WHERE user_id = %s", (user_id,))
-        sponsor = cur.fetchone()
-        return sponsor['sponsor_id'] if sponsor else None
-    finally:
-        if conn:
-            conn.close()
+    """sponsor_id of the caller, resolved once per request by token_required"""
+    return g.get('sponsor_id')
 
 @sponsor_reports_bp.route('/points', methods=['GET'])
 @token_required
 @require_role('sponsor')
+@read_only
 def get_points_report():
     """Driver point tracking report - shows BALANCE_CHANGE alerts"""
     sponsor_id = _get_sponsor_id_from_token()
@@ -61,12 +48,12 @@ def get_points_report():
         
         params = [sponsor_id]
         
-        # Add date filters
+        # Add date filters (bare column, so the index and partition pruning apply)
         if start_date:
-            query += " AND DATE(a.date_created) >= %s"
+            query += " AND a.date_created >= %s"
             params.append(start_date)
         if end_date:
-            query += " AND DATE(a.date_created) <= %s"
+            query += " AND a.date_created < DATE_ADD(%s, INTERVAL 1 DAY)"
             params.append(end_date)
             
         # Add driver filter
@@ -115,6 +102,7 @@ def get_points_report():
 @sponsor_reports_bp.route('/audit-log', methods=['GET'])
 @token_required
 @require_role('sponsor')
+@read_only
 def get_audit_log():
     """Audit log report - shows all alerts for sponsor's drivers"""
     sponsor_id = _get_sponsor_id_from_token()
@@ -148,12 +136,12 @@ def get_audit_log():
         
         params = [sponsor_id]
         
-        # Add date filters
+        # Add date filters (bare column, so the index and partition pruning apply)
         if start_date:
-            query += " AND DATE(a.date_created) >= %s"
+            query += " AND a.date_created >= %s"
             params.append(start_date)
         if end_date:
-            query += " AND DATE(a.date_created) <= %s"
+            query += " AND a.date_created < DATE_ADD(%s, INTERVAL 1 DAY)"
             params.append(end_date)
             
         # Add category filter
@@ -3,8 +3,8 @@
 User Management Module - Following SOLID principles
 Single Responsibility: Handles user creation for different roles
 """
-from werkzeug.security import generate_password_hash
-from utils.db import get_db_connection
+from utils.db import get_db_connection, DatabaseUnavailable
+from utils.password_hashing import hash_password, HashingOverloaded
 import logging
 
 logger = logging.getLogger(__name__)
@@ -74,6 +74,9 @@ class UserCreationService:
         if not type_id:
             return None, f"Invalid user type: {user_type}"
         
+        # Hash before taking a DB connection so it isn't held during the hash
+        hashed_password = hash_password(data.get('password'))
+        
         conn = None
         try:
             conn = get_db_connection()
@@ -89,14 +92,11 @@ class UserCreationService:
             state = data.get('state')
             country = data.get('country')
             username = data.get('username')
-            password = data.get('password')
             
             # Security question/answer (optional, use defaults if not provided)
             sec_q = data.get('security_question', 'What is your favorite color?')
             sec_a = data.get('security_answer', 'blue')
             
-            hashed_password = generate_password_hash(password)
-            
             # 1. Create user record
             cur.execute("""
                 INSERT INTO `user` 
@@ -146,6 +146,8 @@ class UserCreationService:
             logger.info(f"Successfully created {user_type} user_id={user_id}")
             return user_id, None
             
+        except DatabaseUnavailable:
+            raise
         except Exception as e:
             if conn:
                 conn.rollback()
@@ -212,9 +214,7 @@ class UserCreationService:
                 return None, "Last name is required"
             
             # Create the base user account
-            from werkzeug.security import generate_password_hash
-            
-            password_hash = generate_password_hash(data['password'])
+            password_hash = hash_password(data['password'])
             
             # Insert into user table (type_id=2 for sponsor)
             # Note: email_lc is GENERATED, don't insert it manually
@@ -250,6 +250,13 @@ class UserCreationService:
             logger.info(f"Created sponsor user {new_user_id} for organization '{org_name}'")
             return new_user_id, None
             
+        except HashingOverloaded:
+            if conn:
+                conn.rollback()
+                conn.close()
+            raise
+        except DatabaseUnavailable:
+            raise
         except Exception as e:
             if conn:
                 conn.rollback()
@@ -0,0 +1,74 @@
+"""
+Small helper for periodic background jobs (batched flushes, cache syncs,
+purges). Each job runs on its own daemon thread in the current process; a
+forked worker starts its own thread on first use.
+"""
+import atexit
+import logging
+import os
+import threading
+
+logger = logging.getLogger('background')
+
+
+class PeriodicTask:
+    """
+    Call fn() every `interval` seconds once start() has been called.
+    Errors are logged and the schedule continues. With final_run=True, fn()
+    runs once more at interpreter exit (e.g. to flush buffered writes).
+    """
+
+    def __init__(self, name, interval, fn, final_run=False):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.final_run = final_run
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit = False
+
+    def start(self):
+        """Idempotent; cheap enough to call on every use."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+            if self.final_run and not self._atexit:
+                atexit.register(self.stop)
+                self._atexit = True
+
+    def trigger(self):
+        """Run fn() now instead of waiting for the next tick."""
+        self._wake.set()
+
+    def run_once(self):
+        try:
+            self.fn()
+        except Exception as e:
+            logger.error(f"{self.name} failed: {e}")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        if self.final_run:
+            self.run_once()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.run_once()
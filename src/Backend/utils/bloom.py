@@ -0,0 +1,53 @@
+"""
+Minimal Bloom filter: a set membership test that may answer "maybe" for
+keys it never saw (at about `error_rate`) but never misses a key it did.
+Used to keep the common "token not revoked" check off the database.
+"""
+import hashlib
+import math
+
+
+class BloomFilter:
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing (Kirsch-Mitzenmacher): k positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, key):
+        """Add key; returns False if it was (probably) already present."""
+        bits = self._bits
+        flipped = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                flipped = True
+        # Re-adding a key (e.g. the sync overlap re-reading rows) must not count
+        if flipped:
+            self.count += 1
+        return flipped
+
+    def __contains__(self, key):
+        bits = self._bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    @property
+    def saturated(self):
+        """True once more keys were added than the filter was sized for."""
+        return self.count > self.capacity
@@ -0,0 +1,35 @@
+"""
+Numeric settings from the environment. A missing, empty or malformed value
+falls back to the default (malformed ones are logged), so a typo in .env
+does not stop the app from importing.
+"""
+import logging
+import os
+
+logger = logging.getLogger('env')
+
+
+def env_float(name, default):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Ignoring {name}={value!r}: not a number, using {default}")
+        return default
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return int(float(value))  # e.g. "1e5"
+    except ValueError:
+        logger.warning(f"Ignoring {name}={value!r}: not an integer, using {default}")
+        return default
@@ -0,0 +1,93 @@
+"""
+Role-specific ids behind a user_id, resolved once and cached per process.
+
+Nearly every sponsor/driver endpoint needs the caller's sponsor_id or
+driver_id. token_required puts them on `g.sponsor_id` / `g.driver_id` from
+this cache, so handlers don't repeat the lookup on every request.
+
+A user's sponsor/driver row only changes when the account is created,
+retyped or deleted; those paths call invalidate(). Entries also expire
+after IDENTITY_CACHE_TTL seconds, which bounds staleness in other workers.
+
+  IDENTITY_CACHE_TTL=300
+  IDENTITY_CACHE_SIZE=10000
+"""
+from collections import OrderedDict, namedtuple
+import logging
+import threading
+import time
+from utils.db import get_db_connection, execute_prepared_one
+from utils.env import env_int, env_float
+
+logger = logging.getLogger('identity')
+
+IDENTITY_CACHE_TTL = env_float('IDENTITY_CACHE_TTL', 300)
+IDENTITY_CACHE_SIZE = env_int('IDENTITY_CACHE_SIZE', 10000)
+
+SQL_ROLE_IDS = """
+    SELECT (SELECT sponsor_id FROM sponsor WHERE user_id = %s) AS sponsor_id,
+           (SELECT driver_id FROM driver WHERE user_id = %s) AS driver_id
+"""
+
+RoleIds = namedtuple('RoleIds', ['sponsor_id', 'driver_id'])
+NO_IDS = RoleIds(None, None)
+
+_cache = OrderedDict()   # user_id -> (RoleIds, expires_at)
+_lock = threading.Lock()
+
+
+def _key(user_id):
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def remember(user_id, sponsor_id, driver_id):
+    """Store ids already known to the caller (e.g. read by the login query)."""
+    key = _key(user_id)
+    if key is None or IDENTITY_CACHE_SIZE <= 0:
+        return
+    with _lock:
+        _cache[key] = (RoleIds(sponsor_id, driver_id), time.monotonic() + IDENTITY_CACHE_TTL)
+        _cache.move_to_end(key)
+        while len(_cache) > IDENTITY_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def invalidate(user_id):
+    """Forget a user's ids after their sponsor/driver row changes."""
+    key = _key(user_id)
+    with _lock:
+        _cache.pop(key, None)
+
+
+def resolve(user_id, conn=None):
+    """
+    RoleIds(sponsor_id, driver_id) for user_id; either may be None. Served
+    from the cache when fresh, otherwise one query (on `conn` if given).
+    """
+    key = _key(user_id)
+    if key is None:
+        return NO_IDS
+
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            if hit[1] > time.monotonic():
+                _cache.move_to_end(key)
+                return hit[0]
+            del _cache[key]
+
+    own = conn is None
+    if own:
+        conn = get_db_connection()
+    try:
+        row = execute_prepared_one(conn, SQL_ROLE_IDS, (key, key)) or {}
+    finally:
+        if own:
+            conn.close()
+    ids = RoleIds(row.get('sponsor_id'), row.get('driver_id'))
+    remember(key, ids.sponsor_id, ids.driver_id)
+    return ids
+
@@ -0,0 +1,227 @@
+"""
+Brute-force throttling for /api/login.
+
+Failed logins are counted in memory in sliding windows per username and
+per client IP. Once a username reaches LOGIN_MAX_FAILURES within
+LOGIN_FAILURE_WINDOW it is locked for LOGIN_LOCKOUT_SECONDS; an IP that
+reaches LOGIN_MAX_IP_FAILURES within LOGIN_IP_WINDOW is turned away for the
+rest of its window. check() runs before the credential lookup and the
+password hash, so a credential-stuffing burst costs a dict lookup per try.
+
+Lockouts and failure counts are persisted to login_info (failed_attempts,
+is_locked, locked_until) in batches every LOGIN_THROTTLE_FLUSH_SECONDS.
+The login query reads them back, so a lockout set by another worker or
+before a restart is honoured too.
+
+  LOGIN_MAX_FAILURES=5          LOGIN_FAILURE_WINDOW=900
+  LOGIN_MAX_IP_FAILURES=50      LOGIN_IP_WINDOW=300
+  LOGIN_LOCKOUT_SECONDS=900     LOGIN_THROTTLE_FLUSH_SECONDS=5
+  LOGIN_THROTTLE_MAX_KEYS=100000
+"""
+from collections import OrderedDict, deque
+import datetime
+import logging
+import math
+import threading
+import time
+from utils.background import PeriodicTask
+from utils.db import get_db_connection
+from utils.env import env_int
+
+logger = logging.getLogger('login_throttle')
+
+
+MAX_FAILURES = env_int('LOGIN_MAX_FAILURES', 5)
+FAILURE_WINDOW = env_int('LOGIN_FAILURE_WINDOW', 900)
+MAX_IP_FAILURES = env_int('LOGIN_MAX_IP_FAILURES', 50)
+IP_WINDOW = env_int('LOGIN_IP_WINDOW', 300)
+LOCKOUT_SECONDS = env_int('LOGIN_LOCKOUT_SECONDS', 900)
+FLUSH_SECONDS = env_int('LOGIN_THROTTLE_FLUSH_SECONDS', 5)
+MAX_KEYS = env_int('LOGIN_THROTTLE_MAX_KEYS', 100_000)
+
+
+class SlidingWindow:
+    """Failure timestamps per key within `window` seconds, at most `limit` kept per key."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._hits = OrderedDict()   # key -> deque of monotonic times, oldest key first
+
+    def _trim(self, key, now):
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+            return None
+        return hits
+
+    def add(self, key, now):
+        hits = self._trim(key, now)
+        if hits is None:
+            hits = self._hits[key] = deque(maxlen=max(self.limit, 1))
+            while len(self._hits) > MAX_KEYS:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+        hits.append(now)
+        return len(hits)
+
+    def retry_after(self, key, now):
+        """Seconds until key drops below the limit (0 if it is below)."""
+        hits = self._trim(key, now)
+        if hits is None or len(hits) < self.limit:
+            return 0
+        return hits[0] + self.window - now
+
+    def clear(self, key):
+        self._hits.pop(key, None)
+
+
+_lock = threading.Lock()
+_users = SlidingWindow(MAX_FAILURES, FAILURE_WINDOW)
+_ips = SlidingWindow(MAX_IP_FAILURES, IP_WINDOW)
+_locked = {}      # username -> monotonic time the lockout ends
+_pending = {}     # user_id -> {"reset": bool, "failures": int, "locked_until": datetime|None}
+
+
+def _user_key(username):
+    return (username or '').strip().lower()
+
+
+def _seconds(value):
+    return max(1, math.ceil(value))
+
+
+def _prune_locks(now):
+    # Drop expired locks, then the oldest ones if a username spray filled the table
+    for key in [k for k, until in _locked.items() if until <= now]:
+        del _locked[key]
+    while len(_locked) >= MAX_KEYS:
+        del _locked[next(iter(_locked))]
+
+
+def check(username, ip):
+    """
+    Seconds the caller must wait, or 0 when the attempt may go ahead.
+    Call before touching the database or hashing anything.
+    """
+    now = time.monotonic()
+    key = _user_key(username)
+    with _lock:
+        until = _locked.get(key)
+        if until is not None:
+            if until > now:
+                return _seconds(until - now)
+            del _locked[key]
+        wait = _ips.retry_after(ip, now) if ip else 0
+    return _seconds(wait) if wait > 0 else 0
+
+
+def lock_from_db(username, locked_until):
+    """
+    The login query found login_info.is_locked set. Returns the seconds left
+    (0 if the lock already expired) and caches the lock so further attempts
+    are rejected without a lookup.
+    """
+    if locked_until is None:
+        remaining = LOCKOUT_SECONDS
+    else:
+        remaining = (locked_until - datetime.datetime.now()).total_seconds()
+    if remaining <= 0:
+        return 0
+    with _lock:
+        _locked[_user_key(username)] = time.monotonic() + remaining
+    return _seconds(remaining)
+
+
+def record_failure(username, ip, user_id=None):
+    """Count a failed attempt; returns lockout seconds if it triggered one, else 0."""
+    now = time.monotonic()
+    key = _user_key(username)
+    locked_for = 0
+    with _lock:
+        if ip:
+            _ips.add(ip, now)
+        if _users.add(key, now) >= MAX_FAILURES:
+            if len(_locked) >= MAX_KEYS:
+                _prune_locks(now)
+            _locked[key] = now + LOCKOUT_SECONDS
+            _users.clear(key)
+            locked_for = LOCKOUT_SECONDS
+        if user_id is not None:
+            entry = _pending.setdefault(user_id, {"reset": False, "failures": 0, "locked_until": None})
+            entry["failures"] += 1
+            if locked_for:
+                entry["locked_until"] = datetime.datetime.now() + datetime.timedelta(seconds=LOCKOUT_SECONDS)
+    if locked_for:
+        logger.warning(f"Locked login for {key!r} for {LOCKOUT_SECONDS}s after {MAX_FAILURES} failures")
+    if user_id is not None:
+        _flusher.start()
+    return locked_for
+
+
+def record_success(username, user_id=None, had_failures=False):
+    """Clear the username's counters; reset login_info if it recorded failures."""
+    key = _user_key(username)
+    with _lock:
+        _users.clear(key)
+        _locked.pop(key, None)
+        if user_id is not None and (had_failures or user_id in _pending):
+            _pending[user_id] = {"reset": True, "failures": 0, "locked_until": None}
+    if user_id is not None and had_failures:
+        _flusher.start()
+
+
+def flush():
+    """Write pending failure counts / lockouts / resets to login_info."""
+    with _lock:
+        if not _pending:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+
+    resets = [(uid,) for uid, e in batch.items() if e["reset"]]
+    bumps = [
+        (e["failures"], e["locked_until"], e["locked_until"], uid)
+        for uid, e in batch.items() if e["failures"] or e["locked_until"]
+    ]
+    conn = None
+    try:
+        conn = get_db_connection(shared=False)
+        cur = conn.cursor()
+        if resets:
+            cur.executemany(
+                "UPDATE login_info SET failed_attempts = 0, is_locked = 0, locked_until = NULL WHERE user_id = %s",
+                resets,
+            )
+        if bumps:
+            cur.executemany(
+                """
+                UPDATE login_info
+                SET failed_attempts = failed_attempts + %s,
+                    is_locked = IF(%s IS NULL, is_locked, 1),
+                    locked_until = COALESCE(%s, locked_until)
+                WHERE user_id = %s
+                """,
+                bumps,
+            )
+        conn.commit()
+        cur.close()
+    except Exception as e:
+        logger.error(f"Failed to persist {len(batch)} login_info updates: {e}")
+        with _lock:
+            # Put them back unless newer state arrived meanwhile
+            for uid, entry in batch.items():
+                _pending.setdefault(uid, entry)
+        return 0
+    finally:
+        if conn:
+            conn.close()
+    return len(batch)
+
+
+_flusher = PeriodicTask('login-throttle-flush', FLUSH_SECONDS, flush, final_run=True)
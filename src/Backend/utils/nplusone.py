@@ -0,0 +1,86 @@
+"""
+Opt-in N+1 query detector.
+
+Counts statements per request by fingerprint (see utils.query_stats). When
+one fingerprint runs more than DB_NPLUSONE_THRESHOLD times in a single
+request, the loop that issued it is reported with a stack trace.
+
+  DB_NPLUSONE=warn    log a warning (development)
+  DB_NPLUSONE=raise   raise NPlusOneDetected (test runs)
+  DB_NPLUSONE_THRESHOLD=10
+
+Outside a request (scripts, tests calling helpers directly), wrap the code
+in `with track():` to get the same checks.
+"""
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+import logging
+import os
+import threading
+import traceback
+from utils.env import env_int
+
+logger = logging.getLogger('nplusone')
+
+MODE = os.getenv('DB_NPLUSONE', '').lower()
+ENABLED = MODE in ('warn', 'raise')
+THRESHOLD = env_int('DB_NPLUSONE_THRESHOLD', 10)
+
+
+class NPlusOneDetected(RuntimeError):
+    """Raised in DB_NPLUSONE=raise mode when a statement repeats past the threshold."""
+
+    def __init__(self, fingerprint, count, where, stack):
+        self.fingerprint = fingerprint
+        self.count = count
+        self.where = where
+        self.stack = stack
+        super().__init__(f"N+1 query in {where}: ran {count}x: {fingerprint}\n{stack}")
+
+
+_local = threading.local()
+
+
+def _counts():
+    if has_request_context():
+        counts = g.get('_nplusone_counts')
+        if counts is None:
+            counts = g._nplusone_counts = {}
+        return counts, f"{request.method} {request.path}"
+    return getattr(_local, "counts", None), "<tracked block>"
+
+
+@contextmanager
+def track(mode=None, threshold=None):
+    """Count statements outside a request context; yields the fingerprint -> count dict."""
+    global MODE, ENABLED, THRESHOLD
+    saved = (MODE, ENABLED, THRESHOLD, getattr(_local, "counts", None))
+    if mode is not None:
+        MODE, ENABLED = mode, mode in ('warn', 'raise')
+    if threshold is not None:
+        THRESHOLD = threshold
+    _local.counts = {}
+    try:
+        yield _local.counts
+    finally:
+        MODE, ENABLED, THRESHOLD, _local.counts = saved
+
+
+def observe(fingerprint):
+    """Called by the DB layer for every statement executed."""
+    counts, where = _counts()
+    if counts is None:
+        return
+    n = counts.get(fingerprint, 0) + 1
+    counts[fingerprint] = n
+    if n != THRESHOLD + 1:
+        return
+
+    # First time over the line for this fingerprint: report it once per request
+    stack = "".join(traceback.format_stack(limit=12)[:-3])
+    if MODE == 'raise':
+        raise NPlusOneDetected(fingerprint, n, where, stack)
+    logger.warning(
+        "Possible N+1 in %s: statement ran more than %d times: %s\n%s",
+        where, THRESHOLD, fingerprint, stack,
+    )
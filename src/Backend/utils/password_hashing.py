@@ -0,0 +1,142 @@
+"""
+Password hashing off the request threads.
+
+generate_password_hash / check_password_hash are deliberately slow. Run
+inline, a burst of logins occupies every request worker with hashing.
+They run here on a dedicated process pool instead (real parallelism, no
+GIL), with a cap on in-flight work: once HASH_QUEUE_LIMIT hashes are
+queued or running, new requests fail fast with HashingOverloaded, which
+the app answers with a 503 + Retry-After.
+
+  HASH_WORKERS=4              processes (0 = hash inline on the caller)
+  HASH_QUEUE_LIMIT=32         queued + running hashes before rejecting
+  HASH_QUEUE_WAIT=0.05        seconds to wait for a slot before rejecting
+  HASH_TIMEOUT=10             seconds to wait for a result
+  PASSWORD_HASH_METHOD=scrypt:32768:8:1
+
+needs_rehash() tells whether a stored hash (or a legacy plaintext value)
+uses other parameters than PASSWORD_HASH_METHOD; login upgrades such
+hashes in the background via rehash_later().
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import hmac
+import logging
+import os
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+from utils.env import env_int, env_float
+
+logger = logging.getLogger('password_hashing')
+
+
+HASH_WORKERS = env_int('HASH_WORKERS', min(4, os.cpu_count() or 1))
+HASH_QUEUE_LIMIT = env_int('HASH_QUEUE_LIMIT', max(HASH_WORKERS, 1) * 8)
+HASH_QUEUE_WAIT = env_float('HASH_QUEUE_WAIT', 0.05)
+HASH_TIMEOUT = env_float('HASH_TIMEOUT', 10.0)
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+
+class HashingOverloaded(RuntimeError):
+    """Too many hashes in flight; the caller should retry shortly (the app answers 503)."""
+
+    retry_after = 1
+
+
+_slots = threading.BoundedSemaphore(max(HASH_QUEUE_LIMIT, 1))
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_background = None
+
+
+def _get_pool():
+    # One pool per process; a forked worker must not reuse its parent's
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+                _pool_pid = pid
+    return _pool
+
+
+def _reset_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+
+
+def _run(fn, *args):
+    if HASH_WORKERS <= 0:
+        return fn(*args)
+
+    if not _slots.acquire(timeout=HASH_QUEUE_WAIT):
+        logger.warning("Password hashing saturated; rejecting request")
+        raise HashingOverloaded("Too many password operations in progress")
+    pool = None
+    try:
+        pool = _get_pool()
+        future = pool.submit(fn, *args)
+    except (BrokenProcessPool, RuntimeError) as e:
+        _slots.release()
+        logger.error(f"Hashing pool unavailable ({e}); hashing inline")
+        _reset_pool(pool)
+        return fn(*args)
+    future.add_done_callback(lambda _: _slots.release())
+
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except FutureTimeout:
+        raise HashingOverloaded("Password operation timed out")
+    except BrokenProcessPool as e:
+        logger.error(f"Hashing worker died ({e}); hashing inline")
+        _reset_pool(pool)
+        return fn(*args)
+
+
+def hash_password(password):
+    """Hash with the current PASSWORD_HASH_METHOD."""
+    return _run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(stored, password):
+    """True if password matches the stored hash (or legacy plaintext value)."""
+    if not stored or password is None:
+        return False
+    if '$' not in stored:
+        # Accounts created before hashing; no pool round trip needed
+        return hmac.compare_digest(stored.encode(), password.encode())
+    return _run(check_password_hash, stored, password)
+
+
+def needs_rehash(stored):
+    """True when stored is plaintext or was hashed with other parameters."""
+    if not stored or '$' not in stored:
+        return True
+    return stored.split('$', 1)[0] != PASSWORD_HASH_METHOD
+
+
+def rehash_later(password, store):
+    """
+    Hash password with the current parameters in the background and pass
+    the new hash to store(new_hash). Skipped silently when hashing is busy;
+    the next login tries again.
+    """
+    global _background
+    if _background is None:
+        with _pool_lock:
+            if _background is None:
+                _background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rehash')
+
+    def job():
+        try:
+            store(hash_password(password))
+        except HashingOverloaded:
+            pass
+        except Exception as e:
+            logger.error(f"Background rehash failed: {e}")
+
+    _background.submit(job)
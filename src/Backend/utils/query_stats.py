@@ -0,0 +1,135 @@
+"""
+Per-statement query statistics.
+Statements are normalized to a fingerprint (literals and placeholders
+replaced by '?') and timings are aggregated per (endpoint, fingerprint).
+"""
+from collections import deque
+from functools import lru_cache
+import re
+import threading
+
+_COMMENT_RE = re.compile(r"(--[^\n]*|/\*.*?\*/)", re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_RE = re.compile(r"(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+MAX_KEYS = 2000        # distinct (endpoint, fingerprint) pairs kept
+SAMPLE_SIZE = 512      # recent timings kept per key for percentiles
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Normalize a statement so calls that differ only in literals group together."""
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode("utf-8", errors="replace")
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("(?+)", text)
+    text = _VALUES_RE.sub(r"\1, ...", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class _Stat:
+    __slots__ = ("count", "total", "max", "rows", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.rows += other.rows
+        self.samples.extend(other.samples)
+
+
+class QueryStats:
+    """Thread-safe aggregate of statement timings for this worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _slot(self, key):
+        stat = self._stats.get(key)
+        if stat is None:
+            if len(self._stats) >= MAX_KEYS:
+                key = (key[0], "<other>")
+                stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = _Stat()
+        return stat
+
+    def record(self, endpoint, fp, elapsed, rows=0):
+        with self._lock:
+            stat = self._slot((endpoint, fp))
+            stat.count += 1
+            stat.total += elapsed
+            stat.rows += rows
+            if elapsed > stat.max:
+                stat.max = elapsed
+            stat.samples.append(elapsed)
+
+    def add_rows(self, endpoint, fp, rows):
+        with self._lock:
+            self._slot((endpoint, fp)).rows += rows
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self, group="fingerprint", endpoint=None, limit=50):
+        """
+        Aggregated rows sorted by total time.
+        group: 'fingerprint' (all endpoints merged), 'endpoint', or 'both'
+        """
+        with self._lock:
+            items = [(k, s) for k, s in self._stats.items() if endpoint is None or k[0] == endpoint]
+            grouped = {}
+            for (ep, fp), stat in items:
+                key = fp if group == "fingerprint" else ep if group == "endpoint" else (ep, fp)
+                agg = grouped.get(key)
+                if agg is None:
+                    agg = grouped[key] = _Stat()
+                agg.merge(stat)
+
+        rows = []
+        for key, stat in grouped.items():
+            samples = sorted(stat.samples)
+            row = {
+                "count": stat.count,
+                "total_ms": round(stat.total * 1000, 3),
+                "avg_ms": round(stat.total / stat.count * 1000, 3) if stat.count else 0.0,
+                "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+                "max_ms": round(stat.max * 1000, 3),
+                "rows": stat.rows,
+            }
+            if group == "fingerprint":
+                row["fingerprint"] = key
+            elif group == "endpoint":
+                row["endpoint"] = key
+            else:
+                row["endpoint"], row["fingerprint"] = key
+            rows.append(row)
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return rows[:limit] if limit else rows
+
+
+query_stats = QueryStats()
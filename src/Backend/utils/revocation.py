@@ -0,0 +1,203 @@
+"""
+Revoked access tokens (JWT denylist keyed by jti).
+
+The authoritative set is the revoked_tokens table (migration 001). Each
+worker keeps a Bloom filter of it, filled by a full load on first use and
+then synced incrementally on revoked_at every REVOCATION_SYNC_SECONDS. A
+token whose jti is not in the filter is definitely not revoked, which is
+the answer for nearly every request and costs no query. Only filter hits
+(real revocations plus ~REVOCATION_FALSE_POSITIVE_RATE of the rest) are
+confirmed against the table. Until the filter has loaded, every check
+goes to the table.
+
+Revocations made by this worker apply immediately; other workers see them
+after their next sync. The filter is rebuilt every
+REVOCATION_REBUILD_SECONDS to drop tokens that have expired anyway (their
+rows are purged at the same time) and to resize it.
+
+  REVOCATION_SYNC_SECONDS=2        REVOCATION_REBUILD_SECONDS=3600
+  REVOCATION_CAPACITY=100000       REVOCATION_FALSE_POSITIVE_RATE=0.001
+"""
+from collections import OrderedDict
+import datetime
+import logging
+import threading
+from utils.background import PeriodicTask
+from utils.bloom import BloomFilter
+from utils.db import get_db_connection, execute_prepared_one
+from utils.env import env_int, env_float
+
+logger = logging.getLogger('revocation')
+
+
+SYNC_SECONDS = env_float('REVOCATION_SYNC_SECONDS', 2)
+REBUILD_SECONDS = env_float('REVOCATION_REBUILD_SECONDS', 3600)
+CAPACITY = env_int('REVOCATION_CAPACITY', 100_000)
+FALSE_POSITIVE_RATE = env_float('REVOCATION_FALSE_POSITIVE_RATE', 0.001)
+# Re-read this far behind the last sync so rows committed late are not missed
+SYNC_OVERLAP = datetime.timedelta(seconds=30)
+SYNC_BATCH = 5000
+CHECKED_CACHE_SIZE = 10_000
+
+SQL_IS_REVOKED = "SELECT 1 AS revoked FROM revoked_tokens WHERE jti = %s"
+
+_lock = threading.Lock()
+_load_lock = threading.Lock()
+_filter = None
+_watermark = None          # DB clock at the start of the last load
+_confirmed = OrderedDict()  # jti -> True/False for filter hits already checked
+
+
+def _load(since=None):
+    """
+    Rows revoked at/after `since` as [(jti, revoked_at)], plus the DB's
+    clock at the start of the read. since=None loads every unexpired row.
+    """
+    rows = []
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT NOW(6)")
+        db_now = cur.fetchall()[0][0]
+        if since is None:
+            cur.execute("SELECT jti, revoked_at FROM revoked_tokens WHERE expires_at > NOW(6)")
+            rows = cur.fetchall()
+        else:
+            while True:
+                cur.execute(
+                    "SELECT jti, revoked_at FROM revoked_tokens WHERE revoked_at >= %s "
+                    "ORDER BY revoked_at LIMIT %s",
+                    (since, SYNC_BATCH),
+                )
+                batch = cur.fetchall()
+                rows.extend(batch)
+                if len(batch) < SYNC_BATCH or batch[-1][1] == since:
+                    break
+                since = batch[-1][1]
+        cur.close()
+    finally:
+        conn.close()
+    return rows, db_now
+
+
+def rebuild():
+    """Load every unexpired revocation into a fresh, right-sized filter."""
+    global _filter, _watermark
+    rows, db_now = _load()
+    fresh = BloomFilter(max(CAPACITY, 2 * len(rows)), FALSE_POSITIVE_RATE)
+    for jti, _ in rows:
+        fresh.add(jti)
+    with _lock:
+        previous = _filter
+        _filter = fresh
+        _watermark = db_now
+        _confirmed.clear()
+    if previous is None:
+        logger.info(f"Loaded {len(rows)} revoked tokens")
+    return len(rows)
+
+
+def sync():
+    """Add revocations made since the last sync (by any worker)."""
+    global _watermark
+    if _filter is None:
+        rebuild()
+        return
+    rows, db_now = _load(_watermark - SYNC_OVERLAP)
+    with _lock:
+        for jti, _ in rows:
+            _filter.add(jti)
+            _confirmed.pop(jti, None)
+        _watermark = db_now
+    if _filter.saturated:
+        rebuild()
+
+
+def purge_and_rebuild():
+    """Drop rows for tokens past their own expiry, then rebuild the filter."""
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM revoked_tokens WHERE expires_at < NOW(6)")
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    rebuild()
+
+
+_syncer = PeriodicTask('revocation-sync', SYNC_SECONDS, sync)
+_rebuilder = PeriodicTask('revocation-rebuild', REBUILD_SECONDS, purge_and_rebuild)
+
+
+def _ensure_loaded():
+    """False if the filter could not be loaded (logged; retried by the sync job)."""
+    _syncer.start()
+    _rebuilder.start()
+    if _filter is None:
+        with _load_lock:
+            if _filter is None:
+                try:
+                    rebuild()
+                except Exception as e:
+                    logger.error(f"Could not load revoked tokens: {e}")
+                    return False
+    return True
+
+
+def is_revoked(jti):
+    """True if the token with this jti has been revoked."""
+    if not jti:
+        return False
+    loaded = _ensure_loaded()
+    if loaded:
+        if jti not in _filter:
+            return False
+        with _lock:
+            known = _confirmed.get(jti)
+        if known is not None:
+            return known
+
+    # Filter hit, or no filter yet: ask the table (never fail open)
+    conn = get_db_connection()
+    try:
+        revoked = execute_prepared_one(conn, SQL_IS_REVOKED, (jti,)) is not None
+    finally:
+        conn.close()
+    if not loaded:
+        return revoked
+    with _lock:
+        _confirmed[jti] = revoked
+        while len(_confirmed) > CHECKED_CACHE_SIZE:
+            _confirmed.popitem(last=False)
+    return revoked
+
+
+def revoke(claims, reason=None):
+    """Revoke the token these (verified) claims came from, until its exp."""
+    jti = claims.get('jti')
+    exp = claims.get('exp')
+    if not jti or not exp:
+        return False
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT IGNORE INTO revoked_tokens (jti, user_id, reason, expires_at)
+            VALUES (%s, %s, %s, FROM_UNIXTIME(%s))
+            """,
+            # Converted by the DB, in the same time zone NOW(6) uses for purging
+            (jti, claims.get('user_id'), reason, int(exp)),
+        )
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+    if _ensure_loaded():
+        with _lock:
+            _filter.add(jti)
+            _confirmed[jti] = True
+    logger.info(f"Revoked token jti={jti} user_id={claims.get('user_id')} reason={reason}")
+    return True
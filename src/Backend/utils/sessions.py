@@ -0,0 +1,216 @@
+"""
+Server-side session registry on current_sessions.
+
+Login creates a row and puts its id in the token's `sid` claim;
+token_required accepts the token only while that row exists and has not
+expired, so deleting the row (logout, password reset, account deletion)
+revokes the token even though the JWT itself is still valid.
+
+Validation is served from a per-process cache for SESSION_CACHE_TTL
+seconds, so most API calls cost no query; a revocation reaches other
+workers within that window. last_seen_at is not written per request:
+touches are coalesced in memory and flushed in one batch every
+SESSION_TOUCH_FLUSH_SECONDS. Expired rows are purged in chunks every
+SESSION_PURGE_SECONDS (range delete on idx_sessions_exp).
+
+  SESSION_CACHE_TTL=30   SESSION_CACHE_SIZE=10000
+  SESSION_TOUCH_FLUSH_SECONDS=60   SESSION_PURGE_SECONDS=300
+"""
+from collections import OrderedDict
+import datetime
+import logging
+import threading
+import time
+import uuid
+from utils.background import PeriodicTask
+from utils.db import get_db_connection, execute_prepared_one
+from utils.env import env_int
+
+logger = logging.getLogger('sessions')
+
+
+CACHE_TTL = env_int('SESSION_CACHE_TTL', 30)
+CACHE_SIZE = env_int('SESSION_CACHE_SIZE', 10000)
+TOUCH_FLUSH_SECONDS = env_int('SESSION_TOUCH_FLUSH_SECONDS', 60)
+PURGE_SECONDS = env_int('SESSION_PURGE_SECONDS', 300)
+PURGE_BATCH = 1000
+
+SQL_SESSION_LOOKUP = "SELECT user_id, expires_at FROM current_sessions WHERE session_id = %s"
+
+_lock = threading.Lock()
+_cache = OrderedDict()   # session_id -> (user_id or None if unknown/revoked, expires_at, cached_until)
+_touched = {}            # session_id -> last_seen_at waiting to be flushed
+
+
+def _now():
+    return datetime.datetime.now()
+
+
+def _remember(session_id, user_id, expires_at):
+    with _lock:
+        _cache[session_id] = (user_id, expires_at, time.monotonic() + CACHE_TTL)
+        _cache.move_to_end(session_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def create(user_id, lifetime_seconds, ip_address=None, user_agent=None, source='WEB'):
+    """Insert a session row and return its id (for the token's sid claim)."""
+    session_id = str(uuid.uuid4())
+    now = _now()
+    expires_at = now + datetime.timedelta(seconds=lifetime_seconds)
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO current_sessions
+                (session_id, user_id, source, ip_address, user_agent, created_at, last_seen_at, expires_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (session_id, user_id, source, ip_address, (user_agent or '')[:512] or None, now, now, expires_at),
+        )
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    _remember(session_id, user_id, expires_at)
+    _start_jobs()
+    return session_id
+
+
+def is_active(session_id, user_id):
+    """True while the session exists, belongs to user_id and has not expired."""
+    if not session_id:
+        return False
+    with _lock:
+        hit = _cache.get(session_id)
+        if hit is not None and hit[2] <= time.monotonic():
+            del _cache[session_id]
+            hit = None
+        if hit is not None:
+            _cache.move_to_end(session_id)
+
+    if hit is None:
+        conn = get_db_connection()
+        try:
+            row = execute_prepared_one(conn, SQL_SESSION_LOOKUP, (session_id,))
+        finally:
+            conn.close()
+        owner, expires_at = (row['user_id'], row['expires_at']) if row else (None, None)
+        _remember(session_id, owner, expires_at)
+        _start_jobs()
+    else:
+        owner, expires_at = hit[0], hit[1]
+
+    if owner is None or expires_at is None or expires_at <= _now():
+        return False
+    try:
+        return int(owner) == int(user_id)
+    except (TypeError, ValueError):
+        return False
+
+
+def touch(session_id):
+    """Note activity; written to last_seen_at by the next batched flush."""
+    with _lock:
+        _touched[session_id] = _now()
+    _toucher.start()
+
+
+def revoke(session_id):
+    """Delete one session (logout)."""
+    if not session_id:
+        return
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM current_sessions WHERE session_id = %s", (session_id,))
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    with _lock:
+        _touched.pop(session_id, None)
+    _remember(session_id, None, None)
+
+
+def revoke_user(user_id, conn=None):
+    """Delete every session of a user (password reset, account removal)."""
+    own = conn is None
+    if own:
+        conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM current_sessions WHERE user_id = %s", (user_id,))
+        if own:
+            conn.commit()
+        cur.close()
+    finally:
+        if own:
+            conn.close()
+    with _lock:
+        for sid in [sid for sid, entry in _cache.items() if entry[0] == int(user_id)]:
+            _cache[sid] = (None, None, time.monotonic() + CACHE_TTL)
+
+
+def flush_touches():
+    """Write coalesced last_seen_at values in one batch."""
+    with _lock:
+        if not _touched:
+            return 0
+        batch = list(_touched.items())
+        _touched.clear()
+    conn = None
+    try:
+        conn = get_db_connection(shared=False)
+        cur = conn.cursor()
+        cur.executemany(
+            "UPDATE current_sessions SET last_seen_at = %s WHERE session_id = %s",
+            [(seen, sid) for sid, seen in batch],
+        )
+        conn.commit()
+        cur.close()
+    except Exception as e:
+        logger.error(f"Failed to flush {len(batch)} session touches: {e}")
+        with _lock:
+            for sid, seen in batch:
+                _touched.setdefault(sid, seen)
+        return 0
+    finally:
+        if conn:
+            conn.close()
+    return len(batch)
+
+
+def purge_expired():
+    """Delete expired sessions in small chunks (range scan on idx_sessions_exp)."""
+    total = 0
+    conn = get_db_connection(shared=False)
+    try:
+        cur = conn.cursor()
+        while True:
+            cur.execute(
+                "DELETE FROM current_sessions WHERE expires_at < %s ORDER BY expires_at LIMIT %s",
+                (_now(), PURGE_BATCH),
+            )
+            deleted = cur.rowcount
+            conn.commit()
+            total += deleted
+            if deleted < PURGE_BATCH:
+                break
+        cur.close()
+    finally:
+        conn.close()
+    if total:
+        logger.info(f"Purged {total} expired sessions")
+    return total
+
+
+_toucher = PeriodicTask('session-touch-flush', TOUCH_FLUSH_SECONDS, flush_touches, final_run=True)
+_purger = PeriodicTask('session-purge', PURGE_SECONDS, purge_expired)
+
+
+def _start_jobs():
+    _toucher.start()
+    _purger.start()
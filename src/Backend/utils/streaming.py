@@ -0,0 +1,120 @@
+"""
+Streaming JSON / NDJSON responses for large result sets.
+
+List endpoints opt in with ?stream=1 (same JSON document as the buffered
+response, written incrementally) or ?format=ndjson (one object per line).
+Rows are pulled from an unbuffered cursor in fetchmany() batches and written
+out as they arrive, so worker memory stays flat however many rows match.
+"""
+from flask import Response, current_app, request, stream_with_context
+import logging
+from utils.db import get_db_connection
+
+logger = logging.getLogger('streaming')
+
+BATCH_SIZE = 500
+
+
+def stream_mode(args=None):
+    """'json', 'ndjson', or None for the normal buffered response."""
+    args = request.args if args is None else args
+    if (args.get('format') or '').lower() == 'ndjson':
+        return 'ndjson'
+    if (args.get('stream') or '').lower() in ('1', 'true', 'yes'):
+        return 'json'
+    return None
+
+
+def iter_rows(cur, batch_size=BATCH_SIZE):
+    """Yield rows one at a time while fetching them batch_size at a time."""
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def stream_query(sql, params=(), key="data", mode="json", transform=None, head=None, tail=None,
+                 batch_size=BATCH_SIZE):
+    """
+    Run `sql` on a private pooled connection and stream the result.
+
+    mode='json':    {**head, key: [item, ...], **tail(count)}
+    mode='ndjson':  {"_meta": head} (if head), one item per line, then
+                    {"_summary": tail(count)} (if tail)
+
+    transform maps the row iterator to output items (e.g. grouping joined
+    rows into nested objects). tail is called after the last item, so it can
+    report totals accumulated by transform.
+    """
+    # Check out now, so an outage is answered with a 503 instead of a truncated body
+    conn = get_db_connection(shared=False)
+    dumps = current_app.json.dumps
+
+    def generate():
+        cur = None
+        count = 0
+        opened = False
+        try:
+            cur = conn.cursor(dictionary=True)  # unbuffered: rows stay on the server until fetched
+            cur.execute(sql, params)
+            items = iter_rows(cur, batch_size)
+            if transform:
+                items = transform(items)
+
+            if mode == 'ndjson':
+                opened = True
+                if head:
+                    yield dumps({"_meta": head}) + "\n"
+                chunk = []
+                for item in items:
+                    chunk.append(dumps(item))
+                    count += 1
+                    if len(chunk) >= batch_size:
+                        yield "\n".join(chunk) + "\n"
+                        chunk = []
+                if chunk:
+                    yield "\n".join(chunk) + "\n"
+                if tail:
+                    yield dumps({"_summary": tail(count)}) + "\n"
+                return
+
+            prefix = dumps(head)[:-1] + ", " if head else "{"
+            yield prefix + dumps(key) + ": ["
+            opened = True
+            chunk = []
+            for item in items:
+                chunk.append(dumps(item))
+                count += 1
+                if len(chunk) >= batch_size:
+                    yield ("," if count > len(chunk) else "") + ",".join(chunk)
+                    chunk = []
+            if chunk:
+                yield ("," if count > len(chunk) else "") + ",".join(chunk)
+            trailer = dumps(tail(count)) if tail else "{}"
+            yield "]" + (", " + trailer[1:] if trailer != "{}" else "}")
+
+        except Exception as e:
+            # Headers are already sent; end the body with an error marker the client can detect
+            logger.error(f"Stream aborted for {request.path} after {count} rows: {e}")
+            if mode == 'ndjson':
+                yield dumps({"_error": "stream aborted"}) + "\n"
+            elif opened:
+                yield '], "error": "stream aborted"}'
+            else:
+                yield dumps({"error": "stream aborted"})
+        finally:
+            if cur:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+            conn.close()
+
+    resp = Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson' if mode == 'ndjson' else 'application/json',
+    )
+    # Let proxies pass chunks through instead of buffering the whole body
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
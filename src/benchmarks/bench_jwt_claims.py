@@ -0,0 +1,112 @@
+"""
+Benchmark: JWT verification cost per request with token_required +
+require_role stacked and the handler reading the claims again.
+
+Modes, each over N simulated requests (Flask test request contexts carrying
+the access-token cookie, configured like app.py):
+  - uncached:    verify_jwt_in_request() + get_jwt() at every call site
+  - per-request: auth.current_claims() with the process cache disabled
+                 (one verification per request)
+  - cached:      auth.current_claims() with the process cache warm
+                 (no signature check while the token is unexpired)
+
+--tokens K spreads requests over K distinct users' tokens, to show the
+hit rate once K exceeds JWT_CLAIMS_CACHE_SIZE.
+
+No database is needed. Usage (from the repo root):
+  python src/benchmarks/bench_jwt_claims.py --requests 20000 --tokens 500
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Backend"))
+
+from flask import Flask  # noqa: E402
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt, verify_jwt_in_request  # noqa: E402
+
+import auth  # noqa: E402
+
+CALL_SITES = 3  # token_required, require_role, handler
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET', 'bench_secret')
+    app.config['JWT_TOKEN_LOCATION'] = ['cookies']
+    app.config['JWT_COOKIE_CSRF_PROTECT'] = False
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 24 * 3600
+    JWTManager(app)
+    return app
+
+
+def make_tokens(app, count):
+    with app.app_context():
+        return [
+            create_access_token(
+                identity=str(1000 + i),
+                additional_claims={"role": "driver", "user_id": 1000 + i, "type_id": 1},
+            )
+            for i in range(count)
+        ]
+
+
+def uncached(_):
+    for _ in range(CALL_SITES):
+        verify_jwt_in_request()
+        get_jwt()
+
+
+def with_cache(_):
+    for _ in range(CALL_SITES):
+        auth.current_claims()
+
+
+def run(app, tokens, n, body):
+    cookie_name = app.config.get('JWT_ACCESS_COOKIE_NAME', 'access_token_cookie')
+    start = time.perf_counter()
+    for i in range(n):
+        token = tokens[i % len(tokens)]
+        with app.test_request_context('/api/account', headers={'Cookie': f'{cookie_name}={token}'}):
+            body(token)
+    return time.perf_counter() - start
+
+
+def context_only(app, tokens, n):
+    # Cost of building the request context itself, subtracted from every mode
+    return run(app, tokens, n, lambda _: None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=100, help="distinct tokens cycled through")
+    args = parser.parse_args()
+
+    app = make_app()
+    tokens = make_tokens(app, args.tokens)
+    n = args.requests
+    base = context_only(app, tokens, n)
+
+    results = {"uncached": run(app, tokens, n, uncached)}
+
+    size = auth.JWT_CLAIMS_CACHE_SIZE
+    auth.JWT_CLAIMS_CACHE_SIZE = 0
+    results["per-request"] = run(app, tokens, n, with_cache)
+
+    auth.JWT_CLAIMS_CACHE_SIZE = size
+    auth._claims_cache.clear()
+    run(app, tokens, min(n, len(tokens)), with_cache)  # warm
+    results["cached"] = run(app, tokens, n, with_cache)
+
+    print(f"{n} requests, {args.tokens} tokens, {CALL_SITES} claim reads/request, "
+          f"cache size {size} (request context overhead {base / n * 1e6:.1f} us removed)")
+    ref = max(results["uncached"] - base, 1e-9)
+    for label, elapsed in results.items():
+        net = max(elapsed - base, 0.0)
+        print(f"  {label:<12} {net / n * 1e6:8.1f} us/request  ({ref / max(net, 1e-9):5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
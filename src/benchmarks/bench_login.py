@@ -0,0 +1,148 @@
+"""
+Benchmark: login storm against POST /api/login.
+
+C concurrent clients log in N times in total with fixture accounts
+(see fixture.py; every account's password is BENCH_PASSWORD) and the
+script reports latency percentiles, throughput and, in-process, the SQL
+statements each login issued.
+
+For before/after numbers run it once on each revision against the same
+fixture database and compare the two reports.
+
+Usage (from the repo root):
+  # in-process Flask app, DB_HOST/DB_NAME/DB_USER/DB_PASSWORD pointing at the fixture
+  python src/benchmarks/bench_login.py --logins 2000 --concurrency 16
+
+  # a running server
+  python src/benchmarks/bench_login.py --url http://127.0.0.1:5000 --logins 2000 --concurrency 16
+
+--bad-ratio sends that share of attempts with a wrong password (the
+audit row is still written for them).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Backend"))
+
+from fixture import BENCH_PASSWORD  # noqa: E402
+
+
+def usernames(count, drivers, sponsors, seed):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        if sponsors and rng.random() < 0.1:
+            names.append(f"sponsor{rng.randrange(sponsors)}@bench.example.com")
+        else:
+            names.append(f"driver{rng.randrange(drivers)}@bench.example.com")
+    return names
+
+
+def http_client(base_url):
+    url = base_url.rstrip("/") + "/api/login"
+
+    def post(body):
+        req = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+    return post
+
+
+def in_process_client():
+    from app import app
+    local = threading.local()
+
+    def post(body):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        return client.post("/api/login", json=body).status_code
+    return post
+
+
+def statement_count():
+    from utils.query_stats import query_stats
+    return sum(row["count"] for row in query_stats.snapshot(group="fingerprint", limit=10_000))
+
+
+def drain_audit():
+    # Write the queued audit rows now so their batched INSERTs are counted
+    # (flush waits for a periodic flush already in progress)
+    from audit_logging import audit_writer
+    audit_writer.login_log.flush()
+    audit_writer.change_log.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: in-process app)")
+    parser.add_argument("--logins", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--drivers", type=int, default=5000, help="driver accounts in the fixture")
+    parser.add_argument("--sponsors", type=int, default=50, help="sponsor accounts in the fixture")
+    parser.add_argument("--bad-ratio", type=float, default=0.0)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    post = http_client(args.url) if args.url else in_process_client()
+    rng = random.Random(args.seed)
+    bodies = [
+        {"username": name,
+         "password": BENCH_PASSWORD if rng.random() >= args.bad_ratio else "wrong-password"}
+        for name in usernames(args.warmup + args.logins, args.drivers, args.sponsors, args.seed)
+    ]
+
+    for body in bodies[:args.warmup]:
+        post(body)
+    if not args.url:
+        drain_audit()
+        before = statement_count()
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(body):
+        started = time.perf_counter()
+        status = post(body)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, bodies[args.warmup:]))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100)
+    print(f"{args.logins} logins, concurrency {args.concurrency}, "
+          f"{'HTTP ' + args.url if args.url else 'in-process'}")
+    print(f"  status   {dict(sorted(statuses.items()))}")
+    print(f"  latency  p50 {q[49] * 1000:7.1f} ms | p95 {q[94] * 1000:7.1f} ms | "
+          f"p99 {q[98] * 1000:7.1f} ms | max {latencies[-1] * 1000:7.1f} ms")
+    print(f"  rate     {args.logins / wall:7.1f} logins/s")
+    if not args.url:
+        drain_audit()
+        print(f"  SQL      {(statement_count() - before) / args.logins:5.2f} statements/login")
+
+
+if __name__ == "__main__":
+    main()
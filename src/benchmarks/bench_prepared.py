@@ -0,0 +1,125 @@
+"""
+Benchmark: text-protocol vs cached server-side prepared statements for the
+hot id/balance lookups (see utils.db.execute_prepared).
+
+Runs each lookup N times per mode on one connection and reports wall time
+plus the server's own counters (Com_select / Com_stmt_prepare /
+Com_stmt_execute), which show the parse work avoided.
+
+Usage (from the repo root, against a disposable or dev database):
+  DB_HOST=... DB_NAME=... DB_USER=... DB_PASSWORD=... \
+      python src/benchmarks/bench_prepared.py --iterations 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Backend"))
+
+import mysql.connector  # noqa: E402
+
+from utils.db import ConnectionPool, _primary_connect_kwargs, execute_prepared  # noqa: E402
+from utils.identity import SQL_ROLE_IDS  # noqa: E402
+from account import SQL_DRIVER_SPONSOR_BALANCE  # noqa: E402
+
+STATUS_COUNTERS = ("Com_select", "Com_stmt_prepare", "Com_stmt_execute", "Com_stmt_close")
+
+
+def session_status(conn):
+    cur = conn.cursor()
+    cur.execute(
+        "SHOW SESSION STATUS WHERE Variable_name IN (%s, %s, %s, %s)",
+        STATUS_COUNTERS,
+    )
+    rows = dict(cur.fetchall())
+    cur.close()
+    return {k: int(rows.get(k, 0)) for k in STATUS_COUNTERS}
+
+
+def sample_params(conn, limit=200):
+    """Real ids from the database so lookups hit rows."""
+    cur = conn.cursor()
+    cur.execute("SELECT user_id FROM sponsor LIMIT %s", (limit,))
+    users = [r[0] for r in cur.fetchall()]
+    cur.execute("SELECT user_id FROM driver LIMIT %s", (limit,))
+    users += [r[0] for r in cur.fetchall()]
+    cur.execute("SELECT driver_id, sponsor_id FROM driver_sponsor LIMIT %s", (limit,))
+    pairs = [tuple(r) for r in cur.fetchall()]
+    cur.close()
+    if not (users and pairs):
+        sys.exit("Need sponsor, driver and driver_sponsor rows; load a fixture first.")
+    return [
+        ("role ids by user", SQL_ROLE_IDS, [(u, u) for u in users]),
+        ("driver_sponsor balance", SQL_DRIVER_SPONSOR_BALANCE, pairs),
+    ]
+
+
+def run_text(conn, sql, params, iterations):
+    timings = []
+    for _ in range(iterations):
+        p = random.choice(params)
+        started = time.perf_counter()
+        cur = conn.cursor(dictionary=True)
+        cur.execute(sql, p)
+        cur.fetchall()
+        cur.close()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run_prepared(conn, sql, params, iterations):
+    timings = []
+    for _ in range(iterations):
+        p = random.choice(params)
+        started = time.perf_counter()
+        execute_prepared(conn, sql, p)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(label, timings, before, after):
+    deltas = {k: after[k] - before[k] for k in STATUS_COUNTERS}
+    timings.sort()
+    print(
+        f"  {label:<9} total {sum(timings) * 1000:9.1f} ms | "
+        f"mean {statistics.mean(timings) * 1e6:7.1f} us | "
+        f"p95 {timings[int(len(timings) * 0.95) - 1] * 1e6:7.1f} us | "
+        + " ".join(f"{k}={v}" for k, v in deltas.items())
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    pool = ConnectionPool(_primary_connect_kwargs(), size=1, name="bench")
+    conn = pool.acquire()
+    try:
+        print(f"server {conn.get_server_info()}, connector {mysql.connector.__version__}, "
+              f"{args.iterations} iterations per lookup")
+        for name, sql, params in sample_params(conn):
+            # Warm both paths so neither pays first-use costs in the timed run
+            run_text(conn, sql, params, 10)
+            run_prepared(conn, sql, params, 10)
+
+            print(name)
+            before = session_status(conn)
+            timings = run_text(conn, sql, params, args.iterations)
+            report("text", timings, before, session_status(conn))
+
+            before = session_status(conn)
+            timings = run_prepared(conn, sql, params, args.iterations)
+            report("prepared", timings, before, session_status(conn))
+        print(pool.stats())
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: dictionary-cursor rows vs the compact columnar path
+(utils.db.fetch_columnar / columnar_payload) for large report results.
+
+For each layout it measures, over the same result set:
+  - build:   turning fetched rows into the response structure
+  - encode:  serializing that structure to JSON
+  - peak:    tracemalloc peak for build + encode
+  - bytes:   size of the JSON body
+
+With DB_HOST/DB_NAME/DB_USER/DB_PASSWORD set it runs the admin sales
+report's detailed query against that database (load a large fixture first).
+Without a database, --synthetic N generates N rows of the same shape.
+
+Usage:
+  python src/benchmarks/bench_row_layout.py                 # live DB
+  python src/benchmarks/bench_row_layout.py --synthetic 200000
+"""
+import argparse
+import datetime
+import decimal
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Backend"))
+
+SALES_DETAILED_SQL = """
+    SELECT
+        s.name AS sponsor_name,
+        CONCAT(u.first_name, ' ', u.last_name) AS driver_name,
+        DATE(t.date) AS date,
+        CONCAT('Product ID: ', t.item_id) AS product,
+        t.amount AS amount,
+        t.transaction_id AS order_id
+    FROM transactions t
+    JOIN driver_sponsor ds ON t.driver_sponsor_id = ds.driver_sponsor_id
+    JOIN sponsor s ON ds.sponsor_id = s.sponsor_id
+    JOIN driver d ON ds.driver_id = d.driver_id
+    JOIN `user` u ON d.user_id = u.user_id
+    ORDER BY t.date DESC
+"""
+
+
+def _default(o):
+    # Same idea as Flask's JSON provider: dates and Decimals become strings
+    if isinstance(o, (datetime.date, datetime.datetime)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    raise TypeError(type(o))
+
+
+def encode(payload):
+    return json.dumps(payload, default=_default, separators=(",", ":"))
+
+
+def synthetic_rows(n, seed=1):
+    rng = random.Random(seed)
+    sponsors = [f"Sponsor {i}" for i in range(20)]
+    drivers = [f"Driver {i} Lastname" for i in range(2000)]
+    start = datetime.date(2024, 1, 1)
+    columns = ["sponsor_name", "driver_name", "date", "product", "amount", "order_id"]
+    rows = [
+        (
+            rng.choice(sponsors),
+            rng.choice(drivers),
+            start + datetime.timedelta(days=rng.randrange(365)),
+            f"Product ID: {rng.randrange(1, 500)}",
+            decimal.Decimal(rng.randrange(-50000, 50000)) / 100,
+            i,
+        )
+        for i in range(n)
+    ]
+    return columns, rows
+
+
+def live_rows():
+    import mysql.connector
+    from utils.db import _primary_connect_kwargs
+    conn = mysql.connector.connect(**_primary_connect_kwargs())
+    try:
+        cur = conn.cursor()
+        cur.execute(SALES_DETAILED_SQL)
+        rows = cur.fetchall()
+        columns = list(cur.column_names)
+        cur.close()
+    finally:
+        conn.close()
+    return columns, rows
+
+
+def dict_layout(columns, rows):
+    # What a dictionary cursor hands back: one dict per row
+    return {"data": [dict(zip(columns, row)) for row in rows]}
+
+
+def columnar_layout(columns, rows):
+    from utils.db import columnar_payload
+    values = [list(col) for col in zip(*rows)] if rows else [[] for _ in columns]
+    return columnar_payload(columns, values)
+
+
+def measure(label, build, columns, rows, repeat):
+    best_build = best_encode = float("inf")
+    peak = size = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        payload = build(columns, rows)
+        t1 = time.perf_counter()
+        body = encode(payload)
+        t2 = time.perf_counter()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best_build = min(best_build, t1 - t0)
+        best_encode = min(best_encode, t2 - t1)
+        size = len(body)
+        del payload, body
+    print(f"  {label:<9} build {best_build * 1000:8.1f} ms | encode {best_encode * 1000:8.1f} ms | "
+          f"peak {peak / 2**20:8.1f} MiB | body {size / 2**20:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, metavar="N", help="generate N rows instead of querying a DB")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per layout (best time is reported)")
+    args = parser.parse_args()
+
+    columns, rows = synthetic_rows(args.synthetic) if args.synthetic else live_rows()
+    print(f"{len(rows)} rows x {len(columns)} columns, best of {args.repeat}")
+    measure("dict", dict_layout, columns, rows, args.repeat)
+    measure("columnar", columnar_layout, columns, rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
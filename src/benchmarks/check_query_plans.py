@@ -0,0 +1,108 @@
+"""
+Regression check: EXPLAIN the identity / hot lookups and fail if any of
+them falls back to a full table or full index scan.
+
+Identity lookups must go through the indexed generated columns
+(user_credentials.username_lc, user.email_lc): `username = %s` or
+`email = %s` cannot use those unique keys and scans the table, which is
+what this check catches. Scans of tables the optimizer estimates at fewer
+than --min-rows rows (small joined lookup tables such as sponsor on a small
+fixture) are reported but not counted: there a scan is cheap and a valid
+plan choice, so counting it would make the check flaky.
+
+CI runs it on every pull request (.github/workflows/query-plans.yml)
+against `fixture.py --docker --scale small`. Locally, from the repo root:
+  python src/benchmarks/fixture.py --docker --scale small
+  DB_HOST=127.0.0.1 DB_PORT=3310 DB_NAME=Team03_DB DB_USER=root DB_PASSWORD=bench \
+      python src/benchmarks/check_query_plans.py
+
+Exits 1 if any statement scans a table of --min-rows rows or more, 0 otherwise.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Backend"))
+
+from utils.db import ConnectionPool, _primary_connect_kwargs  # noqa: E402
+from utils.identity import SQL_ROLE_IDS  # noqa: E402
+from utils.sessions import SQL_SESSION_LOOKUP  # noqa: E402
+from utils.revocation import SQL_IS_REVOKED  # noqa: E402
+from auth import SQL_LOGIN_LOOKUP, SQL_USER_ID_BY_USERNAME  # noqa: E402
+from account import SQL_USER_BY_EMAIL, SQL_DRIVER_SPONSOR_BALANCE  # noqa: E402
+
+# EXPLAIN access types that read every row of a table or index
+SCAN_TYPES = {"ALL", "index"}
+# Below this many (estimated) rows a scan is not a regression
+MIN_SCAN_ROWS = 1000
+
+
+def sample(cur, sql, default):
+    cur.execute(sql)
+    row = cur.fetchone()
+    return row if row else default
+
+
+def statements(conn):
+    """(label, sql, params) using real values where the database has them."""
+    cur = conn.cursor()
+    (username,) = sample(cur, "SELECT username FROM user_credentials LIMIT 1", ("nobody",))
+    (email,) = sample(cur, "SELECT email FROM `user` LIMIT 1", ("nobody@example.com",))
+    (user_id,) = sample(cur, "SELECT user_id FROM `user` LIMIT 1", (1,))
+    pair = sample(cur, "SELECT driver_id, sponsor_id FROM driver_sponsor LIMIT 1", (1, 1))
+    cur.close()
+    # Mixed case on purpose: the lookups must still hit the *_lc index
+    return [
+        ("login lookup", SQL_LOGIN_LOOKUP, (username.upper(),)),
+        ("user id by username", SQL_USER_ID_BY_USERNAME, (username.upper(),)),
+        ("user by email", SQL_USER_BY_EMAIL, (email.upper(),)),
+        ("role ids by user", SQL_ROLE_IDS, (user_id, user_id)),
+        ("driver_sponsor balance", SQL_DRIVER_SPONSOR_BALANCE, tuple(pair)),
+        ("session lookup", SQL_SESSION_LOOKUP, ("00000000-0000-0000-0000-000000000000",)),
+        ("revoked token", SQL_IS_REVOKED, ("0" * 36,)),
+    ]
+
+
+def explain(conn, sql, params):
+    cur = conn.cursor(dictionary=True)
+    cur.execute("EXPLAIN " + sql, params)
+    rows = cur.fetchall()
+    cur.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan row")
+    parser.add_argument("--min-rows", type=int, default=MIN_SCAN_ROWS,
+                        help=f"ignore scans of tables estimated below this many rows (default {MIN_SCAN_ROWS})")
+    args = parser.parse_args()
+
+    pool = ConnectionPool(_primary_connect_kwargs(), size=1, name="plans")
+    conn = pool.acquire()
+    failures = 0
+    try:
+        for label, sql, params in statements(conn):
+            scans = []
+            small = []
+            for row in explain(conn, sql, params):
+                if args.verbose:
+                    print(f"  {label}: table={row['table']} type={row['type']} key={row['key']} "
+                          f"rows={row['rows']} extra={row['Extra']}")
+                if row["type"] in SCAN_TYPES:
+                    scan = f"{row['table']} ({row['type']}, ~{row['rows']} rows)"
+                    (scans if (row["rows"] or 0) >= args.min_rows else small).append(scan)
+            if scans:
+                failures += 1
+                print(f"FAIL {label}: full scan on {', '.join(scans)}")
+            elif small:
+                print(f"ok   {label} (small table scan on {', '.join(small)})")
+            else:
+                print(f"ok   {label}")
+    finally:
+        conn.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+#!/bin/bash
+# Point db-replica at db-primary's current binlog position and start replicating.
+set -euo pipefail
+
+PRIMARY="mysql -h db-primary -uroot -pdevpass -N -B"
+REPLICA="mysql -h db-replica -uroot -pdevpass -N -B"
+
+$PRIMARY -e "SET sql_log_bin=0;
+  CREATE USER IF NOT EXISTS 'repl'@'%' IDENTIFIED WITH mysql_native_password BY 'repl';
+  GRANT REPLICATION SLAVE ON *.* TO 'repl'@'%';
+  SET sql_log_bin=1;"
+
+read -r LOG_FILE LOG_POS _ < <($PRIMARY -e "SHOW MASTER STATUS")
+echo "Primary at ${LOG_FILE}:${LOG_POS}"
+
+$REPLICA -e "STOP REPLICA;
+  CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST='db-primary', SOURCE_USER='repl', SOURCE_PASSWORD='repl',
+    SOURCE_LOG_FILE='${LOG_FILE}', SOURCE_LOG_POS=${LOG_POS};
+  START REPLICA;"
+
+$REPLICA -e "SHOW REPLICA STATUS\G" | grep -E "Replica_(IO|SQL)_Running:|Seconds_Behind_Source"
+echo "Replication configured"